@@ -0,0 +1 @@
+examples/counter/counter.vhd
@@ -0,0 +1,194 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Memory-aware admission of tool jobs
+
+Formal tools can need tens of GB, so running several of them at the same
+time (see :meth:`fvm.FvmFramework.set_jobs` and
+:meth:`fvm.FvmFramework.set_step_jobs`) may exhaust the memory of the
+machine. Before running its tools, each step reserves the peak memory it is
+expected to need, which is the hint given with
+:meth:`fvm.FvmFramework.set_memory_hint` or, if there is none, the peak
+memory of its last execution (see :mod:`fvm.history`) plus a margin. A step
+only starts while the reserved memory fits in the memory budget, which is
+the available memory of the machine when FVM starts, or the limit set with
+:meth:`fvm.FvmFramework.set_memory_limit`. A step always starts if nothing
+else is running, even if it is expected to exceed the budget.
+
+The reservations are kept in ``<outdir>/.memory/reservations.json``, so
+they are shared by all the threads and worker processes of an execution.
+
+Tools that are killed because the machine ran out of memory are run again
+alone, when no other step is running. If several of them are waiting, they
+run one after another, in the order they asked to run.
+"""
+import os
+import re
+import json
+import time
+import fcntl
+import threading
+from contextlib import contextmanager
+
+from fvm import history
+
+MEMORY_DIR = '.memory'
+RESERVATIONS_FILE = 'reservations.json'
+
+# Seconds between attempts to reserve memory
+POLL_INTERVAL = 1
+
+# Margin added to the peak memory of the last execution of a step
+HISTORY_MARGIN = 1.2
+
+# Exit statuses of commands killed with SIGKILL, which is what the kernel OOM
+# killer sends, and messages of tools that could not allocate memory
+OOM_RETURNCODES = [-9, 137]
+OOM_REGEX = re.compile(r'out of memory|cannot allocate memory|std::bad_alloc|'
+                       r'memory allocation failed', re.IGNORECASE)
+
+def get_available_memory():
+    """Returns the available memory of the machine in bytes, or None if it
+    cannot be read"""
+    try:
+        with open('/proc/meminfo', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def get_estimate(framework, design, step):
+    """
+    Returns the peak memory that a step is expected to need, in bytes
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: design name
+    :type design: str
+    :param step: step name
+    :type step: str
+
+    :return: the memory hint of the step, or the peak memory of its last
+             execution plus a margin, or 0 if it is unknown
+    :rtype: int
+    """
+    if step in framework.memory_hints:
+        return framework.memory_hints[step]
+    max_rss = history.get(framework, design, step).get('max_rss', 0)
+    return int(max_rss * HISTORY_MARGIN)
+
+def is_alive(pid):
+    """Returns True if a process is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+@contextmanager
+def locked_reservations(framework):
+    """Lock the reservations file, yielding the reservations of the processes
+    that are still alive. Changes to them are saved when the context exits"""
+    memory_dir = os.path.join(framework.outdir, MEMORY_DIR)
+    os.makedirs(memory_dir, exist_ok=True)
+    filename = os.path.join(memory_dir, RESERVATIONS_FILE)
+    with open(f'{filename}.lock', 'w', encoding='utf-8') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    reservations = json.load(f)
+            except (OSError, ValueError):
+                reservations = {}
+            # Forget the reservations of processes that died
+            reservations = {key: reservation for key, reservation in reservations.items()
+                            if is_alive(reservation['pid'])}
+            yield reservations
+            with open(f'{filename}.tmp', 'w', encoding='utf-8') as f:
+                json.dump(reservations, f)
+            os.replace(f'{filename}.tmp', filename)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def try_reserve(framework, key, reservation):
+    """Reserve memory if it fits in the budget. Returns True if reserved"""
+    with locked_reservations(framework) as reservations:
+        others = {other: value for other, value in reservations.items() if other != key}
+        if reservation['alone']:
+            # Register the reservation even if it cannot start yet, so other
+            # steps are not started in the meantime
+            reservations[key] = reservation
+            if any(not value['alone'] for value in others.values()):
+                return False
+            # Steps that run alone start one at a time, the oldest first
+            return all((reservation['since'], key) < (value['since'], other)
+                       for other, value in others.items())
+        if any(value['alone'] for value in others.values()):
+            return False
+        reserved = sum(value['bytes'] for value in others.values())
+        if others and reserved + reservation['bytes'] > framework.memory_limit:
+            return False
+        reservations[key] = reservation
+        return True
+
+def release(framework, key):
+    """Release a memory reservation"""
+    with locked_reservations(framework) as reservations:
+        reservations.pop(key, None)
+
+@contextmanager
+def reserve(framework, design, step, alone=False):
+    """
+    Wait until the memory that a step is expected to need fits in the
+    budget, and keep it reserved while running its tools
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: design name
+    :type design: str
+    :param step: step name
+    :type step: str
+    :param alone: if True, wait until no other step is running, and do not
+                  let other steps start until this one finishes
+    :type alone: bool
+    """
+    if framework.memory_limit is None:
+        yield
+        return
+    estimate = get_estimate(framework, design, step)
+    key = f'{os.getpid()}.{threading.get_ident()}.{design}.{step}'
+    reservation = {'pid': os.getpid(), 'bytes': estimate, 'alone': alone,
+                   'name': f'{design}.{step}', 'since': time.time()}
+    waiting = False
+    try:
+        while not try_reserve(framework, key, reservation) and not framework.ctrl_c_pressed:
+            if not waiting:
+                framework.logger.info(f'Waiting for memory to run {design}.{step}'
+                                      + (' alone' if alone else f', expected to need '
+                                         f'{estimate / 1024**3:.1f} GB'))
+                waiting = True
+            time.sleep(POLL_INTERVAL)
+        yield
+    finally:
+        release(framework, key)
+
+def is_oom(returncode, lines):
+    """
+    Check whether a command failed because it ran out of memory
+
+    :param returncode: exit status of the command
+    :type returncode: int
+    :param lines: the output lines of the command
+    :type lines: list[str]
+
+    :return: True if the command was killed with SIGKILL or reported that
+             it could not allocate memory
+    :rtype: bool
+    """
+    if returncode == 0:
+        return False
+    return returncode in OOM_RETURNCODES or any(OOM_REGEX.search(line) for line in lines)
@@ -0,0 +1,155 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Partitioning of the CPU cores between the tools that run at the same time
+
+When designs or steps run in parallel, the multithreaded engines of the
+formal tools would otherwise compete for all the cores of the machine. With
+CPU affinity enabled (see :meth:`fvm.FvmFramework.set_cpu_affinity`), the
+cores available to FVM are split into as many disjoint partitions as tools
+may run at the same time (``jobs * step_jobs``, with each partition,
+variant or engine mix of the prove step counting as one more step), and each local tool
+runs pinned to a free partition. Partitions are taken from a single NUMA node
+when possible, so the threads of a tool share their memory controller.
+
+The partitions are held with lock files in ``<outdir>/.cpus``, so they are
+shared by all the threads and worker processes of an execution. The number
+of cores of each partition is also passed to the tools as their number of
+parallel engines.
+"""
+import os
+import glob
+import fcntl
+from contextlib import contextmanager
+
+from fvm import parallel
+
+CPUS_DIR = '.cpus'
+NODES_DIR = '/sys/devices/system/node'
+
+def parse_cpulist(cpulist):
+    """
+    Parse a list of CPUs in the format used by Linux, such as ``0-3,8-11``
+
+    :param cpulist: the list of CPUs
+    :type cpulist: str
+
+    :return: the CPU numbers
+    :rtype: list[int]
+    """
+    cpus = []
+    for item in cpulist.strip().split(','):
+        if item == '':
+            continue
+        first, _, last = item.partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+def get_nodes():
+    """Returns the CPUs of each NUMA node, as a list of lists, or an empty
+    list if the NUMA topology is not known"""
+    nodes = []
+    for node_dir in sorted(glob.glob(os.path.join(NODES_DIR, 'node[0-9]*')),
+                           key=lambda name: int(name.rsplit('node', 1)[1])):
+        try:
+            with open(os.path.join(node_dir, 'cpulist'), 'r', encoding='utf-8') as f:
+                nodes.append(parse_cpulist(f.read()))
+        except (OSError, ValueError):
+            return []
+    return nodes
+
+def get_concurrency(framework):
+    """Returns the maximum number of tools that may run at the same time"""
+    # The prove step runs one tool per partition, or per variant when it
+    # runs a portfolio, and one per engine mix when it escalates
+    escalation = framework.prove_escalation or {'engines': []}
+    prove_tools = max(framework.prove_partitions, len(framework.portfolios.get('prove', [])),
+                      len(escalation['engines']))
+    tools_per_job = framework.step_jobs + prove_tools - 1
+    return max(1, min(framework.jobs, len(parallel.get_jobs(framework)))) * tools_per_job
+
+def get_partitions(framework):
+    """
+    Split the available CPUs into one partition per tool that may run at the
+    same time
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: the CPUs of each partition, or an empty list if CPU affinity is
+             disabled, only one tool runs at a time or there are not enough
+             CPUs
+    :rtype: list[list[int]]
+    """
+    count = get_concurrency(framework)
+    if not framework.cpu_affinity or count == 1 or not hasattr(os, 'sched_getaffinity'):
+        return []
+    cpus = sorted(os.sched_getaffinity(0))
+    size = len(cpus) // count
+    if size == 0:
+        return []
+    # Fill each NUMA node with whole partitions first, and only mix the cores
+    # left over in each node when there are not enough whole partitions
+    nodes = [[cpu for cpu in node if cpu in cpus] for node in get_nodes()]
+    if sum(len(node) for node in nodes) != len(cpus):
+        nodes = [cpus]
+    partitions = []
+    leftover = []
+    for node in nodes:
+        while len(node) >= size and len(partitions) < count:
+            partitions.append(node[:size])
+            node = node[size:]
+        leftover.extend(node)
+    while len(partitions) < count:
+        partitions.append(leftover[:size])
+        leftover = leftover[size:]
+    return partitions
+
+def get_engines(framework):
+    """Returns the number of cores of each partition, which is the number of
+    parallel engines that each tool should use, or None if the tools are not
+    pinned to partitions"""
+    partitions = get_partitions(framework)
+    if not partitions:
+        return None
+    return len(partitions[0])
+
+@contextmanager
+def partition(framework, pin=True):
+    """
+    Hold a free CPU partition while running a tool
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param pin: False if the tool must not be pinned, for example because
+                it runs alone or in another host
+    :type pin: bool
+
+    :return: the CPUs of the partition, or None if the tool must not be
+             pinned (because there are no partitions or all of them are in
+             use)
+    :rtype: list[int] or None
+    """
+    partitions = get_partitions(framework) if pin else []
+    lock_file = None
+    cpus = None
+    if partitions:
+        partitions_dir = os.path.join(framework.outdir, CPUS_DIR)
+        os.makedirs(partitions_dir, exist_ok=True)
+        for index, candidate_cpus in enumerate(partitions):
+            candidate = open(os.path.join(partitions_dir, f'{index}.lock'), 'w',
+                             encoding='utf-8')
+            try:
+                fcntl.flock(candidate, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                candidate.close()
+                continue
+            lock_file = candidate
+            cpus = candidate_cpus
+            break
+    try:
+        yield cpus
+    finally:
+        if lock_file is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
@@ -0,0 +1,196 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Archival of previous executions and retention policy for the archives
+
+Previous executions of a design are moved (not copied) to
+``<outdir>/previous_executions/<design>_<timestamp>``, which is instantaneous
+no matter how big the tool databases are. The retention policy, set with
+:meth:`fvm.FvmFramework.set_archive_policy`, limits how many snapshots are
+kept, how old or how big they can be, and whether old snapshots are
+compressed. The same policy applies to ``<outdir>/fvm_history``.
+"""
+import os
+import shutil
+import tarfile
+import threading
+from datetime import datetime
+
+COMPRESSED_EXTENSION = '.tar.gz'
+
+# Background threads that are pruning/compressing archives
+threads = []
+
+def snapshot(framework, current_dir, archive_dir, name):
+    """
+    Move a directory into the archive, keeping a copy of its top-level files
+    (the scripts generated for the steps) in the original place, so they can
+    still be used when skipping the setup
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param current_dir: directory to archive
+    :type current_dir: str
+    :param archive_dir: directory where the snapshots are stored
+    :type archive_dir: str
+    :param name: name of the snapshot, a timestamp will be appended to it
+    :type name: str
+
+    :return: the path of the snapshot
+    :rtype: str
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    timestamp = datetime.now().isoformat()
+    target_dir = os.path.join(archive_dir, f'{name}_{timestamp}')
+    try:
+        os.rename(current_dir, target_dir)
+        os.makedirs(current_dir)
+        for item in os.listdir(target_dir):
+            path = os.path.join(target_dir, item)
+            if os.path.isfile(path):
+                shutil.copy2(path, current_dir)
+    except OSError as e:
+        # Renaming fails if the directories are in different filesystems
+        framework.logger.debug(f'Cannot rename {current_dir} to {target_dir}, copying it: {e}')
+        shutil.copytree(current_dir, target_dir, dirs_exist_ok=True)
+        for item in os.listdir(current_dir):
+            path = os.path.join(current_dir, item)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+    framework.logger.trace(f'Archived {current_dir} to {target_dir}')
+    return target_dir
+
+def get_snapshot_time(entry, name=None):
+    """Returns the datetime of a snapshot from its file name, or None if the
+    entry is not a snapshot (of the specified name, if any)"""
+    if entry.endswith(COMPRESSED_EXTENSION):
+        entry = entry[:-len(COMPRESSED_EXTENSION)]
+    if name is not None:
+        if not entry.startswith(f'{name}_'):
+            return None
+        entry = entry[len(name)+1:]
+    try:
+        return datetime.fromisoformat(entry)
+    except ValueError:
+        return None
+
+def get_size(path):
+    """Returns the size in bytes of a file or a directory tree"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    size = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            filename = os.path.join(root, file)
+            if not os.path.islink(filename):
+                size += os.path.getsize(filename)
+    return size
+
+def remove(path):
+    """Removes a file or a directory tree"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+def compress(framework, path):
+    """Compresses a snapshot directory into a .tar.gz file and removes the
+    directory. The file is written with a temporary name and then renamed,
+    so a compression that is interrupted never leaves a partial snapshot"""
+    tarname = path + COMPRESSED_EXTENSION
+    tmpname = tarname + '.tmp'
+    with tarfile.open(tmpname, 'w:gz') as tar:
+        tar.add(path, arcname=os.path.basename(path))
+    os.rename(tmpname, tarname)
+    shutil.rmtree(path)
+    framework.logger.trace(f'Compressed {path} into {tarname}')
+
+def prune(framework, archive_dir, name=None):
+    """
+    Apply the retention policy to the snapshots in an archive directory
+
+    Snapshots are sorted by their timestamp. The oldest ones are removed if
+    there are more than ``keep``, if they are older than ``max_age_days``, or
+    while the total size is larger than ``max_size_mb``. If ``compress`` is
+    set, all remaining snapshots except the newest one are compressed.
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param archive_dir: directory where the snapshots are stored
+    :type archive_dir: str
+    :param name: only consider the snapshots with this name. If None, all
+                 entries whose name is a timestamp are considered
+    :type name: str or None
+    """
+    policy = framework.archive_policy
+    if not os.path.isdir(archive_dir):
+        return
+
+    # Remove leftovers of interrupted compressions
+    for entry in os.listdir(archive_dir):
+        if entry.endswith('.tmp') and get_snapshot_time(entry[:-len('.tmp')], name) is not None:
+            os.remove(os.path.join(archive_dir, entry))
+
+    snapshots = []
+    for entry in os.listdir(archive_dir):
+        snapshot_time = get_snapshot_time(entry, name)
+        if snapshot_time is not None:
+            snapshots.append((snapshot_time, os.path.join(archive_dir, entry)))
+    # Newest first
+    snapshots.sort(reverse=True)
+
+    kept = []
+    total_size = 0
+    now = datetime.now()
+    for index, (snapshot_time, path) in enumerate(snapshots):
+        expired = False
+        if policy['keep'] is not None and index >= policy['keep']:
+            expired = True
+        if (policy['max_age_days'] is not None and
+                (now - snapshot_time).total_seconds() > policy['max_age_days'] * 86400):
+            expired = True
+        if policy['max_size_mb'] is not None and not expired:
+            total_size += get_size(path)
+            if total_size > policy['max_size_mb'] * 1024 * 1024:
+                expired = True
+        if expired:
+            framework.logger.trace(f'Removing archived {path}')
+            remove(path)
+        else:
+            kept.append(path)
+
+    if policy['compress']:
+        for path in kept[1:]:
+            if os.path.isdir(path):
+                compress(framework, path)
+
+def prune_in_background(framework, archive_dir, name=None):
+    """
+    Apply the retention policy to an archive directory without blocking the
+    caller. Worker processes (see :mod:`fvm.parallel`) prune synchronously,
+    since they may exit as soon as their job is finished
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param archive_dir: directory where the snapshots are stored
+    :type archive_dir: str
+    :param name: only consider the snapshots with this name
+    :type name: str or None
+    """
+    policy = framework.archive_policy
+    if all(value in (None, False) for value in policy.values()):
+        return
+    if framework.is_worker:
+        prune(framework, archive_dir, name)
+        return
+    # Not a daemon thread: the interpreter waits for it before exiting, so
+    # archives are never left half-compressed
+    thread = threading.Thread(target=prune, args=(framework, archive_dir, name),
+                              name=f'prune {archive_dir}')
+    thread.start()
+    threads.append(thread)
+
+def wait():
+    """Wait until all background pruning has finished"""
+    while threads:
+        threads.pop().join()
@@ -20,6 +20,34 @@ def create_parser():
             help='If set, run the specified step. If unset, run all steps. (default: %(default)s)')
     parser.add_argument('-c', '--cont', default=False, action='store_true',
             help='Continue with next steps even if errors are detected. (default: %(default)s)')
+    parser.add_argument('-j', '--jobs', default=1, type=int,
+            help='Number of designs/configurations to run in parallel. (default: %(default)s)')
+    parser.add_argument('--step-jobs', default=1, type=int,
+            help='Number of independent steps of each design to run concurrently. (default: %(default)s)')
+    parser.add_argument('--prove-partitions', default=1, type=int,
+            help='Split the assert and cover directives of the PSL files into PROVE_PARTITIONS groups and prove them in parallel. (default: %(default)s)')
+    parser.add_argument('--bughunt', default=False, action='store_true',
+            help='Run a short bug-hunting pass over all the properties before the prove step, and only prove the properties it does not decide. (default: %(default)s)')
+    parser.add_argument('--fail-fast', default=False, action='store_true',
+            help='Run the bug-hunting pass before the prove step, and skip the prove step if any assertion fires. (default: %(default)s)')
+    parser.add_argument('--escalation-budget', default=None,
+            help='Prove again the properties that are inconclusive after the prove step, with increasing timeouts, for up to ESCALATION_BUDGET (for example 2h). (default: %(default)s)')
+    parser.add_argument('--session', default=False, action='store_true',
+            help='Run the lint, friendliness, rulecheck, xverify, reachability, resets and clocks steps of each design in a single qverify session. (default: %(default)s)')
+    parser.add_argument('--no-cpu-affinity', default=False, action='store_true',
+            help='Do not pin the tools that run at the same time to disjoint sets of CPU cores. (default: %(default)s)')
+    parser.add_argument('--executor', default=None,
+            help='Where to run the tools: "local", "ssh:HOST", "submit:TEMPLATE", where TEMPLATE is a submission command for a batch scheduler that includes {script}, or "queue:DIR", to run them in "fvm worker DIR" processes. Overrides the FVM_EXECUTOR environment variable. (default: local)')
+    parser.add_argument('--executor-cancel', default=None,
+            help='Command that cancels a submitted job, which may include {name}. Overrides the FVM_EXECUTOR_CANCEL environment variable. (default: %(default)s)')
+    parser.add_argument('--cache', default=False, action='store_true',
+            help='Restore the results of steps whose inputs have not changed since they last passed, instead of running them again. (default: %(default)s)')
+    parser.add_argument('--sample-interval', default=None, type=float,
+            help='Write the CPU, memory and thread count of the tools to a time series every SAMPLE_INTERVAL seconds. (default: %(default)s)')
+    parser.add_argument('--profile', default=False, action='store_true',
+            help='Profile FVM itself, writing a per-phase report and cProfile statistics to the output directory. (default: %(default)s)')
+    parser.add_argument('--profile-memory', default=False, action='store_true',
+            help='Same as --profile, but also trace memory allocations. (default: %(default)s)')
     parser.add_argument('-v', '--verbose', default=False, action='store_true',
             help='Show full tool outputs. (default: %(default)s)')
     parser.add_argument('-q', '--quiet', default=False, action='store_true',
@@ -28,6 +56,8 @@ def create_parser():
             help='Only list available methodology steps, but do not execute them. (default: %(default)s)')
     parser.add_argument('-o', '--outdir', default = "fvm_out",
             help='Output directory. (default: %(default)s)')
+    parser.add_argument('--plan', default=False, action='store_true',
+            help='Only show the jobs and steps that would run, and estimate their duration, memory and license use from previous executions. (default: %(default)s)')
     parser.add_argument('-g', '--gui', default=False, action='store_true',
             help='Show tool results with GUI after tool execution. (default: %(default)s)')
     parser.add_argument('-n', '--guinorun', default=False, action='store_true',
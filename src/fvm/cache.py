@@ -0,0 +1,209 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Step result cache
+
+When the cache is enabled, the inputs of each step are hashed into a key. If
+a step passed in a previous run with the same key, its results, logs and
+output directory are restored from the cache instead of running the tools
+again. Only steps that passed are stored, so steps that failed (maybe
+because of a transient problem, such as a license error) are always run
+again.
+
+Entries are stored in ``<outdir>/fvm_cache/<key>``, with the results of the
+step in a ``result.json`` file and a copy of the step output directory.
+
+If the versions of the tools cannot be found, the cache is not used, since
+the results of other versions could be restored.
+"""
+import os
+import json
+import shutil
+import hashlib
+
+from fvm import helpers
+from fvm.toolchains import toolchains
+
+CACHE_DIR = 'fvm_cache'
+
+def get_key(framework, design, step, path, parent_key=None):
+    """
+    Get the cache key for a step of a design
+
+    The key is a hash of everything that may affect the results of the step:
+    the sources (HDL, PSL and drom) and their contents, the generics, tool
+    flags, reset initialization, blackboxes, cutpoints, clocks and resets,
+    the versions of FVM, the toolchain and its tools, and the script of the
+    step, if there is one
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: name of the design (or design.config)
+    :type design: str
+    :param step: name of the step (or step.post_step)
+    :type step: str
+    :param path: path of the design output directory
+    :type path: str
+    :param parent_key: for post_steps, the key of their step, since they use
+                       its results, and for steps that depend on other steps
+                       (such as prove on bughunt), the keys of those steps
+    :type parent_key: str or None
+
+    :return: the cache key, or None if the toolchain-specific inputs, such as
+             the tool versions, cannot be found
+    :rtype: str or None
+    """
+    inputs = toolchains.get_cache_key_inputs(framework, framework.toolchain)
+    if inputs is None:
+        return None
+    items = [framework.version, framework.toolchain, design, step, parent_key,
+             framework.vhdlstd, framework.generic_args, framework.tool_flags,
+             framework.init_reset, framework.resets, framework.clocks,
+             framework.reset_domains, framework.clock_domains,
+             framework.blackboxes, framework.blackbox_instances, framework.cutpoints,
+             framework.disabled_coverage, framework.libraries_from_hdl_sources,
+             framework.prove_partitions, framework.portfolios, framework.prove_escalation,
+             framework.bughunt]
+    items += inputs
+    for sources in [framework.vhdl_sources, framework.verilog_sources,
+                    framework.systemverilog_sources]:
+        items += [(src, helpers.file_digest(src)) for src in sources]
+    for source in framework.psl_sources + framework.drom_sources:
+        items.append((source['file'], source['flavor'], source['library'],
+                      helpers.file_digest(source['file'])))
+
+    # Scripts of the step, such as <step>.do
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            filename = os.path.join(path, name)
+            if os.path.splitext(name)[0] == step and os.path.isfile(filename):
+                items.append((name, helpers.file_digest(filename)))
+
+    key = hashlib.sha256(repr(items).encode('utf-8')).hexdigest()
+    framework.logger.trace(f'Cache key for {design}.{step}: {key}')
+    return key
+
+def get_entry_path(framework, key):
+    """Returns the directory where the cache entry for a key is stored"""
+    return os.path.join(framework.outdir, CACHE_DIR, key)
+
+def restore(framework, design, step, path, key):
+    """
+    Restore a step from the cache, if there is an entry for its key
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: name of the design (or design.config)
+    :type design: str
+    :param step: name of the step (or step.post_step)
+    :type step: str
+    :param path: path of the design output directory
+    :type path: str
+    :param key: the cache key of the step
+    :type key: str
+
+    :return: The same tuple returned by the run function of the step
+             (run_stdout, run_stderr, stdout_err, stderr_err, status), or
+             None if the step is not in the cache
+    :rtype: tuple[str, str, int, int, str] or None
+    """
+    entry = get_entry_path(framework, key)
+    result_file = os.path.join(entry, 'result.json')
+    if not os.path.exists(result_file):
+        return None
+
+    with open(result_file, 'r', encoding='utf-8') as f:
+        cached = json.load(f)
+
+    step_dir = os.path.join(entry, 'output')
+    if os.path.isdir(step_dir):
+        shutil.copytree(step_dir, os.path.join(path, step), dirs_exist_ok=True)
+
+    framework.results[design][step] = cached['results']
+    framework.results[design][step]['cached'] = True
+    framework.logger.success(f'{design}.{step} restored from cache entry {entry}')
+    return (cached['run_stdout'], cached['run_stderr'], 0, 0, cached['status'])
+
+def store(framework, design, step, path, key, run_result):
+    """
+    Store a step in the cache. Only steps that passed are stored
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: name of the design (or design.config)
+    :type design: str
+    :param step: name of the step (or step.post_step)
+    :type step: str
+    :param path: path of the design output directory
+    :type path: str
+    :param key: the cache key of the step
+    :type key: str
+    :param run_result: the tuple returned by the run function of the step
+    :type run_result: tuple[str, str, int, int, str]
+    """
+    run_stdout, run_stderr, stdout_err, stderr_err, status = run_result
+    if stdout_err or stderr_err or status != 'pass' or framework.ctrl_c_pressed:
+        return
+
+    cached = {'results': framework.results[design][step],
+              'run_stdout': run_stdout,
+              'run_stderr': run_stderr,
+              'status': status}
+    try:
+        content = json.dumps(cached)
+    except (TypeError, ValueError) as e:
+        framework.logger.debug(f'Cannot store {design}.{step} in cache: {e}')
+        return
+
+    # Write into a temporary directory and rename it, so entries that are
+    # being written are never seen as valid
+    entry = get_entry_path(framework, key)
+    tmp_entry = f'{entry}.tmp.{os.getpid()}'
+    if os.path.exists(tmp_entry):
+        shutil.rmtree(tmp_entry)
+    os.makedirs(tmp_entry)
+    step_dir = os.path.join(path, step)
+    if os.path.isdir(step_dir):
+        shutil.copytree(step_dir, os.path.join(tmp_entry, 'output'))
+    with open(os.path.join(tmp_entry, 'result.json'), 'w', encoding='utf-8') as f:
+        f.write(content)
+    try:
+        os.rename(tmp_entry, entry)
+        framework.logger.debug(f'{design}.{step} stored in cache entry {entry}')
+    except OSError:
+        # Another job stored the same entry in the meantime
+        shutil.rmtree(tmp_entry)
+
+def run_cached(framework, design, step, path, run, parent_key=None):
+    """
+    Run a step through the cache: restore it if it is in the cache, or run it
+    and store its results otherwise
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: name of the design (or design.config)
+    :type design: str
+    :param step: name of the step (or step.post_step)
+    :type step: str
+    :param path: path of the design output directory
+    :type path: str
+    :param run: the run function of the step
+    :type run: function
+    :param parent_key: for post_steps, the key of their step, and for steps
+                       with dependencies, the keys of their dependencies
+    :type parent_key: str or None
+
+    :return: A tuple with the result of the run function of the step, and
+             the cache key, which is None if the cache could not be used
+    :rtype: tuple[tuple[str, str, int, int, str], str or None]
+    """
+    key = get_key(framework, design, step, path, parent_key)
+    if key is None:
+        framework.logger.warning(f'Cannot find the versions of the tools, not using the '
+                                 f'cache for {design}.{step}')
+        return run(framework, path), None
+    run_result = restore(framework, design, step, path, key)
+    if run_result is None:
+        run_result = run(framework, path)
+        store(framework, design, step, path, key, run_result)
+    return run_result, key
@@ -0,0 +1,50 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""The ``fvm`` command-line tool
+
+Designs are verified by running their ``formal.py`` scripts. The ``fvm``
+command provides auxiliary commands, such as ``fvm worker``, which runs the
+jobs of a queue directory (see :mod:`fvm.workqueue`).
+"""
+import sys
+import argparse
+
+from loguru import logger
+
+from fvm import workqueue
+from fvm.framework import LOGFORMAT
+
+def create_parser():
+    """Create the parser of the fvm command-line arguments"""
+    parser = argparse.ArgumentParser(prog='fvm',
+            description='Auxiliary commands of the FVM, a Formal Verification Methodology. '
+                        'To verify a design, run its formal.py script')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    worker = subparsers.add_parser('worker',
+            help='Run the jobs that FVM puts in a queue directory, set with --executor queue:DIR')
+    worker.add_argument('queue_dir',
+            help='Queue directory, which must be in a filesystem shared with FVM')
+    worker.add_argument('-j', '--jobs', default=1, type=int,
+            help='Number of jobs to run at the same time. (default: %(default)s)')
+    worker.add_argument('--max-jobs', default=None, type=int,
+            help='Exit after running MAX_JOBS jobs. (default: %(default)s)')
+    worker.add_argument('--idle-timeout', default=None, type=float,
+            help='Exit after IDLE_TIMEOUT seconds without jobs. (default: %(default)s)')
+    return parser
+
+def main(cli_args=None):
+    """main() function of the fvm command-line tool"""
+    parser = create_parser()
+    args = parser.parse_args(cli_args)
+    logger.remove()
+    logger.add(sys.stderr, format=LOGFORMAT)
+    if args.command == 'worker':
+        if args.jobs < 1:
+            parser.error(f'--jobs must be at least 1, not {args.jobs}')
+        workqueue.work(args.queue_dir, jobs=args.jobs, max_jobs=args.max_jobs,
+                       idle_timeout=args.idle_timeout)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
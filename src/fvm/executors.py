@@ -0,0 +1,217 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Executors that decide where the tool commands run
+
+By default, the tools run in the local machine. They can also run in another
+host through ``ssh``, or be submitted to a batch scheduler (Slurm, LSF, SGE,
+PBS...) through a command template. The executor is selected with the
+``--executor`` command-line argument, the ``FVM_EXECUTOR`` environment
+variable or :meth:`fvm.FvmFramework.set_executor`, with one of these values:
+
+- ``local``: run the commands in the local machine
+- ``ssh:<host>``: run the commands in ``<host>`` through ``ssh``
+- ``submit:<template>``: run the submission command in ``<template>``, for
+  example ``submit:srun --job-name {name} sh {script}`` or
+  ``submit:sbatch --wait -J {name} -o {log} {script}``
+- ``queue:<dir>``: put the commands in a queue directory, from where they
+  are run by ``fvm worker <dir>`` processes (see :mod:`fvm.workqueue`)
+
+In the remote executors, each command is written to a job script, which
+changes to the working directory of the command, exports the environment
+variables set by FVM and saves the exit status of the command to a file,
+which is used instead of the exit status of ``ssh`` or of the submission
+command. The output directory must be in a filesystem shared with the
+remote hosts.
+
+The following fields are replaced in the submission template:
+
+- ``{script}``: path of the job script
+- ``{name}``: name of the job
+- ``{log}``: path of the file where the job writes its output. If the
+  template includes it, the file is followed while the job runs
+- ``{cwd}``: working directory of the command
+
+When a remote command is interrupted (by Ctrl+C or when its deadline
+expires), ``ssh`` or the submission command is interrupted, and a cancel
+command is also run. For ``ssh``, the process group of the job is killed in
+the remote host. Queued jobs are removed from the queue or stopped by their
+worker. For submitted jobs, the cancel command is a template set
+with ``--executor-cancel`` or ``FVM_EXECUTOR_CANCEL``, such as
+``scancel --name {name}`` or ``bkill -J {name}``.
+"""
+import os
+import re
+import sys
+import json
+import shlex
+import socket
+import itertools
+
+EXECUTORS = ['local', 'ssh', 'submit', 'queue']
+DEFAULT_EXECUTOR = 'local'
+
+# Seconds to wait for the status file of a job after its submission command
+# has finished, since shared filesystems may take a while to show it
+STATUS_WAIT = 10
+
+# Seconds between reads of the output file of a job, when following it
+POLL_INTERVAL = 0.2
+
+# Options for ssh, so it fails instead of asking for passwords
+SSH_OPTIONS = ['-o', 'BatchMode=yes']
+
+# Job numbers, to give each job a unique name
+job_numbers = itertools.count(1)
+
+def get_executor():
+    """
+    Get the executor from the ``FVM_EXECUTOR`` and ``FVM_EXECUTOR_CANCEL``
+    environment variables. If they are not set, the local executor is used
+
+    :return: a tuple (executor, cancel template)
+    :rtype: tuple[str, str or None]
+    """
+    return os.getenv('FVM_EXECUTOR', DEFAULT_EXECUTOR), os.getenv('FVM_EXECUTOR_CANCEL')
+
+def parse_executor(spec, cancel=None):
+    """
+    Parse an executor specification
+
+    :param spec: ``local``, ``ssh:<host>``, ``submit:<template>`` or
+                 ``queue:<dir>``
+    :type spec: str
+    :param cancel: template of the command that cancels a submitted job
+    :type cancel: str or None
+
+    :return: a dict with the ``kind`` of executor, and its ``host``, its
+             ``template`` and ``cancel`` template or its queue ``dir``, or
+             None if the specification is not valid
+    :rtype: dict or None
+    """
+    if not isinstance(spec, str):
+        return None
+    kind, _, argument = spec.partition(':')
+    if kind == 'local' and argument == '':
+        return {'kind': 'local'}
+    if kind == 'ssh' and argument.strip() != '':
+        return {'kind': 'ssh', 'host': argument.strip()}
+    if kind == 'queue' and argument.strip() != '':
+        return {'kind': 'queue', 'dir': os.path.abspath(argument.strip())}
+    if kind == 'submit' and '{script}' in argument:
+        try:
+            format_template(argument, {'script': '', 'name': '', 'log': '', 'cwd': ''})
+            if cancel is not None:
+                format_template(cancel, {'name': ''})
+        except (KeyError, IndexError, ValueError):
+            return None
+        return {'kind': 'submit', 'template': argument, 'cancel': cancel}
+    return None
+
+def format_template(template, fields):
+    """Split a command template as a shell would, and replace its fields"""
+    return [argument.format(**fields) for argument in shlex.split(template)]
+
+def write_job_script(job, cmd, cwd, env):
+    """Write the job script of a remote command"""
+    lines = ['#!/bin/sh',
+             f'echo $$ > {shlex.quote(job["pid"])}',
+             f'cd {shlex.quote(cwd)} || exit 1']
+    # Only the variables that FVM sets are exported, the rest are inherited
+    # from the remote environment
+    for name, value in sorted(env.items()):
+        if os.environ.get(name) != value and re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', name):
+            lines.append(f'export {name}={shlex.quote(value)}')
+    lines.append(shlex.join(cmd))
+    lines.append('status=$?')
+    lines.append(f'echo $status > {shlex.quote(job["status"])}')
+    lines.append('exit $status')
+    with open(job['script'], 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.chmod(job['script'], 0o755)
+
+def prepare(executor, cmd, cwd, env, jobdir, name):
+    """
+    Prepare a command to run with an executor
+
+    :param executor: the executor, as returned by :func:`parse_executor`
+    :type executor: dict
+    :param cmd: the command and its arguments
+    :type cmd: list[str]
+    :param cwd: working directory of the command
+    :type cwd: str or None
+    :param env: environment of the command
+    :type env: dict
+    :param jobdir: directory where the job files are written
+    :type jobdir: str
+    :param name: base name of the job files and the job
+    :type name: str
+
+    :return: None for the local executor, or a dict with the local
+             ``command`` that runs the job, its ``name``, the paths of its
+             ``script``, ``status``, ``pid`` and ``log`` files (``log`` is
+             None if the output of the job is not written to a file) and the
+             executor
+    :rtype: dict or None
+    """
+    if executor['kind'] == 'local':
+        return None
+    os.makedirs(jobdir, exist_ok=True)
+    number = next(job_numbers)
+    basename = os.path.abspath(os.path.join(jobdir, f'{name}.{number}'))
+    # Job names must be unique in the scheduler or queue, which may be shared
+    # by several FVM executions
+    job = {'name': f'fvm.{name}.{socket.gethostname()}.{os.getpid()}.{number}',
+           'script': f'{basename}.job.sh',
+           'status': f'{basename}.job.status',
+           'pid': f'{basename}.job.pid',
+           'log': None,
+           'executor': executor}
+    # Remove the files of previous executions, so they are not mistaken for
+    # the results of this one
+    for filename in [job['status'], job['pid'], f'{basename}.job.log']:
+        if os.path.exists(filename):
+            os.remove(filename)
+    write_job_script(job, cmd, os.path.abspath(cwd or os.getcwd()), env)
+
+    if executor['kind'] == 'ssh':
+        # setsid makes the job script the leader of its own process group, so
+        # the whole job can be killed when cancelling it
+        job['command'] = ['ssh', *SSH_OPTIONS, executor['host'], 'setsid', 'sh',
+                          shlex.quote(job['script'])]
+    elif executor['kind'] == 'queue':
+        job['log'] = f'{basename}.job.log'
+        queued = {key: job[key] for key in ['name', 'script', 'log', 'status']}
+        job['command'] = [sys.executable, '-m', 'fvm.workqueue', executor['dir'],
+                          json.dumps(queued)]
+    else:
+        if '{log}' in executor['template']:
+            job['log'] = f'{basename}.job.log'
+        job['command'] = format_template(executor['template'],
+                                         {'script': job['script'], 'name': job['name'],
+                                          'log': job['log'] or '',
+                                          'cwd': os.path.abspath(cwd or os.getcwd())})
+    return job
+
+def get_cancel_command(job):
+    """Returns the command that cancels a remote job, or None if there is no
+    way to cancel it"""
+    executor = job['executor']
+    if executor['kind'] == 'ssh':
+        try:
+            with open(job['pid'], 'r', encoding='utf-8') as f:
+                pid = int(f.read())
+        except (OSError, ValueError):
+            return None
+        return ['ssh', *SSH_OPTIONS, executor['host'], 'kill', '-INT', '--', f'-{pid}']
+    if executor.get('cancel'):
+        return format_template(executor['cancel'], {'name': job['name']})
+    return None
+
+def read_status(job):
+    """Returns the exit status saved by a job, or None if it was not saved"""
+    try:
+        with open(job['status'], 'r', encoding='utf-8') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
@@ -9,15 +9,15 @@ Framework to run formal verification tools on VHDL designs
 # Python standard library imports
 import sys
 import os
-import re
 import glob
 import shutil
 import time
-import subprocess
 import pathlib
 import fnmatch
 import signal
 import threading
+import queue
+import functools
 from datetime import datetime
 from io import StringIO
 from shlex import join
@@ -25,16 +25,34 @@ from shlex import join
 # Third party imports
 import argparse
 from loguru import logger
-from rich.console import Console
 
 # Our own imports
 from fvm import argument_parser
 from fvm import logcounter
 from fvm import helpers
-from fvm import reports
+from fvm import parallel
+from fvm import scheduler
+from fvm import cache
+from fvm import linecheck
+from fvm import archive
+from fvm import runner
+from fvm import executors
+from fvm import licenses
+from fvm import admission
+from fvm import affinity
+from fvm import history
+from fvm import resources
+from fvm import profiling
+from fvm import timeline
 from fvm.steps import Steps
 from fvm.toolchains import toolchains
-from fvm.drom2psl.generator import generator
+
+# Heavy modules that are only needed after the tools have run (reports),
+# when there are drom2psl sources (generator) or with --plan (planner) are
+# imported lazily, so starting FVM is fast
+reports = helpers.lazy_import('fvm.reports')
+drom2psl_generator = helpers.lazy_import('fvm.drom2psl.generator')
+planner = helpers.lazy_import('fvm.planner')
 
 # Error codes
 # Error codes 1 and 2 are reserved: 1 is the default error code in unix shells,
@@ -50,6 +68,13 @@ CHECK_FAILED = {"msg": "FVM exit condition: check_for_errors failed",
 KEYBOARD_INTERRUPT = {"msg": "FVM exit condition: Keyboard interrupt",
                 "value": 7}
 
+# Minimum time, in seconds, that the tools are given after the timeout of a
+# step to finish and report their results before they are interrupted
+DEADLINE_GRACE = 60
+
+# Timeout of the bughunt step, if none is set
+DEFAULT_BUGHUNT_TIMEOUT = '5m'
+
 # Log formats
 LOGFORMAT = '<cyan>FVM</cyan> | <green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <level>{message}</level>'
 LOGFORMAT_SUMMARY = '<cyan>FVM</cyan> | <green>Summary</green> | <level>{level: <8}</level> | <level>{message}</level>'
@@ -59,11 +84,15 @@ def getlogformattool(design, step, tool):
     """Get the log format for tool messages"""
     return f'<cyan>{step}</cyan><green>({tool})</green> | ' + '<level>{level: <8}</level> | <level>{message}</level>'
 
-# Create a rich console object
-# For CI systems that support colors but where we don't want any interactivity
-# (such as gitlab-ci), we set force_terminal to True and force_interactive to
-# False
-console = Console(force_terminal=True, force_interactive=False)
+@functools.lru_cache(maxsize=None)
+def get_console():
+    """Returns the rich console object, creating it the first time"""
+    # Imported here because rich is slow to import
+    from rich.console import Console
+    # For CI systems that support colors but where we don't want any
+    # interactivity (such as gitlab-ci), we set force_terminal to True and
+    # force_interactive to False
+    return Console(force_terminal=True, force_interactive=False)
 
 class FvmFramework:
     """This class defines the FVM framework"""
@@ -85,11 +114,22 @@ class FvmFramework:
         self.verbose = args.verbose
         self.quiet = args.quiet
         self.list = args.list
+        self.plan = args.plan
         self.outdir = args.outdir
         self.resultsdir = os.path.join(self.outdir, 'fvm_results')  # For the .xml results
         self.design = args.design
         self.step = args.step
         self.cont = args.cont
+        self.cache = args.cache
+        self.cache_keys = {}
+        self.jobs = args.jobs
+        self.step_jobs = args.step_jobs
+        self.cpu_affinity = not args.no_cpu_affinity
+        self.session = args.session
+        self.prove_partitions = args.prove_partitions
+        self.sample_interval = args.sample_interval
+        self.profile = args.profile or args.profile_memory
+        self.profile_memory = args.profile_memory
         self.gui = args.gui
         self.guinorun = args.guinorun
         self.show = args.show
@@ -110,6 +150,10 @@ class FvmFramework:
         # Create logger counter
         self.log_counter = logcounter.LogCounter()
 
+        # Steps may run concurrently in different threads, each one of them
+        # with its own log format, so the format is stored per thread
+        self.thread_logformat = threading.local()
+
         # Clean logger format and handlers
         self.logger.remove()
 
@@ -119,7 +163,7 @@ class FvmFramework:
         self.logger.add(self.log_counter, level=0)
 
         # Get log messages also in stderr. Only print format
-        self.logger.add(sys.stderr, level=self.loglevel, format=LOGFORMAT)
+        self.logger.add(sys.stderr, level=self.loglevel, format=self.get_logformat)
 
         # Log the creation of the framework object
         self.logger.trace(f'Creating {self}')
@@ -183,6 +227,33 @@ class FvmFramework:
         self.designs = []
         self.design_configs = {}
         self.ctrl_c_pressed = False
+        self.archive_policy = {'keep': None, 'max_age_days': None, 'max_size_mb': None,
+                               'compress': False}
+        # Parallel execution: is_worker is set in the worker processes
+        self.is_worker = False
+        self.exit_errorcode = None
+        # Wall-clock timeouts in seconds, by step, and deadlines of the steps
+        # that are running, by (design, step)
+        self.timeouts = {}
+        self.deadlines = {}
+        # Variants of the tool flags that race in each step
+        self.portfolios = {}
+        # Timeout and fail-fast mode of the bughunt step, or None if it is
+        # not run
+        self.bughunt = None
+        # Budget, initial timeout, growth factor and engine mixes of the
+        # escalation of the inconclusive targets of the prove step, or None if
+        # they are not escalated
+        self.prove_escalation = None
+        self.executor = {'kind': 'local'}
+        # Maximum number of concurrent jobs of each tool, and how commands
+        # that cannot check out their license are retried
+        self.license_limits = {}
+        self.license_retry = {'retries': 5, 'delay': 30, 'max_delay': 600}
+        # Memory budget for the tools that run at the same time, and the
+        # peak memory expected for each step
+        self.memory_limit = admission.get_available_memory()
+        self.memory_hints = {}
         self.version = helpers.get_fvm_version()
 
         logger.info(f'{self.version=}')
@@ -199,6 +270,8 @@ class FvmFramework:
         self.logger.debug(f'{self.tool_flags=}')
         self.steps = Steps()
         toolchains.define_steps(self, self.steps, self.toolchain)
+        if args.bughunt or args.fail_fast:
+            self.set_bughunt(fail_fast=args.fail_fast)
         self.logger.debug(f'{self.steps=}')
 
         # Exit if args.step is unrecognized
@@ -208,6 +281,20 @@ class FvmFramework:
                                   f'Available steps are: {list(self.steps.steps.keys())}')
                 self.exit_if_required(BAD_VALUE)
 
+        # Exit if args.jobs or args.step_jobs are not valid
+        self.set_jobs(args.jobs)
+        self.set_step_jobs(args.step_jobs)
+        self.set_prove_partitions(args.prove_partitions)
+        if args.escalation_budget is not None:
+            self.set_prove_escalation(args.escalation_budget)
+        self.set_sample_interval(args.sample_interval)
+
+        # The executor set in the command line takes priority over the
+        # environment variables
+        executor, executor_cancel = executors.get_executor()
+        self.set_executor(args.executor or executor,
+                          cancel=args.executor_cancel or executor_cancel)
+
     def set_toolchain(self, toolchain):
         """
         Override the current toolchain selection.
@@ -681,6 +768,13 @@ class FvmFramework:
         :return: True if the tool is found in PATH, False otherwise.
         :rtype: bool
         """
+        # The tools of remote executors are in the remote hosts, which FVM
+        # cannot inspect
+        if self.executor['kind'] != 'local':
+            if not quiet :
+                self.logger.success(f'{tool=} assumed available in the '
+                                    f'{self.executor["kind"]} executor')
+            return True
         path = shutil.which(tool)
         if path is None :
             self.logger.warning(f'{tool=} not found in PATH')
@@ -744,7 +838,8 @@ class FvmFramework:
         an error is logged if any are found.
 
         Certain reserved names are prohibited (``libraries``,
-        ``fvm_dashboard``, ``fvm_results`` and ``fvm_history``) to avoid
+        ``fvm_dashboard``, ``fvm_results``, ``fvm_history`` and
+        ``fvm_cache``) to avoid
         conflicts with framework directories.
 
         If a specific design has already been set with framework
@@ -769,7 +864,8 @@ class FvmFramework:
                 self.toplevel = toplevel
 
         # Disallow clashes with fvm_* directories
-        reserved_directories = ['libraries', 'fvm_dashboard', 'fvm_results', 'fvm_history']
+        reserved_directories = ['libraries', 'fvm_dashboard', 'fvm_results', 'fvm_history',
+                                'fvm_cache']
 
         clashes = set(toplevel).intersection(reserved_directories)
 
@@ -913,6 +1009,549 @@ class FvmFramework:
             self.exit_if_required(BAD_VALUE)
         self.disabled_coverage.append(f'{design}.prove.{covtype}')
 
+    def set_jobs(self, jobs):
+        """
+        Set the number of designs/configurations to run in parallel.
+
+        Each design, and each configuration of a design, is an independent
+        job. When more than one job is allowed, they are run in separate
+        worker processes, and their results are merged when they finish.
+        This is equivalent to the ``-j``/``--jobs`` command-line argument.
+
+        :param jobs: Maximum number of jobs to run at the same time. Must be
+                     an integer greater or equal than 1.
+        :type jobs: int
+        """
+        if not isinstance(jobs, int) or isinstance(jobs, bool) or jobs < 1:
+            self.logger.error(f'Specified {jobs=} must be an integer greater or equal than 1')
+            self.exit_if_required(BAD_VALUE)
+        self.jobs = jobs
+        self.logger.trace(f'{self.jobs=}')
+
+    def set_archive_policy(self, keep=None, max_age_days=None, max_size_mb=None,
+                           compress=False):
+        """
+        Set the retention policy for the archived previous executions.
+
+        Every time a design is run, its previous results are moved to
+        ``<outdir>/previous_executions``, and the previous XML results are
+        moved to ``<outdir>/fvm_history``. By default, all of them are kept
+        forever. This policy, which is applied separately to the archived
+        executions of each design and to ``fvm_history``, removes the oldest
+        ones and optionally compresses the rest. Pruning is done in the
+        background, so it does not delay the execution of the tools.
+
+        :param keep: Maximum number of archived executions to keep. None
+                     means no limit.
+        :type keep: int or None
+        :param max_age_days: Remove archived executions older than this
+                             number of days. None means no limit.
+        :type max_age_days: int or float or None
+        :param max_size_mb: Remove the oldest archived executions while the
+                            total size is larger than this number of
+                            megabytes. None means no limit.
+        :type max_size_mb: int or float or None
+        :param compress: If True, compress all archived executions except
+                         the newest one into ``.tar.gz`` files.
+        :type compress: bool
+        """
+        limits = {'keep': keep, 'max_age_days': max_age_days, 'max_size_mb': max_size_mb}
+        for name, value in limits.items():
+            if value is not None and (isinstance(value, bool) or
+                                      not isinstance(value, (int, float)) or value < 0):
+                self.logger.error(f'Specified {name}={value} must be None or a '
+                                  f'non-negative number')
+                self.exit_if_required(BAD_VALUE)
+        if not isinstance(compress, bool):
+            self.logger.error(f'Specified {compress=} must be a boolean')
+            self.exit_if_required(BAD_VALUE)
+        self.archive_policy = {**limits, 'compress': compress}
+        self.logger.trace(f'{self.archive_policy=}')
+
+    def set_cache(self, enabled):
+        """
+        Enable or disable the step result cache.
+
+        When enabled, the inputs of each step (sources and their contents,
+        generics, tool flags, reset initialization, blackboxes, cutpoints,
+        clocks, resets and tool versions) are hashed into a key. If a step
+        already passed with the same key, its logs, summary and status are
+        restored from ``<outdir>/fvm_cache`` instead of running it again.
+        The tool versions are found with the executor of the tools (see
+        :meth:`set_executor`), and if they cannot be found the steps are
+        always run. This is equivalent to the ``--cache`` command-line
+        argument.
+
+        :param enabled: True to enable the cache, False to disable it.
+        :type enabled: bool
+        """
+        if not isinstance(enabled, bool):
+            self.logger.error(f'Specified {enabled=} must be a boolean')
+            self.exit_if_required(BAD_VALUE)
+        self.cache = enabled
+        self.logger.trace(f'{self.cache=}')
+
+    def set_profile(self, enabled, memory=False):
+        """
+        Enable or disable profiling of FVM itself.
+
+        When enabled, the phases of FVM (setup, script generation, drom2psl,
+        log checking, parsers and reports) are timed, the execution is
+        profiled with cProfile, and a per-phase report and the cProfile
+        statistics are written to ``<outdir>/fvm_profile.txt`` and
+        ``<outdir>/fvm_profile.prof``. This is equivalent to the
+        ``--profile`` and ``--profile-memory`` command-line arguments.
+
+        :param enabled: True to enable profiling, False to disable it.
+        :type enabled: bool
+        :param memory: If True, also trace memory allocations with
+                       tracemalloc, which makes FVM slower.
+        :type memory: bool
+        """
+        if not isinstance(enabled, bool) or not isinstance(memory, bool):
+            self.logger.error(f'Specified {enabled=} and {memory=} must be booleans')
+            self.exit_if_required(BAD_VALUE)
+        self.profile = enabled or memory
+        self.profile_memory = memory
+        self.logger.trace(f'{self.profile=}, {self.profile_memory=}')
+
+    def set_sample_interval(self, interval):
+        """
+        Set the interval for the resource usage time series of the tools.
+
+        When set, the CPU usage, resident memory and number of threads of
+        every process launched by each step (including the helper processes
+        spawned by the tools) are written every ``interval`` seconds to
+        ``<outdir>/<design>/<step>/<step>_resources.csv``, and plotted in
+        ``<step>_resources.html``, which is attached to the dashboard. This
+        is equivalent to the ``--sample-interval`` command-line argument.
+
+        :param interval: Seconds between samples, or None to disable the
+                         time series.
+        :type interval: int or float or None
+        """
+        if interval is not None and (isinstance(interval, bool) or
+                                     not isinstance(interval, (int, float)) or interval <= 0):
+            self.logger.error(f'Specified {interval=} must be None or a positive number')
+            self.exit_if_required(BAD_VALUE)
+        self.sample_interval = interval
+        self.logger.trace(f'{self.sample_interval=}')
+
+    def set_executor(self, executor, cancel=None):
+        """
+        Set where the tools are run.
+
+        By default, the tools run in the local machine. They can also run in
+        another host through ``ssh``, or be submitted to a batch scheduler
+        through a submission command that waits for the job to finish and
+        returns its exit status (such as ``srun``, ``sbatch --wait``,
+        ``bsub -K`` or ``qsub -sync y``). They can also be put in a queue
+        directory, from where they are run by a pool of ``fvm worker <dir>``
+        processes in other machines. The commands run by remote executors
+        are written to job scripts in the output directory, which must be
+        shared with the remote hosts. This is equivalent to the
+        ``--executor`` and ``--executor-cancel`` command-line arguments and
+        to the ``FVM_EXECUTOR`` and ``FVM_EXECUTOR_CANCEL`` environment
+        variables. See :mod:`fvm.executors` for the details.
+
+        Example:
+
+        .. code-block:: python
+
+            fvm.set_executor('ssh:bighost')
+            fvm.set_executor('queue:/shared/fvm_queue')
+            fvm.set_executor('submit:sbatch --wait -J {name} -o {log} {script}',
+                             cancel='scancel --name {name}')
+
+        :param executor: ``local``, ``ssh:<host>``, ``submit:<template>`` or
+                         ``queue:<dir>``, where the template must include
+                         ``{script}`` and may include ``{name}``, ``{log}``
+                         and ``{cwd}``
+        :type executor: str
+        :param cancel: Template of the command that cancels a submitted job
+                       when it is interrupted, which may include ``{name}``
+        :type cancel: str or None
+        """
+        parsed = executors.parse_executor(executor, cancel)
+        if parsed is None:
+            self.logger.error(f'Specified {executor=} with {cancel=} is not valid. Valid '
+                              f'executors are "local", "ssh:<host>", "submit:<template>" and '
+                              f'"queue:<dir>", where the template must include {{script}}')
+            self.exit_if_required(BAD_VALUE)
+        else:
+            self.executor = parsed
+        self.logger.trace(f'{self.executor=}')
+
+    def set_memory_limit(self, limit):
+        """
+        Set the memory budget for the tools that run at the same time.
+
+        When designs or steps run in parallel, a step only starts running
+        its tools while the peak memory expected for all the running steps
+        fits in the budget. The peak memory of a step is predicted from its
+        previous executions, or set with :meth:`set_memory_hint`. A step
+        always starts if nothing else is running. By default, the budget is
+        the available memory of the machine when FVM starts.
+
+        Example:
+
+        .. code-block:: python
+
+            fvm.set_memory_limit('64G')
+
+        :param limit: Memory budget, in bytes or as a string with a unit
+                      (K, M, G or T), or None to not limit the memory.
+        :type limit: int or str or None
+        """
+        if limit is not None:
+            limit_bytes = helpers.size_to_bytes(limit)
+            if limit_bytes is None or limit_bytes == 0:
+                self.logger.error(f'Specified {limit=} must be None, a positive number of '
+                                  f'bytes or a string such as "64G"')
+                self.exit_if_required(BAD_VALUE)
+            limit = limit_bytes
+        self.memory_limit = limit
+        self.logger.trace(f'{self.memory_limit=}')
+
+    def set_memory_hint(self, step, peak_memory):
+        """
+        Set the peak memory that the tools of a step are expected to need.
+
+        It overrides the prediction made from previous executions, and is
+        used to decide when the step can start (see
+        :meth:`set_memory_limit`).
+
+        Example:
+
+        .. code-block:: python
+
+            fvm.set_memory_hint('prove', '24G')
+
+        :param step: Name of the step.
+        :type step: str
+        :param peak_memory: Expected peak memory, in bytes or as a string
+                            with a unit (K, M, G or T).
+        :type peak_memory: int or str
+        """
+        if step not in self.get_steps():
+            self.logger.warning(f"Specified {step=} not in {self.get_steps()}")
+        peak_memory_bytes = helpers.size_to_bytes(peak_memory)
+        if peak_memory_bytes is None:
+            self.logger.error(f'Specified {peak_memory=} must be a number of bytes or a '
+                              f'string such as "24G"')
+            self.exit_if_required(BAD_VALUE)
+        self.memory_hints[step] = peak_memory_bytes
+        self.logger.trace(f'{self.memory_hints=}')
+
+    def set_license_limit(self, tool, limit):
+        """
+        Set the maximum number of jobs of a tool that run at the same time.
+
+        When designs or steps run in parallel, this limits how many license
+        tokens of each feature are used at once. Jobs that exceed the limit
+        wait until a running job of the same tool finishes. The limit is
+        shared by all the designs, steps and worker processes of the
+        execution. For the Questa toolchain, the tools are ``lint``,
+        ``autocheck``, ``xcheck``, ``covercheck``, ``rdc``, ``cdc`` and
+        ``propcheck``.
+
+        Example:
+
+        .. code-block:: python
+
+            fvm.set_license_limit('propcheck', 2)
+
+        :param tool: Name of the tool.
+        :type tool: str
+        :param limit: Maximum number of concurrent jobs, or None to remove
+                      the limit.
+        :type limit: int or None
+        """
+        if not isinstance(tool, str) or tool == '':
+            self.logger.error(f'Specified {tool=} is not a valid tool name')
+            self.exit_if_required(BAD_VALUE)
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int)
+                                  or limit < 1):
+            self.logger.error(f'Specified {limit=} must be None or a positive integer')
+            self.exit_if_required(BAD_VALUE)
+        if limit is None:
+            self.license_limits.pop(tool, None)
+        else:
+            self.license_limits[tool] = limit
+        self.logger.trace(f'{self.license_limits=}')
+
+    def set_license_retry(self, retries=5, delay=30, max_delay=600):
+        """
+        Set how commands that cannot check out their license are retried.
+
+        License checkout failures are detected from the output of the tools
+        and from the FlexLM diagnostics log. Instead of failing the step,
+        the command is run again after waiting ``delay`` seconds, doubling
+        the wait after each failure up to ``max_delay`` seconds, and the
+        step only fails if the license cannot be checked out after
+        ``retries`` retries or before the deadline of the step (see
+        :meth:`set_timeout`).
+
+        :param retries: Maximum number of retries, 0 to not retry.
+        :type retries: int
+        :param delay: Seconds to wait before the first retry.
+        :type delay: int or float
+        :param max_delay: Maximum seconds to wait between retries.
+        :type max_delay: int or float
+        """
+        if isinstance(retries, bool) or not isinstance(retries, int) or retries < 0:
+            self.logger.error(f'Specified {retries=} must be a non-negative integer')
+            self.exit_if_required(BAD_VALUE)
+        for name, value in [('delay', delay), ('max_delay', max_delay)]:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                self.logger.error(f'Specified {name}={value!r} must be a non-negative number')
+                self.exit_if_required(BAD_VALUE)
+        self.license_retry = {'retries': retries, 'delay': delay, 'max_delay': max_delay}
+        self.logger.trace(f'{self.license_retry=}')
+
+    def set_cpu_affinity(self, enabled):
+        """
+        Enable or disable pinning the tools to disjoint sets of CPU cores.
+
+        When designs or steps run in parallel, the CPU cores are split into
+        one partition per tool that may run at the same time, and each tool
+        runs in its own partition, with as many parallel engines as cores in
+        the partition. This is enabled by default, and disabled with the
+        ``--no-cpu-affinity`` command-line argument.
+
+        :param enabled: True to pin the tools, False to let them run in any
+                        core.
+        :type enabled: bool
+        """
+        if not isinstance(enabled, bool):
+            self.logger.error(f'Specified {enabled=} must be True or False')
+            self.exit_if_required(BAD_VALUE)
+        self.cpu_affinity = enabled
+        self.logger.trace(f'{self.cpu_affinity=}')
+
+    def set_session(self, enabled):
+        """
+        Enable or disable session mode.
+
+        In session mode, the steps of a design that do not need the PSL
+        files (lint, friendliness, rulecheck, xverify, reachability, resets
+        and clocks) run back to back in a single qverify session, so the
+        tool is only started once per design. The output of the session is
+        split by step, so each step still has its own log, reports and
+        results. Steps that did not start because the session failed are run
+        on their own. Session mode is not used when a single step is
+        selected, with ``--cache``, with the GUI, when steps run
+        concurrently (see :meth:`set_step_jobs`), when any of those steps
+        has a timeout, or when any of them but the first one has a pre-hook
+        (see :meth:`set_pre_hook`), since the session runs all the tools
+        when the first step starts, before those hooks could run. This is
+        equivalent to the ``--session`` command-line argument.
+
+        :param enabled: True to run the steps in a session, False to run
+                        each step in its own qverify process.
+        :type enabled: bool
+        """
+        if not isinstance(enabled, bool):
+            self.logger.error(f'Specified {enabled=} must be True or False')
+            self.exit_if_required(BAD_VALUE)
+        self.session = enabled
+        self.logger.trace(f'{self.session=}')
+
+    def set_step_jobs(self, step_jobs):
+        """
+        Set the number of steps of a design to run concurrently.
+
+        Steps that do not depend on each other can be run at the same time,
+        while steps that depend on other steps wait for them to finish.
+        Post-steps always run after their step. This is equivalent to the
+        ``--step-jobs`` command-line argument.
+
+        :param step_jobs: Maximum number of steps to run at the same time.
+                          Must be an integer greater or equal than 1.
+        :type step_jobs: int
+        """
+        if not isinstance(step_jobs, int) or isinstance(step_jobs, bool) or step_jobs < 1:
+            self.logger.error(f'Specified {step_jobs=} must be an integer greater or equal than 1')
+            self.exit_if_required(BAD_VALUE)
+        self.step_jobs = step_jobs
+        self.logger.trace(f'{self.step_jobs=}')
+
+    def set_prove_partitions(self, partitions):
+        """
+        Set in how many parallel jobs the prove step runs.
+
+        The assert and cover directives of the PSL files are split into
+        ``partitions`` groups, and each group is proven by its own PropCheck
+        job, with the same assumptions, at the same time as the other groups.
+        The reports of the groups are merged, so the prove step has a single
+        summary, as if it had run in a single job. The prove.formalcover
+        post-step needs the database of a single job, so it is skipped when
+        the prove step is partitioned. Assertions and covers written in the
+        HDL sources are proven by every group. This is equivalent to the
+        ``--prove-partitions`` command-line argument.
+
+        :param partitions: Number of groups, 1 to prove all the targets in a
+                           single job.
+        :type partitions: int
+        """
+        if not isinstance(partitions, int) or isinstance(partitions, bool) or partitions < 1:
+            self.logger.error(f'Specified {partitions=} must be an integer greater or equal than 1')
+            self.exit_if_required(BAD_VALUE)
+        self.prove_partitions = partitions
+        self.logger.trace(f'{self.prove_partitions=}')
+
+    def set_bughunt(self, enabled=True, timeout=None, fail_fast=False):
+        """
+        Enable or disable the bughunt step, a short bug-hunting pass over all
+        the properties that runs before the prove step.
+
+        The bughunt step runs ``formal verify`` with a short timeout, so
+        assertions with shallow counterexamples fire within minutes. Extra
+        flags for this pass, such as a bound or a selection of bug-hunting
+        engines, can be set with ``set_tool_flags('formal verify bughunt',
+        ...)``. In fail-fast mode, the bughunt step fails if any assertion
+        fires, and the prove step is skipped. Otherwise, the prove step only
+        proves the PSL directives that the bughunt step did not decide, and
+        its results include the ones of the bughunt step. If the bughunt step
+        fails for any other reason, such as a tool error, the prove step
+        proves all the targets. This is equivalent to the ``--bughunt`` and
+        ``--fail-fast`` command-line arguments.
+
+        :param enabled: True to run the bughunt step, False to not run it.
+        :type enabled: bool
+        :param timeout: Timeout of the bughunt step, as a string with a
+                        number and a unit (see :meth:`set_timeout`). If None,
+                        the timeout already set for the bughunt step is kept,
+                        or 5 minutes if there is none.
+        :type timeout: str or None
+        :param fail_fast: True to skip the prove step if any assertion
+                          fires in the bughunt step.
+        :type fail_fast: bool
+        """
+        if not isinstance(enabled, bool) or not isinstance(fail_fast, bool):
+            self.logger.error(f'Specified {enabled=} and {fail_fast=} must be True or False')
+            self.exit_if_required(BAD_VALUE)
+        if timeout is None and self.bughunt is not None:
+            timeout = self.bughunt['timeout']
+        elif timeout is None and 'bughunt' in self.timeouts:
+            timeout = f"{self.timeouts['bughunt']:g}s"
+        elif timeout is None:
+            timeout = DEFAULT_BUGHUNT_TIMEOUT
+        if helpers.timeout_to_seconds(timeout) is None:
+            self.logger.error(f'Cannot parse {timeout=}')
+            self.exit_if_required(BAD_VALUE)
+        toolchains.set_bughunt_step(self, self.steps, self.toolchain, enabled, fail_fast)
+        if enabled:
+            self.bughunt = {'timeout': timeout, 'fail_fast': fail_fast}
+            self.timeouts['bughunt'] = helpers.timeout_to_seconds(timeout)
+        else:
+            self.bughunt = None
+            self.timeouts.pop('bughunt', None)
+        self.logger.trace(f'{self.bughunt=}')
+
+    def set_portfolio(self, step, variants):
+        """
+        Set several variants of the verification flags to race in a step.
+
+        Different flags (engine selections, ``-justify_initial_x``,
+        initialization modes...) are faster for different designs. With a
+        portfolio, the design is compiled once and each variant runs at the
+        same time on it, with its flags added to the ones of ``formal
+        verify``. The result of each property is the first conclusive result
+        of any variant, and the variants that are still running are
+        cancelled as soon as all the properties have a conclusive result.
+        The prove.formalcover post-step needs the database of a single run,
+        so it is skipped. Only the prove step supports portfolios, and when
+        it has one it is not split with :meth:`set_prove_partitions`.
+
+        Example:
+
+        .. code-block:: python
+
+            fvm.set_portfolio('prove', ['-engine_mode hp', '-justify_initial_x'])
+
+        :param step: Name of the step.
+        :type step: str
+        :param variants: Flags of each variant, or an empty list to run the
+                         step once.
+        :type variants: list[str]
+        """
+        if step != 'prove':
+            self.logger.error(f'Specified {step=} does not support portfolios, only prove does')
+            self.exit_if_required(BAD_VALUE)
+        if not isinstance(variants, (list, tuple)) or \
+                not all(isinstance(flags, str) for flags in variants):
+            self.logger.error(f'Specified {variants=} must be a list of strings')
+            self.exit_if_required(BAD_VALUE)
+        if variants:
+            self.portfolios[step] = list(variants)
+        else:
+            self.portfolios.pop(step, None)
+        self.logger.trace(f'{self.portfolios=}')
+
+    def set_prove_escalation(self, budget, timeout='10m', factor=2, engines=None):
+        """
+        Prove again the targets that are inconclusive after the prove step,
+        with increasing timeouts, until they are decided or a time budget runs
+        out.
+
+        Each round compiles the design with only the PSL directives that are
+        still inconclusive, and runs one job per engine mix at the same time,
+        each with the flags of ``formal verify`` plus its own flags. The first
+        round has the given timeout, and each round multiplies it by factor,
+        so the hard properties get more time while the easy ones, which were
+        already decided, do not run again. The jobs of a round are cancelled
+        as soon as all its targets are decided, and the last round is
+        shortened so the budget is not exceeded. The results of the prove step
+        include the targets decided by the escalation, and the best result
+        and proof radius of each escalated target are written to
+        ``prove/escalation.json``. Only labelled PSL directives can be
+        escalated. This is equivalent to the ``--escalation-budget``
+        command-line argument.
+
+        Example:
+
+        .. code-block:: python
+
+            fvm.set_prove_escalation('2h', timeout='10m', factor=3,
+                                     engines=['-engine_mode hp', '-justify_initial_x'])
+
+        :param budget: Maximum total time of the escalation, as a string with
+                       a number and a unit (see :meth:`set_timeout`), or None
+                       to not escalate.
+        :type budget: str or None
+        :param timeout: Timeout of the first round, as a string with a number
+                        and a unit.
+        :type timeout: str
+        :param factor: Factor by which the timeout grows in each round. Must
+                       be greater than 1.
+        :type factor: int or float
+        :param engines: Flags of each engine mix, or None to run a single job
+                        per round with the flags of ``formal verify``.
+        :type engines: list[str] or None
+        """
+        if budget is None:
+            self.prove_escalation = None
+            self.logger.trace(f'{self.prove_escalation=}')
+            return
+        if helpers.timeout_to_seconds(budget) is None or helpers.timeout_to_seconds(timeout) is None:
+            self.logger.error(f'Cannot parse {budget=} or {timeout=}')
+            self.exit_if_required(BAD_VALUE)
+        if not isinstance(factor, (int, float)) or isinstance(factor, bool) or factor <= 1:
+            self.logger.error(f'Specified {factor=} must be a number greater than 1')
+            self.exit_if_required(BAD_VALUE)
+        if engines is None:
+            engines = ['']
+        if not isinstance(engines, (list, tuple)) or not engines or \
+                not all(isinstance(flags, str) for flags in engines):
+            self.logger.error(f'Specified {engines=} must be a non-empty list of strings')
+            self.exit_if_required(BAD_VALUE)
+        self.prove_escalation = {'budget': helpers.timeout_to_seconds(budget),
+                                 'timeout': helpers.timeout_to_seconds(timeout),
+                                 'factor': factor,
+                                 'engines': list(engines)}
+        self.logger.trace(f'{self.prove_escalation=}')
+
     def set_timeout(self, step, timeout):
         """
         Set the execution timeout for a specific step.
@@ -923,6 +1562,13 @@ class FvmFramework:
         but does not take into account the tool compilation. Not all steps
         have a timeout, although if they don't, they probably won't take long.
 
+        Besides passing the timeout to the tool, FVM enforces a wall-clock
+        deadline for the whole step, in case the tool does not stop by itself.
+        The deadline is the timeout plus a grace period (10% of the timeout,
+        and at least one minute) so the tool can finish and report its
+        results. When the deadline expires, the tool is interrupted and the
+        step fails.
+
         The timeout should be provided as a string combining a number and a unit:
 
         - ``s`` for seconds (e.g., "1s")
@@ -940,6 +1586,12 @@ class FvmFramework:
         if step not in self.get_steps():
             self.logger.warning(f"Specified {step=} not in {self.get_steps()}")
         toolchains.set_timeout(self, self.toolchain, step, timeout)
+        seconds = helpers.timeout_to_seconds(timeout)
+        if seconds is None:
+            self.logger.warning(f'Cannot parse {timeout=}, the step will only be '
+                                f'stopped by the tool')
+        else:
+            self.timeouts[step] = seconds
 
     def set_coverage_goal(self, step, goal):
         """
@@ -1051,13 +1703,20 @@ class FvmFramework:
         self.logger.remove()
         self.loglevel = loglevel
         self.logger.add(self.log_counter, level=0)
-        self.logger.add(sys.stderr, level=self.loglevel, format=LOGFORMAT)
+        self.logger.add(sys.stderr, level=self.loglevel, format=self.get_logformat)
 
     def set_logformat(self, logformat):
-        """ Set the logging format for the build and test framework"""
-        self.logger.remove()
-        self.logger.add(self.log_counter, level=0)
-        self.logger.add(sys.stderr, level=self.loglevel, format=logformat)
+        """ Set the logging format for the build and test framework, only for
+        the messages logged from the current thread"""
+        self.thread_logformat.format = logformat
+
+    def get_logformat(self, record):
+        """Returns the logging format for a log record, depending on the
+        thread that logged it"""
+        # The record is only needed by loguru to call this function
+        # pylint: disable=unused-argument
+        logformat = getattr(self.thread_logformat, 'format', LOGFORMAT)
+        return logformat + "\n{exception}"
 
     def get_log_counts(self) :
         """Returns a dict with the number of log messages per severity level"""
@@ -1120,7 +1779,7 @@ class FvmFramework:
         # Restore the original log format and loglevel
         self.logger.remove()
         self.logger.add(self.log_counter, level=0)
-        self.logger.add(sys.stderr, level=self.loglevel, format=LOGFORMAT)
+        self.logger.add(sys.stderr, level=self.loglevel, format=self.get_logformat)
 
         return ret
 
@@ -1354,25 +2013,50 @@ class FvmFramework:
         """
         self.init_results()
 
-        self.start_time_setup = datetime.now().isoformat()
-
-        self.logger.info(f'Designs: {self.toplevel}')
-        if self.shownorun is False and self.showall is False:
-            for design in self.toplevel:
-                self.logger.trace(f'Running {design=}')
-                if self.list:
-                    self.list_design(design)
+        # The profile and the timeline are written even if we exit early
+        profiling.start(self)
+        timeline.clear()
+        try:
+            self.start_time_setup = datetime.now().isoformat()
+            start = time.time()
+
+            self.logger.info(f'Designs: {self.toplevel}')
+            if self.plan:
+                planner.show_plan(self)
+                return
+            if self.shownorun is False and self.showall is False:
+                if self.jobs > 1 and not self.list:
+                    errorcode = parallel.run_designs(self, skip_setup)
+                    if errorcode is not None:
+                        self.exit_if_required(errorcode)
+                    if self.ctrl_c_pressed:
+                        self.exit_if_required(KEYBOARD_INTERRUPT)
                 else:
-                    self.run_design(design, skip_setup)
-
-            reports.pretty_summary(self, self.logger)
-            reports.generate_xml_report(self, self.logger)
-            reports.generate_text_report(self, self.logger)
-        reports.generate_html_report(self, self.logger)
-        err = self.check_errors()
-        if err :
-            self.logger.error(CHECK_FAILED['msg'])
-            sys.exit(CHECK_FAILED['value'])
+                    for design in self.toplevel:
+                        self.logger.trace(f'Running {design=}')
+                        if self.list:
+                            self.list_design(design)
+                        else:
+                            self.run_design(design, skip_setup)
+                if not self.list:
+                    # Remove the libraries compiled for previous runs
+                    toolchains.prune_libraries(self, self.toolchain, start)
+
+                reports.pretty_summary(self, self.logger)
+                reports.generate_xml_report(self, self.logger)
+                reports.generate_text_report(self, self.logger)
+            # The HTML report reads fvm_history, which may still be pruned
+            archive.wait()
+            reports.generate_html_report(self, self.logger)
+            err = self.check_errors()
+            if err :
+                self.logger.error(CHECK_FAILED['msg'])
+                sys.exit(CHECK_FAILED['value'])
+        finally:
+            # Do not exit with archives half pruned or compressed
+            archive.wait()
+            profiling.stop(self)
+            timeline.write(self)
 
     def list_design(self, design):
         """List all available/selected methodology steps for a design"""
@@ -1435,7 +2119,8 @@ class FvmFramework:
         # Archive previous executions of the design
         # If the design directory already exists, move it to a subdirectory
         # called "previous_executions" and append a timestamp to the directory
-        # name, so we don't lose the previous results.
+        # name, so we don't lose the previous results. Then apply the
+        # retention policy to the archived executions of the design.
         # If GUINORUN is set, we are just showing previous results, so
         # don't archive anything
         if not self.guinorun:
@@ -1446,19 +2131,13 @@ class FvmFramework:
             current_dir = os.path.join(self.outdir, previous_design)
             archive_dir = os.path.join(self.outdir, "previous_executions")
             if os.path.exists(current_dir):
-                if not os.path.exists(archive_dir):
-                    os.makedirs(archive_dir)
-                timestamp = datetime.now().isoformat()
-                target_dir = os.path.join(archive_dir, f'{previous_design}_{timestamp}')
-                shutil.copytree(current_dir, target_dir)
-                for item in os.listdir(current_dir):
-                    path = os.path.join(current_dir, item)
-                    if os.path.isdir(path):
-                        shutil.rmtree(path)
+                archive.snapshot(self, current_dir, archive_dir, previous_design)
+                archive.prune_in_background(self, archive_dir, previous_design)
 
         # Create all necessary scripts
         if not skip_setup:
-            self.setup_design(design, config)
+            with profiling.span('setup_design'):
+                self.setup_design(design, config)
 
         if config is not None:
             design = f'{design}.{config["name"]}'
@@ -1466,33 +2145,43 @@ class FvmFramework:
         self.current_toplevel = design
 
         # Run all available/selected steps/tools
-        # Call the run_step() function for each available step
+        # Call the run_step_with_hooks() function for each available step,
+        # honoring the dependencies between steps
         # If a 'step' argument is specified, just run that specific step
         if self.step is None:
             self.logger.trace(self.steps.steps)
+            selected_steps = []
             for step in self.steps.steps:
                 if self.is_skipped(design, step):
                     self.logger.info(f'{step=} of {design=} skipped by skip() function, '
                                      f'will not run')
                     self.results[design][step]['status'] = 'skip'
                 else:
-                    self.run_pre_hook(design, step)
-                    err, errorcode = self.run_step(design, step)
-                    if err:
-                        self.exit_if_required(errorcode)
-                    err, errorcode = self.run_post_step(design, step)
-                    if err:
-                        self.exit_if_required(errorcode)
-                    self.run_post_hook(design, step)
+                    selected_steps.append(step)
         else:
-            self.run_pre_hook(design, self.step)
-            err, errorcode = self.run_step(design, self.step)
-            if err:
-                self.exit_if_required(errorcode)
-            err, errorcode = self.run_post_step(design, self.step)
-            if err:
-                self.exit_if_required(errorcode)
-            self.run_post_hook(design, self.step)
+            selected_steps = [self.step]
+
+        pending, errorcode = scheduler.run_steps(self, design, selected_steps)
+        if self.ctrl_c_pressed is True:
+            self.exit_if_required(KEYBOARD_INTERRUPT)
+        if errorcode is not None:
+            self.exit_if_required(errorcode)
+        if pending:
+            self.logger.error(f'Cannot run {pending} of {design=}, their '
+                              f'dependencies cannot be satisfied')
+            self.exit_if_required(BAD_VALUE)
+
+    def run_step_with_hooks(self, design, step):
+        """Run a step of a design, together with its hooks and post_steps"""
+        self.run_pre_hook(design, step)
+        with timeline.span(f'{design}.{step}', 'step'):
+            err, errorcode = self.run_step(design, step)
+        if err:
+            self.exit_if_required(errorcode)
+        err, errorcode = self.run_post_step(design, step)
+        if err:
+            self.exit_if_required(errorcode)
+        self.run_post_hook(design, step)
 
     def is_skipped(self, design, step):
         """Returns True if design.step must not be run, otherwise returns False"""
@@ -1545,6 +2234,12 @@ class FvmFramework:
         set"""
         if self.cont and self.ctrl_c_pressed is False:
             pass
+        elif self.is_worker or threading.current_thread() is not threading.main_thread():
+            # Worker processes and threads just stop running their job, the
+            # main process collects their results and generates the reports
+            self.logger.error(errorcode['msg'])
+            self.exit_errorcode = errorcode
+            sys.exit(errorcode['value'])
         else:
             reports.pretty_summary(self, self.logger)
             reports.generate_xml_report(self, self.logger)
@@ -1553,8 +2248,29 @@ class FvmFramework:
             self.logger.error(errorcode['msg'])
             sys.exit(errorcode['value'])
 
-    def run_cmd(self, cmd, design, step, tool, verbose = True, cwd=None):
-        """Run a specific command"""
+    def handle_sigint(self, signum, frame):
+        """Ctrl+C handler: stops all the commands launched by run_cmd that are
+        still running"""
+        self.logger.error("Ctrl+C detected")
+        self.ctrl_c_pressed = True
+        runner.interrupt_all(self)
+
+    def start_deadline(self, design, step):
+        """Start the wall-clock deadline of a step, if it has a timeout"""
+        if step in self.timeouts:
+            timeout = self.timeouts[step]
+            grace = max(DEADLINE_GRACE, timeout * 0.1)
+            self.deadlines[design, step] = time.monotonic() + timeout + grace
+            self.logger.trace(f'{design}.{step} deadline in {timeout + grace}s')
+
+    @profiling.profiled(profiling.TOOLS_SPAN)
+    def run_cmd(self, cmd, design, step, tool, verbose = True, cwd=None, env=None,
+                remote=True, cancel=None):
+        """Run a specific command. If env is None, the framework's environment
+        is used. If remote is False, the command is run in the local machine
+        even if a remote executor is set (for example, to open a GUI). If
+        cancel is a threading.Event, the command is interrupted when it is
+        set, without failing"""
         self.set_logformat(getlogformattool(design, step, tool))
         if cwd is not None:
             cwd_for_debug = f', working directory: {cwd}'
@@ -1565,101 +2281,100 @@ class FvmFramework:
         timestamp = datetime.now().isoformat()
         self.results[design][step]['timestamp'] = timestamp
 
-        start_time = time.perf_counter()
-        process = subprocess.Popen (
-                  cmd,
-                  cwd        = cwd,
-                  stdout     = subprocess.PIPE,
-                  stderr     = subprocess.PIPE,
-                  text       = True,
-                  bufsize    = 1,
-                  env        = self.env,
-                  preexec_fn = os.setsid
-                )
-
-        def handle_sigint(signum, frame):
-            self.logger.error("Ctrl+C detected")
-            self.ctrl_c_pressed = True
-            if process and process.poll() is None:
-                os.killpg(os.getpgid(process.pid), signal.SIGINT)
-                # Define a function to kill the process if it remains active after 10 s
-                def kill_if_alive():
-                    if process.poll() is None:
-                        self.logger.error("Process still running after 10s, sending SIGKILL")
-                        try:
-                            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
-                        except ProcessLookupError:
-                            self.logger.warning("Process already terminated before SIGKILL")
-
-                # Initialize a 10 seconds timer to kill the process if it is still alive
-                timer = threading.Timer(10.0, kill_if_alive)
-                timer.daemon = True
-                timer.start()
-
-        signal.signal(signal.SIGINT, handle_sigint)
-
-        # Initialize variables where to store command stdout/stderr
-        stdout_lines = []
-        stderr_lines = []
+        # Signal handlers can only be installed from the main thread. When
+        # running steps concurrently, the scheduler installs it instead
+        if (threading.current_thread() is threading.main_thread() and
+                signal.getsignal(signal.SIGINT) != self.handle_sigint):
+            signal.signal(signal.SIGINT, self.handle_sigint)
 
+        start_timestamp = time.time()
+        start_time = time.perf_counter()
         if not verbose:
             print('Running: ', end='', flush=True)
 
-        # If verbose, read and print stdout and stderr in real-time
-        with process.stdout as stdout, process.stderr as stderr:
-            for line in iter(stdout.readline, ''):
-                # If verbose, print to console
-                if verbose:
-                    err, warn, success = self.linecheck(line, step)
-                    if err:
-                        self.logger.error(line.rstrip())
-                    elif warn:
-                        self.logger.warning(line.rstrip())
-                    elif success:
-                        self.logger.success(line.rstrip())
-                    else:
-                        self.logger.trace(line.rstrip())
-                # If not verbose, print dots
-                else:
-                    print('.', end='', flush=True)
-                stdout_lines.append(line)  # Save to list
-
-            for line in iter(stderr.readline, ''):
-                # If verbose, print to console
-                if verbose:
-                    err, warn, success = self.linecheck(line, step)
-                    if err:
-                        self.logger.error(line.rstrip())
-                    elif warn:
-                        self.logger.warning(line.rstrip())
-                    elif success:
-                        self.logger.success(line.rstrip())
-                    else:
-                        self.logger.trace(line.rstrip())
-                # If not verbose, print dots
-                else:
-                    print('.', end='', flush=True)
-                stderr_lines.append(line)  # Save to list
-
-        # Wait for the process to complete and get the return code
-        retval = process.wait()
+        # Commands wait until the memory they are expected to need is
+        # available, and tools with a license limit wait for a free slot.
+        # Local commands run in a free partition of the CPU cores, unless they
+        # run alone. Commands that run out of memory are run again alone, and
+        # commands that cannot check out their license are run again after
+        # waiting
+        retry = self.license_retry
+        logfile = os.path.join(self.outdir, design, step, f'{step}.log')
+        attempt = 0
+        alone = False
+        while True:
+            attempt_timestamp = time.time()
+            with admission.reserve(self, design, step, alone=alone):
+                pin = not alone and (not remote or self.executor['kind'] == 'local')
+                with licenses.slot(self, tool), affinity.partition(self, pin) as cpus:
+                    stdout_lines, stderr_lines, line_classes, retval = self.run_cmd_attempt(
+                        cmd, design, step, verbose, cwd, env, remote, logfile, cpus, cancel)
+            if (self.ctrl_c_pressed or self.results[design][step].get('timed_out')
+                    or self.results[design][step].get('cancelled')):
+                break
+            out_of_memory = admission.is_oom(retval, stdout_lines + stderr_lines)
+            if out_of_memory and not alone:
+                alone = True
+                self.results[design][step]['oom_retries'] = 1
+                message = (f'{tool} was killed or ran out of memory (exit status {retval}), '
+                           f'running it again alone')
+                self.logger.warning(message)
+                with open(logfile, 'a', encoding='utf-8') as log:
+                    log.write(f'FVM: {message}\n')
+                continue
+            if out_of_memory:
+                error = (f'Error: {tool} was killed or ran out of memory (exit status {retval}), '
+                         f'even when running alone')
+                stderr_lines.append(error)
+                with open(logfile, 'a', encoding='utf-8') as log:
+                    log.write(error + '\n')
+                break
+            if not licenses.is_denied(self, stdout_lines + stderr_lines, attempt_timestamp,
+                                      retval):
+                break
+            attempt += 1
+            delay = licenses.get_backoff(retry, attempt)
+            deadline = self.deadlines.get((design, step))
+            if attempt > retry['retries'] or (deadline is not None and
+                                              time.monotonic() + delay > deadline):
+                error = f'Error: Could not check out a {tool} license after {attempt} attempts'
+                stderr_lines.append(error)
+                with open(logfile, 'a', encoding='utf-8') as log:
+                    log.write(error + '\n')
+                break
+            self.results[design][step]['license_retries'] = attempt
+            message = (f'License for {tool} denied, retrying in {delay:.0f}s '
+                       f'(retry {attempt} of {retry["retries"]})')
+            self.logger.warning(message)
+            with open(logfile, 'a', encoding='utf-8') as log:
+                log.write(f'FVM: {message}\n')
+            # Wait, but stop waiting on Ctrl+C
+            end = time.monotonic() + delay
+            while not self.ctrl_c_pressed and time.monotonic() < end:
+                time.sleep(min(licenses.POLL_INTERVAL, end - time.monotonic()))
 
         # After the process has finished, calculate elapsed time
         end_time = time.perf_counter()
         elapsed_time = end_time - start_time
         self.results[design][step]['elapsed_time'] = elapsed_time
 
+        # Save the peak memory of the step, to predict it in the next
+        # executions. The elapsed time is saved when the step finishes, since
+        # a step may run several commands
+        max_rss = self.results[design][step].get('resources', {}).get('max_rss', 0)
+        if max_rss > 0:
+            history.update(self, design, step, {'max_rss': max_rss})
+        timeline.record(f'{design}.{step} ({tool})', 'subprocess', start_timestamp, elapsed_time,
+                        {'command': join(cmd), 'returncode': retval})
+
         # If not verbose, print the final carriage return for the dots
         if not verbose:
             print(' Finished', flush=True)
 
-        # Append error message if return value is non-zero
-        if retval != 0 and self.ctrl_c_pressed is False:
-            stderr_lines.append("Error: Command returned non-zero exit status {}".format(retval))
-
-        # Join captured output
-        captured_stdout = ''.join(stdout_lines)
-        captured_stderr = ''.join(stderr_lines)
+        # Join captured output, keeping the classification of the lines so
+        # logcheck does not have to classify them again
+        captured_stdout = linecheck.ClassifiedText(stdout_lines, line_classes['stdout'], step)
+        captured_stderr = linecheck.ClassifiedText(stderr_lines, line_classes['stderr'], step)
 
         self.results[design][step]['stdout'] += captured_stdout
         self.results[design][step]['stderr'] += captured_stderr
@@ -1668,6 +2383,102 @@ class FvmFramework:
 
         return captured_stdout, captured_stderr
 
+    def run_cmd_attempt(self, cmd, design, step, verbose, cwd, env, remote, logfile,
+                        cpus=None, cancel=None):
+        """Run a command once for run_cmd, writing its output to the step log,
+        pinned to cpus if they are not None, until it finishes or cancel is
+        set. Returns its stdout and stderr lines, their classification and its
+        exit status"""
+        # The command is supervised by the runner event loop, which sends
+        # its output lines through a queue as soon as they are written, in the
+        # order in which they were written, and interrupts it if the deadline
+        # of the step expires
+        output = queue.Queue()
+        deadline = self.deadlines.get((design, step))
+        series = None
+        samples_file = os.path.join(self.outdir, design, step, f'{step}_resources.csv')
+        if self.sample_interval is not None:
+            os.makedirs(os.path.dirname(samples_file), exist_ok=True)
+            series = (samples_file, self.sample_interval)
+        env = self.env if env is None else env
+        job = None
+        if remote:
+            job = executors.prepare(self.executor, cmd, cwd, env,
+                                    os.path.join(self.outdir, design, step), step)
+        if job is not None:
+            self.logger.info(f'running in the {self.executor["kind"]} executor as job '
+                             f'{job["name"]}: {join(job["command"])}')
+        if cpus is not None:
+            self.logger.info(f'running in CPUs {",".join(str(cpu) for cpu in cpus)}')
+        process = runner.start(self, cmd, output, cwd=cwd, env=env, deadline=deadline,
+                               series=series, job=job, cpus=cpus, cancel=cancel)
+
+        # Initialize variables where to store command stdout/stderr, and the
+        # classification of each line
+        stdout_lines = []
+        stderr_lines = []
+        lines_by_stream = {'stdout': stdout_lines, 'stderr': stderr_lines}
+        line_classes = {'stdout': [], 'stderr': []}
+
+        # Write the output to the step log as it arrives
+        os.makedirs(os.path.dirname(logfile), exist_ok=True)
+        with open(logfile, 'a', encoding='utf-8', buffering=1) as log:
+            while True:
+                stream, line = output.get()
+                if stream is None:
+                    break
+                lines = lines_by_stream[stream]
+                log.write(line)
+                err, warn, success = self.linecheck(line, step)
+                line_classes[stream].append((err, warn, success))
+                # If verbose, print to console
+                if verbose:
+                    if err:
+                        self.logger.error(line.rstrip())
+                    elif warn:
+                        self.logger.warning(line.rstrip())
+                    elif success:
+                        self.logger.success(line.rstrip())
+                    else:
+                        self.logger.trace(line.rstrip())
+                # If not verbose, print dots
+                else:
+                    print('.', end='', flush=True)
+                lines.append(line)  # Save to list
+
+            # Get the return code of the process, or raise the exception
+            # that prevented running it
+            result = process.result()
+            retval = result['returncode']
+            step_resources = self.results[design][step].setdefault('resources',
+                                                                   resources.new_usage())
+            resources.merge_usage(step_resources, result['usage'])
+
+            # Append error message if the deadline expired or the return
+            # value is non-zero
+            if result['timed_out']:
+                self.results[design][step]['timed_out'] = True
+                error = (f"Error: Command exceeded the deadline of the step, set with "
+                         f"set_timeout({step!r}, ...), and was interrupted")
+                stderr_lines.append(error)
+                log.write(error + '\n')
+            elif result['cancelled']:
+                self.results[design][step]['cancelled'] = True
+                log.write('FVM: Command cancelled\n')
+            elif retval != 0 and self.ctrl_c_pressed is False:
+                error = "Error: Command returned non-zero exit status {}".format(retval)
+                stderr_lines.append(error)
+                log.write(error + '\n')
+
+        # Plot the resource usage time series, if there is one
+        if series is not None and os.path.exists(samples_file):
+            resources.write_chart(samples_file,
+                                  os.path.join(self.outdir, design, step,
+                                               f'{step}_resources.html'),
+                                  f'{design}.{step}')
+
+        return stdout_lines, stderr_lines, line_classes, retval
+
     def run_pre_hook(self, design, step):
         """Run the pre_hook if it exists. Only one hook is run: specific design
         hooks take priority before globally specified hooks"""
@@ -1678,15 +2489,22 @@ class FvmFramework:
         design hooks take priority before globally specified hooks"""
         self.run_hook_if_defined(self.post_hooks, design, step)
 
+    def get_hook(self, hooks, design, step):
+        """Returns the hook of design.step, or None if there is none.
+        Specific design hooks take priority before globally specified
+        hooks"""
+        if design in hooks:
+            return hooks[design].get(step)
+        if '*' in hooks:
+            return hooks['*'].get(step)
+        return None
+
     def run_hook_if_defined(self, hooks, design, step):
         """Run a hook if it exists. Only one hook is run: specific design
         hooks take priority before globally specified hooks"""
-        if design in hooks:
-            if step in hooks[design]:
-                self.run_hook(hooks[design][step], step, design)
-        elif '*' in hooks:
-            if step in hooks['*']:
-                self.run_hook(hooks['*'][step], step, design)
+        hook = self.get_hook(hooks, design, step)
+        if hook is not None:
+            self.run_hook(hook, step, design)
 
     def run_hook(self, hook, step, design):
         """Run a user-specified hook"""
@@ -1703,7 +2521,8 @@ class FvmFramework:
             drom2psl_outdir = os.path.join(self.outdir, path)
             os.makedirs(drom2psl_outdir, exist_ok=True)
             for drom_source in self.drom_sources:
-                generator(drom_source["file"], outdir=drom2psl_outdir)
+                with profiling.span('drom2psl.generator'):
+                    drom2psl_generator.generator(drom_source["file"], outdir=drom2psl_outdir)
                 drom_source['gen_psl'] = os.path.join(drom2psl_outdir,
                                         pathlib.Path(drom_source["file"]).with_suffix('.psl').name)
                 gen_psl = {'file': drom_source['gen_psl'],
@@ -1736,23 +2555,35 @@ class FvmFramework:
 
         # Run the assigned setup function for each step
         for step in self.steps.steps :
-            self.steps.steps[step]["setup"](self, path)
+            with profiling.span(f'setup.{step}'):
+                self.steps.steps[step]["setup"](self, path)
 
+    @profiling.profiled('logcheck')
     def logcheck(self, result, design, step, tool):
         """Check log for errors"""
 
         # Set the specific log format for this design, step and tool
         self.set_logformat(getlogformattool(design, step, tool))
 
-        # Temporarily add a handler to capture logs
+        # Temporarily add a handler to capture logs. Only capture the logs
+        # from this thread, other steps may be running concurrently
         log_stream = StringIO()
-        handler_id = self.logger.add(log_stream, format="{time} {level} {message}")
+        thread_id = threading.get_ident()
+        handler_id = self.logger.add(log_stream, format="{time} {level} {message}",
+                                     filter=lambda record: record["thread"].id == thread_id)
 
         err_in_log = False
-        for line in result.splitlines() :
-            err, warn, success = self.linecheck(line, step)
-
-            if self.is_failure_allowed(design, step) is True and err:
+        failure_allowed = self.is_failure_allowed(design, step)
+        lines = result.splitlines()
+        classes = None
+        if isinstance(result, linecheck.ClassifiedText):
+            classes = result.get_classes(lines, step)
+        if classes is None:
+            checker = linecheck.get_checker(self, step)
+            classes = [checker.check(line) for line in lines]
+
+        for line, (err, warn, success) in zip(lines, classes) :
+            if failure_allowed is True and err:
                 warn = True
                 err = False
             # If we are in verbose mode, still check if there are errors /
@@ -1781,45 +2612,37 @@ class FvmFramework:
 
     def linecheck(self, line, step=None):
         """Check for errors and warnings in log lines"""
-        err = False
-        warn = False
-        success = False
-        patterns = toolchains.get_linecheck_patterns(self, step)
-        if patterns:
-            for keyword in patterns.get("ignore", []):
-                if keyword.casefold() in line.casefold():
-                    return err, warn, success
-
-            for category, keywords in patterns.items():
-                if category == "ignore":
-                    continue
-                for keyword in keywords:
-                    regex = re.compile(rf"\b{re.escape(keyword)}\b", re.IGNORECASE)
-                    if regex.search(line):
-                        if category == "error":
-                            err = True
-                        elif category == "warning":
-                            warn = True
-                        elif category == "success":
-                            success = True
-
-        return err, warn, success
+        return linecheck.get_checker(self, step).check(line)
 
     def run_step(self, design, step):
         """Run a specific step of the methodology"""
-        console.rule(f'[bold white]{design}.{step}[/bold white]')
+        get_console().rule(f'[bold white]{design}.{step}[/bold white]')
         err = False
         errorcode = {}
         self.current_path = os.path.join(self.outdir, self.current_toplevel)
         path = self.current_path
         if step in self.steps.steps:
-            run_stdout, run_stderr, stdout_err, stderr_err, status = self.steps.steps[step]["run"](self, path)
+            run = self.steps.steps[step]["run"]
+            self.start_deadline(design, step)
+            if self.cache:
+                # Steps that use the results of their dependencies, such as
+                # prove with bughunt, must run again when those change
+                parent_key = ','.join(self.cache_keys[design, dependency]
+                                      for dependency in self.steps.get_dependencies(step)
+                                      if self.cache_keys.get((design, dependency))) or None
+                (run_stdout, run_stderr, stdout_err, stderr_err, status), self.cache_keys[design, step] = \
+                    cache.run_cached(self, design, step, path, run, parent_key)
+            else:
+                run_stdout, run_stderr, stdout_err, stderr_err, status = run(self, path)
             logfile = os.path.join(path, step, f"{step}.log")
             os.makedirs(os.path.join(path, step), exist_ok=True)
             self.logger.info(f'Output written to {logfile}')
-            with open(logfile, 'w', encoding='utf-8') as f :
-                f.write(run_stdout)
-                f.write(run_stderr)
+            # run_cmd writes the output of the tools to the log as they run,
+            # so only write it here if no tool was run
+            if not os.path.exists(logfile):
+                with open(logfile, 'w', encoding='utf-8') as f :
+                    f.write(run_stdout)
+                    f.write(run_stderr)
 
             if stdout_err or stderr_err or status == "fail":
                 if self.is_failure_allowed(design, step) is False:
@@ -1833,6 +2656,7 @@ class FvmFramework:
                 self.results[design][step]['status'] = 'fail'
             else:
                 self.results[design][step]['status'] = 'pass'
+            self.save_elapsed_time(design, step)
 
         else:
             self.logger.error(f'No tool available for {step=} in {self.toolchain=}')
@@ -1843,10 +2667,20 @@ class FvmFramework:
 
         if err is False and step in self.steps.post_steps:
             for post_step in self.steps.post_steps[step]:
-                self.steps.post_steps[step][post_step]["setup"](self, path)
+                with profiling.span(f'setup.{step}.{post_step}'):
+                    self.steps.post_steps[step][post_step]["setup"](self, path)
 
         return err, errorcode
 
+    def save_elapsed_time(self, design, step):
+        """Save the total elapsed time of all the commands of a step in the
+        history, to predict it in the next executions. Steps that did not run
+        any command, were restored from the cache or were interrupted (which
+        would give too short times) are not saved"""
+        results = self.results[design][step]
+        if 'elapsed_time' in results and not results.get('cached') and not self.ctrl_c_pressed:
+            history.update(self, design, step, {'elapsed_time': results['elapsed_time']})
+
     def run_post_step(self, design, step):
         """Run post processing for a specific step of the methodology"""
         self.logger.trace(f'run_post_step, {design=}, {step=})')
@@ -1857,14 +2691,24 @@ class FvmFramework:
         if step in self.steps.post_steps:
             for post_step in self.steps.post_steps[step]:
                 if not self.is_skipped(design, f'{step}.{post_step}'):
-                    console.rule(f'[bold white]{design}.{step}.{post_step}[/bold white]')
-                    run_stdout, run_stderr, stdout_err, stderr_err, status = self.steps.post_steps[step][post_step]["run"](self, path)
+                    get_console().rule(f'[bold white]{design}.{step}.{post_step}[/bold white]')
+                    run = self.steps.post_steps[step][post_step]["run"]
+                    self.start_deadline(design, f'{step}.{post_step}')
+                    with timeline.span(f'{design}.{step}.{post_step}', 'post_step'):
+                        if self.cache:
+                            (run_stdout, run_stderr, stdout_err, stderr_err, status), _ = \
+                                cache.run_cached(self, design, f'{step}.{post_step}', path, run,
+                                                 self.cache_keys.get((design, step)))
+                        else:
+                            run_stdout, run_stderr, stdout_err, stderr_err, status = \
+                                run(self, path)
                     logfile = os.path.join(path, f"{step}.{post_step}", f"{step}.{post_step}.log")
                     os.makedirs(os.path.join(path, f"{step}.{post_step}"), exist_ok=True)
                     self.logger.info(f'{step}.{post_step}, finished, output written to {logfile}')
-                    with open(logfile, 'w', encoding='utf-8') as f :
-                        f.write(run_stdout)
-                        f.write(run_stderr)
+                    if not os.path.exists(logfile):
+                        with open(logfile, 'w', encoding='utf-8') as f :
+                            f.write(run_stdout)
+                            f.write(run_stderr)
 
                     if stdout_err or stderr_err or status == "fail":
                         if self.is_failure_allowed(design, f"{step}.{post_step}") is False:
@@ -1878,6 +2722,7 @@ class FvmFramework:
                         self.results[design][f"{step}.{post_step}"]['status'] = 'fail'
                     else:
                         self.results[design][f"{step}.{post_step}"]['status'] = 'pass'
+                    self.save_elapsed_time(design, f'{step}.{post_step}')
 
                 # Check for keyboard interrupt after each post step
                 if self.ctrl_c_pressed is True:
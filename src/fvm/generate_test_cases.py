@@ -11,7 +11,7 @@ import re
 def generate_test_case(design_name, prefix, step, results_dir, status="passed", outdir=None,
                        start_time=None, stop_time=None, friendliness_score=None,
                        properties = None, step_summary_html = None, html_files=None,
-                       drom_svg_path=None):
+                       drom_svg_path=None, parameters=None):
     """
     Generate a test case structure for reports.
 
@@ -37,6 +37,9 @@ def generate_test_case(design_name, prefix, step, results_dir, status="passed",
     :type step_summary_html: str or None
     :param html_files: List of additional HTML files to attach (optional).
     :type html_files: list of str or None
+    :param parameters: Parameters of the test case, such as the resource
+                       usage of the step (optional).
+    :type parameters: dict of str to str or None
     """
     test_case_uuid = str(uuid.uuid4())
     history_id = f"{prefix}.{design_name}.{step}"
@@ -218,6 +221,10 @@ def generate_test_case(design_name, prefix, step, results_dir, status="passed",
     if status_details:
         test_case["statusDetails"] = status_details
 
+    if parameters:
+        test_case["parameters"] = [{"name": name, "value": value}
+                                   for name, value in parameters.items()]
+
     if status.lower() != "skipped":
         test_case["attachments"] = attachments
 
@@ -3,22 +3,80 @@
 
 """Helper functions for FVM"""
 import os
+import re
 import sys
-from packaging.version import Version
-from importlib.metadata import version as get_version
+import hashlib
+import functools
+import importlib
+import threading
+
+class LazyModule:
+    """Stand-in for a module that is only imported the first time one of its
+    attributes is accessed. Used to keep heavy modules (reports, drom2psl,
+    the tool parsers...) out of the startup time of FVM. Unlike
+    :class:`importlib.util.LazyLoader`, it is safe to use from concurrent
+    steps"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        # Only called for attributes not found in the stand-in itself
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f'<lazy module {self._name!r}>'
+
+def lazy_import(name):
+    """
+    Returns a module that is only actually imported the first time it is
+    used, or the module itself if it was already imported
+
+    :param name: absolute name of the module, such as ``fvm.reports``
+    :type name: str
+
+    :return: the module, or a stand-in that imports it on first use
+    :rtype: module or LazyModule
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
 
+@functools.lru_cache(maxsize=None)
 def get_fvm_version():
     """Returns the full version number (major.minor.patch[.others]) of the FVM"""
+    # importlib.metadata scans the installed distributions, so it is only
+    # imported and queried once
+    from importlib.metadata import version as get_version
     versionstring = get_version("fvm-formal")
     return versionstring
 
+@functools.lru_cache(maxsize=None)
 def get_fvm_shortversion():
     """Returns the short version number (major.minor) of the FVM"""
-    versionstring = get_version("fvm-formal")
+    from packaging.version import Version
+    versionstring = get_fvm_version()
     versionclass = Version(versionstring)
     ret = f'{versionclass.major}.{versionclass.minor}'
     return ret
 
+def file_digest(path):
+    """Returns the SHA-256 hex digest of the contents of a file, or None if
+    the file does not exist"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def getscriptname():
     """Gets the absolute path of the called python script"""
     scriptname = os.path.abspath(sys.argv[0])
@@ -69,6 +127,37 @@ def readable_time(seconds):
 
     return unit(secs, 'second', 'seconds')
 
+def readable_size(size):
+    """Converts a size in bytes into a readable format, such as 1.5 GB"""
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size < 1024 or unit == 'TB':
+            break
+        size /= 1024
+    if unit == 'B':
+        return f"{int(size)} B"
+    return f"{size:.1f} {unit}"
+
+def timeout_to_seconds(timeout):
+    """Converts a timeout string with a number and a unit (s, m, h or d), such
+    as "10m", into seconds. Returns None if the string cannot be parsed"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhd])\s*', str(timeout))
+    if match is None:
+        return None
+    factors = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    return float(match.group(1)) * factors[match.group(2)]
+
+def size_to_bytes(size):
+    """Converts a size, either a number of bytes or a string with a number and
+    a unit (K, M, G or T, optionally followed by B), such as "16G", into
+    bytes. Returns None if it cannot be parsed"""
+    if isinstance(size, int) and not isinstance(size, bool) and size >= 0:
+        return size
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*', str(size), re.IGNORECASE)
+    if match is None:
+        return None
+    factors = {'': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+    return int(float(match.group(1)) * factors[match.group(2).upper()])
+
 def insert_line_before_target(file, target_line, line_to_insert):
     """Inserts a line before the first occurrence of target_line in file"""
     with open(file, 'r', encoding="utf-8") as f:
@@ -0,0 +1,133 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Statistics of previous executions of each step
+
+After a step runs its tools, its peak memory and its elapsed time are saved
+in ``<outdir>/fvm_step_history.json``, indexed by ``<design>.<step>``, so the
+next executions can predict how much memory it will need (see
+:mod:`fvm.admission`) and how long it will take (see :mod:`fvm.parallel`).
+The file is shared by all the threads and worker processes of an execution,
+so it is updated while holding a lock.
+
+The elapsed times of steps that ran before this file existed are imported
+from the XML results in ``<outdir>/fvm_results`` and ``<outdir>/fvm_history``.
+"""
+import os
+import json
+import glob
+import fcntl
+from contextlib import contextmanager
+from xml.etree import ElementTree
+
+HISTORY_FILE = 'fvm_step_history.json'
+
+def get_history_file(framework):
+    """Returns the path of the history file"""
+    return os.path.join(framework.outdir, HISTORY_FILE)
+
+def load(framework):
+    """
+    Load the statistics of all the steps
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: a dict with the statistics of each ``<design>.<step>``, empty
+             if there is no history
+    :rtype: dict
+    """
+    try:
+        with open(get_history_file(framework), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def get(framework, design, step):
+    """Returns the statistics of a step, or an empty dict if it has none"""
+    return load(framework).get(f'{design}.{step}', {})
+
+@contextmanager
+def locked_history(framework):
+    """Load the statistics while holding the lock of the history file, and
+    save them when done"""
+    filename = get_history_file(framework)
+    os.makedirs(framework.outdir, exist_ok=True)
+    with open(f'{filename}.lock', 'w', encoding='utf-8') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            history = load(framework)
+            yield history
+            with open(f'{filename}.tmp', 'w', encoding='utf-8') as f:
+                json.dump(history, f, indent=2, sort_keys=True)
+            os.replace(f'{filename}.tmp', filename)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def update(framework, design, step, values):
+    """
+    Update the statistics of a step
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: design name
+    :type design: str
+    :param step: step name
+    :type step: str
+    :param values: statistics to save, such as ``{'max_rss': 1024}``
+    :type values: dict
+    """
+    with locked_history(framework) as history:
+        history.setdefault(f'{design}.{step}', {}).update(values)
+
+def get_results_durations(framework):
+    """
+    Get the elapsed time of each step from the XML results of previous
+    executions. If a step appears in several of them, the newest one is used
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: a dict with the elapsed time of each ``<design>.<step>``, in
+             seconds
+    :rtype: dict[str, float]
+    """
+    files = glob.glob(os.path.join(framework.outdir, 'fvm_history', '*', '*.xml'))
+    files += glob.glob(os.path.join(framework.resultsdir, '*.xml'))
+    durations = {}
+    for filename in sorted(files, key=os.path.getmtime):
+        try:
+            root = ElementTree.parse(filename).getroot()
+        except (OSError, ElementTree.ParseError):
+            continue
+        for testcase in root.iter('testcase'):
+            # Steps that were not executed have no time, or a skipped element
+            if testcase.find('skipped') is not None:
+                continue
+            try:
+                elapsed_time = float(testcase.get('time'))
+            except (TypeError, ValueError):
+                continue
+            if elapsed_time > 0:
+                durations[testcase.get('name')] = elapsed_time
+    return durations
+
+def import_results(framework):
+    """
+    Add the elapsed times in the XML results of previous executions to the
+    steps that do not have one in the history
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: the statistics of all the steps
+    :rtype: dict
+    """
+    durations = get_results_durations(framework)
+    history = load(framework)
+    if all('elapsed_time' in history.get(name, {}) for name in durations):
+        return history
+    with locked_history(framework) as history:
+        for name, elapsed_time in durations.items():
+            history.setdefault(name, {}).setdefault('elapsed_time', elapsed_time)
+    return history
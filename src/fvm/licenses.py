@@ -0,0 +1,136 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""License-aware concurrency limits and retries on license denial
+
+When designs or steps run in parallel, the number of jobs of each tool that
+run at the same time can be limited with
+:meth:`fvm.FvmFramework.set_license_limit`, for example to the number of
+license tokens available for each feature. Each tool has a pool of slots,
+which are lock files in ``<outdir>/.licenses``, so the limits are shared by
+all the threads and worker processes of an execution.
+
+When a tool cannot check out its license (detected from its output or from
+the FlexLM diagnostics log in ``<outdir>/.flexlm.log``), the command is run
+again after waiting with exponential backoff (see
+:meth:`fvm.FvmFramework.set_license_retry`), instead of failing the step.
+"""
+import os
+import re
+import time
+import glob
+import fcntl
+import random
+from contextlib import contextmanager
+
+LICENSES_DIR = '.licenses'
+
+# Seconds between attempts to get a slot of a pool
+POLL_INTERVAL = 0.5
+
+# Messages written by the tools and by FlexLM when a license cannot be
+# checked out
+DENIAL_PATTERNS = [r'licen[cs]e checkout fail',
+                   r'unable to check ?out',
+                   r'(failed|unable) to (obtain|acquire|get|check ?out) (a |the )?([\w-]+ )?'
+                   r'licen[cs]e',
+                   r'licensed number of users already reached',
+                   r'flex(lm|net) licensing error',
+                   r'cannot connect to (the )?licen[cs]e server',
+                   r'no such feature exists']
+DENIAL_REGEX = re.compile('|'.join(f'(?:{pattern})' for pattern in DENIAL_PATTERNS),
+                          re.IGNORECASE)
+
+@contextmanager
+def slot(framework, tool):
+    """
+    Hold a slot of the pool of a tool while running it. If the tool has no
+    limit, nothing is held
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param tool: name of the tool, such as ``propcheck``
+    :type tool: str
+    """
+    limit = framework.license_limits.get(tool)
+    if limit is None:
+        yield
+        return
+    pool_dir = os.path.join(framework.outdir, LICENSES_DIR)
+    os.makedirs(pool_dir, exist_ok=True)
+    lock_file = None
+    waiting = False
+    while lock_file is None and not framework.ctrl_c_pressed:
+        for index in range(limit):
+            candidate = open(os.path.join(pool_dir, f'{tool}.{index}.lock'), 'w',
+                             encoding='utf-8')
+            try:
+                fcntl.flock(candidate, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                candidate.close()
+                continue
+            lock_file = candidate
+            break
+        else:
+            if not waiting:
+                framework.logger.info(f'All {limit} {tool} license slots are in use, waiting')
+                waiting = True
+            time.sleep(POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        if lock_file is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+def is_denied(framework, lines, since, returncode):
+    """
+    Check whether a command could not check out its license
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param lines: the output lines of the command
+    :type lines: list[str]
+    :param since: time at which the command started, in seconds since the
+                  epoch
+    :type since: float
+    :param returncode: exit status of the command
+    :type returncode: int
+
+    :return: True if the license was denied
+    :rtype: bool
+    """
+    if any(DENIAL_REGEX.search(line) for line in lines):
+        return True
+    # The FlexLM log is shared by all the commands, so it is only checked
+    # when the command failed
+    if returncode == 0:
+        return False
+    for logfile in glob.glob(os.path.join(framework.flexlm_logdir, '*')):
+        try:
+            if os.path.getmtime(logfile) < since:
+                continue
+            with open(logfile, 'r', encoding='utf-8', errors='replace') as f:
+                if DENIAL_REGEX.search(f.read()):
+                    return True
+        except OSError:
+            continue
+    return False
+
+def get_backoff(retry, attempt):
+    """
+    Returns the seconds to wait before an attempt, which double after each
+    denial up to a maximum. A random jitter of up to 25% is added, so jobs
+    that were denied at the same time do not retry at the same time
+
+    :param retry: retry policy, with the ``delay`` before the first retry and
+                  the ``max_delay``
+    :type retry: dict
+    :param attempt: number of the retry, starting at 1
+    :type attempt: int
+
+    :return: seconds to wait
+    :rtype: float
+    """
+    delay = min(retry['delay'] * 2 ** (attempt - 1), retry['max_delay'])
+    return delay * random.uniform(1, 1.25)
@@ -0,0 +1,87 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Classification of tool output lines into errors, warnings and successes
+
+The linecheck patterns of each step (see ``get_linecheck_<step>`` in the
+toolchain modules) are compiled once into a :class:`LineChecker`, with a
+single regular expression per category, and cached for the rest of the
+execution.
+"""
+import re
+import threading
+
+from fvm.toolchains import toolchains
+
+# Compiled checkers, by (toolchain, step)
+checkers = {}
+checkers_lock = threading.Lock()
+
+class LineChecker:
+    """Classifies lines according to a dict of linecheck patterns"""
+
+    def __init__(self, patterns):
+        """Class constructor
+
+        patterns is a dict with a list of keywords for each category. Lines
+        that contain any keyword of the "ignore" category (case-insensitive)
+        are never classified. Otherwise, a line belongs to the "error",
+        "warning" or "success" categories if it contains any of their
+        keywords as whole words (case-insensitive)"""
+        self.ignore = [keyword.casefold() for keyword in patterns.get("ignore", [])]
+        self.regexes = {}
+        for category in ["error", "warning", "success"]:
+            keywords = patterns.get(category, [])
+            if keywords:
+                alternation = '|'.join(re.escape(keyword) for keyword in keywords)
+                self.regexes[category] = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+
+    def check(self, line):
+        """Returns a tuple (err, warn, success) with the categories of line"""
+        if self.ignore:
+            folded = line.casefold()
+            if any(keyword in folded for keyword in self.ignore):
+                return False, False, False
+        return tuple(category in self.regexes and self.regexes[category].search(line) is not None
+                     for category in ["error", "warning", "success"])
+
+def get_checker(framework, step=None):
+    """
+    Get the compiled LineChecker for a step, building it the first time
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param step: step name (optional)
+    :type step: str or None
+
+    :return: the LineChecker for the step
+    :rtype: LineChecker
+    """
+    key = (framework.toolchain, step)
+    checker = checkers.get(key)
+    if checker is None:
+        checker = LineChecker(toolchains.get_linecheck_patterns(framework, step))
+        with checkers_lock:
+            checkers[key] = checker
+    return checker
+
+class ClassifiedText(str):
+    """Text that remembers the (err, warn, success) classification of each
+    one of its lines, so it does not need to be classified again"""
+
+    # Classification of each line, and the step it was classified for
+    classes = None
+    step = None
+
+    def __new__(cls, lines, classes, step):
+        text = super().__new__(cls, ''.join(lines))
+        text.classes = classes
+        text.step = step
+        return text
+
+    def get_classes(self, lines, step):
+        """Returns the classification of lines, if they are the lines of this
+        text for the same step, or None otherwise"""
+        if step == self.step and len(lines) == len(self.classes):
+            return self.classes
+        return None
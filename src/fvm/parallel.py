@@ -0,0 +1,254 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Parallel execution of designs and design configurations
+
+Each design/configuration pair is an independent job that is run in its own
+worker process. Workers are forked from the main process, so they inherit a
+full copy of the FvmFramework object (sources, hooks, flags, etc.) without
+needing to serialize it, and each of them has its own ``current_toplevel`` and
+``current_path`` state. When a job finishes, the worker sends back its part of
+the ``results`` dict and its log counts, and the main process merges them.
+
+Jobs are started longest first, so a long job started last does not delay
+the end of the whole execution. The duration of each job is predicted from
+the elapsed times of its steps in previous executions (see
+:mod:`fvm.history`). Jobs without history are estimated from the difficulty
+score of their last design report, scaled with the jobs that have both, and
+if that is not possible either they are started first, since they might be
+the longest ones.
+"""
+import signal
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from fvm import helpers
+from fvm import profiling
+from fvm import timeline
+from fvm import history
+from fvm.toolchains import toolchains
+
+# The framework imports this module, so it is only used once loaded
+fvm_framework = helpers.lazy_import('fvm.framework')
+
+# FvmFramework object for the worker processes. It is set by run_designs()
+# just before creating the process pool, and since workers are forked they
+# inherit it
+_framework = None
+
+def get_jobs(framework):
+    """
+    Get the list of independent jobs, one per design/configuration pair
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: A list of (design, config) tuples, where config is None for
+             designs without configurations
+    :rtype: list[tuple[str, dict or None]]
+    """
+    jobs = []
+    for design in framework.toplevel:
+        if design in framework.design_configs:
+            for config in framework.design_configs[design]:
+                jobs.append((design, config))
+        else:
+            jobs.append((design, None))
+    return jobs
+
+def get_job_name(design, config):
+    """Returns the name of a job as used in the results dict (design or
+    design.config)"""
+    if config is not None:
+        return f'{design}.{config["name"]}'
+    return design
+
+def predict_durations(framework, jobs):
+    """
+    Predict how long each job will take
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param jobs: the jobs, as returned by :func:`get_jobs`
+    :type jobs: list[tuple[str, dict or None]]
+
+    :return: the predicted duration of each job name in seconds, or None for
+             the jobs whose duration cannot be predicted
+    :rtype: dict[str, float or None]
+    """
+    statistics = history.import_results(framework)
+    steps = framework.get_steps()
+    durations = {}
+    difficulties = {}
+    for design, config in jobs:
+        name = get_job_name(design, config)
+        elapsed_times = [statistics[f'{name}.{step}']['elapsed_time'] for step in steps
+                         if 'elapsed_time' in statistics.get(f'{name}.{step}', {})]
+        durations[name] = sum(elapsed_times) if elapsed_times else None
+        difficulties[name] = toolchains.get_difficulty(framework, framework.toolchain, name)
+
+    # Seconds per difficulty point, from the jobs that have both
+    known = [name for name in durations
+             if durations[name] is not None and difficulties[name]]
+    if known:
+        rate = (sum(durations[name] for name in known) /
+                sum(difficulties[name] for name in known))
+        for name, duration in durations.items():
+            if duration is None and difficulties[name] is not None:
+                durations[name] = difficulties[name] * rate
+    return durations
+
+def order_jobs(framework, jobs):
+    """
+    Sort the jobs so the longest ones start first. Jobs whose duration
+    cannot be predicted go first, in their original order
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param jobs: the jobs, as returned by :func:`get_jobs`
+    :type jobs: list[tuple[str, dict or None]]
+
+    :return: the sorted jobs
+    :rtype: list[tuple[str, dict or None]]
+    """
+    durations = predict_durations(framework, jobs)
+    framework.logger.trace(f'{durations=}')
+
+    def get_key(job):
+        duration = durations[get_job_name(*job)]
+        return -float('inf') if duration is None else -duration
+
+    # sorted() is stable, so jobs with the same prediction keep their order
+    return sorted(jobs, key=get_key)
+
+def init_worker():
+    """Worker process initializer. Ctrl+C is handled by the main process, and
+    by run_cmd while a tool is running, so workers ignore it by default"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def run_job(design, config, skip_setup):
+    """
+    Run a single design/configuration inside a worker process
+
+    :return: A dict with the results of the job, the log counts generated
+             while running it and the error code if the job exited early
+    :rtype: dict
+    """
+    framework = _framework
+    framework.is_worker = True
+    name = get_job_name(design, config)
+    # Only send the profiling spans and timeline events of this job
+    profiling.spans.clear()
+    timeline.clear()
+    counts_before = dict(framework.get_log_counts())
+
+    errorcode = None
+    try:
+        framework.run_configuration(design, config, skip_setup)
+    except SystemExit:
+        errorcode = framework.exit_errorcode
+
+    counts_after = framework.get_log_counts()
+    log_counts = {level: counts_after[level] - counts_before.get(level, 0)
+                  for level in counts_after}
+
+    return {"name": name,
+            "results": framework.results[name],
+            "log_counts": log_counts,
+            "drom_generated_psl": framework.drom_generated_psl,
+            "errorcode": errorcode,
+            "ctrl_c_pressed": framework.ctrl_c_pressed,
+            "profile_spans": dict(profiling.spans),
+            "timeline": timeline.get_recorded()}
+
+def merge_job(framework, job):
+    """Merge the results of a finished job into the framework"""
+    framework.results[job["name"]] = job["results"]
+    counts = framework.log_counter.get_counts()
+    for level, count in job["log_counts"].items():
+        counts[level] = counts.get(level, 0) + count
+    for psl in job["drom_generated_psl"]:
+        if psl not in framework.drom_generated_psl:
+            framework.drom_generated_psl.append(psl)
+    if job["ctrl_c_pressed"]:
+        framework.ctrl_c_pressed = True
+    profiling.merge(job["profile_spans"])
+    timeline.merge(job["timeline"])
+
+def fail_job(framework, name, exception):
+    """Mark the steps of a job whose worker process crashed as failed"""
+    framework.logger.error(f'Job {name} crashed: {exception!r}')
+    for results in framework.results.get(name, {}).values():
+        if results.get('status') is None:
+            results['status'] = 'fail'
+            results['message'] = f'Job crashed: {exception!r}'
+
+def run_designs(framework, skip_setup=False):
+    """
+    Run all design/configuration pairs in a pool of ``framework.jobs``
+    worker processes
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param skip_setup: If True, the setup is skipped and existing scripts are used.
+    :type skip_setup: bool
+
+    :return: The error code of the first job that exited early, or None if
+             all jobs finished (or exited early but --cont was set)
+    :rtype: dict or None
+    """
+    global _framework
+    _framework = framework
+
+    jobs = order_jobs(framework, get_jobs(framework))
+    framework.logger.info(f'Running {len(jobs)} jobs with {framework.jobs=}')
+    first_errorcode = None
+    futures = []
+    names = {}
+
+    # While the pool is running, Ctrl+C must not raise KeyboardInterrupt in
+    # the main process: running jobs stop their tools and finish on their
+    # own, and we only need to avoid starting new ones
+    def handle_sigint(signum, frame):
+        framework.logger.error("Ctrl+C detected, waiting for running jobs to finish")
+        framework.ctrl_c_pressed = True
+        for future in futures:
+            future.cancel()
+
+    previous_handler = signal.signal(signal.SIGINT, handle_sigint)
+
+    # Fork explicitly: hooks and other user callables in the framework do not
+    # need to be picklable this way
+    context = multiprocessing.get_context('fork')
+    try:
+        with ProcessPoolExecutor(max_workers=framework.jobs, mp_context=context,
+                                 initializer=init_worker) as executor:
+            for design, config in jobs:
+                future = executor.submit(run_job, design, config, skip_setup)
+                futures.append(future)
+                names[future] = get_job_name(design, config)
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                # A worker that raises or is killed (for example, when it runs
+                # out of memory) only fails its own job, and the results of
+                # the other jobs are kept
+                try:
+                    job = future.result()
+                except Exception as exception:  # pylint: disable=broad-exception-caught
+                    fail_job(framework, names[future], exception)
+                    job = {"name": names[future], "errorcode": fvm_framework.ERROR_IN_TOOL}
+                else:
+                    merge_job(framework, job)
+                    framework.logger.info(f'Finished job {job["name"]}')
+                if job["errorcode"] is not None and first_errorcode is None:
+                    first_errorcode = job["errorcode"]
+                    # Same as in sequential mode: without --cont, stop at
+                    # the first error, but let the running jobs finish
+                    if not framework.cont:
+                        for pending in futures:
+                            pending.cancel()
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+
+    return first_errorcode
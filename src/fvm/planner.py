@@ -0,0 +1,204 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Execution plan and cost estimate, shown with ``--plan``
+
+The plan lists the jobs (design/configuration pairs) and the steps that would
+run for each of them after applying ``-d``, ``-s`` and :meth:`skip
+<fvm.FvmFramework.skip>`, together with the dependencies between the steps.
+Nothing is run. The elapsed time and peak memory of each step are predicted
+from previous executions (see :mod:`fvm.history`), and are used to estimate
+the duration of each job, the makespan of the whole execution with the
+current ``--jobs`` and ``--step-jobs`` values, the peak memory and the number
+of licenses of each tool that would be used at the same time.
+
+Steps without history count as zero seconds and zero bytes, so the estimates
+are lower bounds when some steps have never run. The plan is also written to
+``<outdir>/fvm_plan.json``.
+"""
+import os
+import json
+import heapq
+
+from rich.table import Table
+from rich.console import Console
+
+from fvm import helpers
+from fvm import parallel
+from fvm import scheduler
+from fvm import admission
+from fvm import history
+from fvm.toolchains import toolchains
+
+PLAN_FILE = 'fvm_plan.json'
+
+def get_selected_steps(framework, design):
+    """
+    Get the steps that would run for a design, in order, and the post-steps
+    that would run after each of them
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: design name, or design.config for configurations
+    :type design: str
+
+    :return: a dict with the list of post-steps of each step
+    :rtype: dict[str, list[str]]
+    """
+    if framework.step is None:
+        steps = [step for step in framework.steps.steps
+                 if not framework.is_skipped(design, step)]
+    else:
+        steps = [framework.step]
+    return {step: [f'{step}.{post_step}' for post_step in framework.steps.post_steps.get(step, {})
+                   if not framework.is_skipped(design, f'{step}.{post_step}')]
+            for step in steps}
+
+def simulate(durations, dependencies, slots):
+    """
+    Simulate running tasks in a number of slots, starting each task as soon
+    as a slot is free and its dependencies have finished, in the order of
+    durations
+
+    :param durations: duration of each task, in seconds
+    :type durations: dict[str, float]
+    :param dependencies: the tasks that each task depends on
+    :type dependencies: dict[str, list[str]]
+    :param slots: number of tasks that can run at the same time
+    :type slots: int
+
+    :return: the time at which the last task finishes
+    :rtype: float
+    """
+    pending = list(durations)
+    finished = set()
+    running = []
+    now = 0
+    while pending or running:
+        for task in [task for task in pending
+                     if all(dep in finished for dep in dependencies.get(task, []))]:
+            if len(running) == slots:
+                break
+            pending.remove(task)
+            heapq.heappush(running, (now + durations[task], task))
+        if not running:
+            # The dependencies of the pending tasks cannot be satisfied
+            break
+        now, task = heapq.heappop(running)
+        finished.add(task)
+    return now
+
+def get_plan(framework):
+    """
+    Build the execution plan
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: a dict with the ``jobs`` (each with its ``name``, its ``steps``
+             and its predicted ``duration`` and ``memory``), the predicted
+             ``makespan`` and peak ``memory``, the use of each tool in
+             ``tools``, and the ``jobs`` and ``step_jobs`` values used
+    :rtype: dict
+    """
+    statistics = history.import_results(framework)
+    jobs = []
+    for design, config in parallel.order_jobs(framework, parallel.get_jobs(framework)):
+        name = parallel.get_job_name(design, config)
+        selected = get_selected_steps(framework, name)
+        dependencies = scheduler.get_dependencies(framework, list(selected))
+        steps = []
+        for step, post_steps in selected.items():
+            for task in [step] + post_steps:
+                steps.append({'name': task,
+                              'depends_on': dependencies[step] if task == step else [step],
+                              'tool': toolchains.get_tool(framework.toolchain, task),
+                              'elapsed_time': statistics.get(f'{name}.{task}', {})
+                                                        .get('elapsed_time'),
+                              'memory': admission.get_estimate(framework, name, task)})
+        # Post-steps run in the same thread as their step, right after it
+        durations = {step: sum(task['elapsed_time'] or 0 for task in steps
+                               if task['name'] == step or task['name'].startswith(f'{step}.'))
+                     for step in selected}
+        memories = sorted((task['memory'] for task in steps), reverse=True)
+        jobs.append({'name': name,
+                     'steps': steps,
+                     'duration': simulate(durations, dependencies, framework.step_jobs),
+                     'memory': sum(memories[:framework.step_jobs]),
+                     'unknown': [task['name'] for task in steps
+                                 if task['elapsed_time'] is None]})
+
+    workers = framework.jobs if framework.jobs > 1 else 1
+    memories = sorted((job['memory'] for job in jobs), reverse=True)
+    tools = {}
+    for job in jobs:
+        for task in job['steps']:
+            if task['tool'] is None:
+                continue
+            tool = tools.setdefault(task['tool'], {'runs': 0, 'time': 0})
+            tool['runs'] += 1
+            tool['time'] += task['elapsed_time'] or 0
+    for name, tool in tools.items():
+        limit = framework.license_limits.get(name)
+        concurrent = min(tool['runs'], workers * framework.step_jobs)
+        tool['licenses'] = concurrent if limit is None else min(concurrent, limit)
+    return {'jobs': jobs,
+            'makespan': simulate({job['name']: job['duration'] for job in jobs}, {}, workers),
+            'memory': sum(memories[:workers]),
+            'tools': tools,
+            'workers': workers,
+            'step_jobs': framework.step_jobs}
+
+def show_plan(framework):
+    """
+    Show the execution plan and write it to ``<outdir>/fvm_plan.json``
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: the plan, as returned by :func:`get_plan`
+    :rtype: dict
+    """
+    plan = get_plan(framework)
+    console = Console(force_terminal=True, force_interactive=False)
+    console.rule('[bold white]FVM Plan[/bold white]')
+
+    table = Table(title=f'[cyan]FVM {helpers.get_fvm_version()} Plan[/cyan]')
+    table.add_column("job", justify="left")
+    table.add_column("step", justify="left", min_width=25)
+    table.add_column("depends on", justify="left")
+    table.add_column("tool", justify="left")
+    table.add_column("elapsed time", justify="right", min_width=12)
+    table.add_column("peak memory", justify="right", min_width=8)
+    for job in plan['jobs']:
+        for index, task in enumerate(job['steps']):
+            elapsed_time = task['elapsed_time']
+            table.add_row(job['name'] if index == 0 else '',
+                          task['name'],
+                          ', '.join(task['depends_on']),
+                          task['tool'] or '',
+                          'unknown' if elapsed_time is None else helpers.readable_time(elapsed_time),
+                          helpers.readable_size(task['memory']) if task['memory'] else 'unknown')
+        table.add_row('', f'[bold]total ({len(job["steps"])} steps)[/bold]', '', '',
+                      f'[bold]{helpers.readable_time(job["duration"])}[/bold]',
+                      f'[bold]{helpers.readable_size(job["memory"])}[/bold]',
+                      end_section=True)
+    console.print(table)
+
+    unknown = sum(len(job['unknown']) for job in plan['jobs'])
+    steps = sum(len(job['steps']) for job in plan['jobs'])
+    console.print(f'Jobs: {len(plan["jobs"])}, steps: {steps}, '
+                  f'with --jobs {plan["workers"]} and --step-jobs {plan["step_jobs"]}')
+    console.print(f'Expected makespan: {helpers.readable_time(plan["makespan"])}')
+    console.print(f'Expected peak memory: {helpers.readable_size(plan["memory"])}')
+    for name, tool in sorted(plan['tools'].items()):
+        console.print(f'Tool {name}: {tool["runs"]} runs, {helpers.readable_time(tool["time"])} '
+                      f'in total, up to {tool["licenses"]} licenses at the same time')
+    if unknown:
+        console.print(f'[bold yellow]{unknown} of {steps} steps have never run, so the '
+                      f'estimates are lower bounds[/bold yellow]')
+
+    os.makedirs(framework.outdir, exist_ok=True)
+    with open(os.path.join(framework.outdir, PLAN_FILE), 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=2)
+    return plan
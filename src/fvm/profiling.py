@@ -0,0 +1,182 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Profiling of the Python overhead of FVM itself
+
+When profiling is enabled (with ``--profile`` or
+:meth:`fvm.FvmFramework.set_profile`), the phases of the framework (setup,
+script generation, drom2psl, log checking, parsers, reports...) are timed in
+spans, and the whole execution is profiled with :mod:`cProfile`. Optionally,
+memory allocations are traced with :mod:`tracemalloc`.
+
+At the end of the execution, a per-phase report is written to
+``<outdir>/fvm_profile.txt``, which also shows how much of the wall time was
+spent waiting for the tools, and the cProfile statistics are written to
+``<outdir>/fvm_profile.prof``, which can be inspected with ``pstats`` or
+tools such as ``snakeviz``.
+
+When profiling is disabled, spans only cost a check of a module variable.
+"""
+import os
+import time
+import types
+import pstats
+import cProfile
+import pkgutil
+import importlib
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager
+
+# Profiling state. Worker processes are forked, so they inherit it
+enabled = False
+memory = False
+profiler = None
+start_time = None
+
+# Statistics of each span, by name
+spans = {}
+spans_lock = threading.Lock()
+
+# Name of the span that measures the time spent running the tools
+TOOLS_SPAN = 'run_cmd (tools)'
+
+# Modules whose functions are instrumented with spans when profiling starts
+INSTRUMENTED_PACKAGES = ['fvm.toolchains.questa_pkg.parsers']
+
+@contextmanager
+def span(name):
+    """Time a phase of the framework. Spans with the same name are added up,
+    and spans can be nested"""
+    if not enabled:
+        yield
+        return
+    memory_before = tracemalloc.get_traced_memory()[0] if memory else 0
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - begin
+        allocated = tracemalloc.get_traced_memory()[0] - memory_before if memory else 0
+        with spans_lock:
+            stats = spans.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0,
+                                            'allocated': 0})
+            stats['count'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+            stats['allocated'] += allocated
+
+def profiled(name):
+    """Decorator that runs a function inside a span"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrument(package):
+    """Wrap the functions defined in the modules of a package in spans named
+    after them. Calls through the module (``module.function()``) are timed"""
+    package_module = importlib.import_module(package)
+    for module_info in pkgutil.iter_modules(package_module.__path__):
+        module = importlib.import_module(f'{package}.{module_info.name}')
+        for name, value in list(vars(module).items()):
+            if (isinstance(value, types.FunctionType) and value.__module__ == module.__name__
+                    and not hasattr(value, '__wrapped__')):
+                setattr(module, name, profiled(f'{module_info.name}.{name}')(value))
+
+def merge(other_spans):
+    """Add up the spans of a worker process"""
+    with spans_lock:
+        for name, other in other_spans.items():
+            stats = spans.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0,
+                                            'allocated': 0})
+            stats['count'] += other['count']
+            stats['total'] += other['total']
+            stats['max'] = max(stats['max'], other['max'])
+            stats['allocated'] += other['allocated']
+
+def start(framework):
+    """
+    Start profiling, if enabled in the framework
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    """
+    global enabled, memory, profiler, start_time
+    if not framework.profile or enabled:
+        return
+    enabled = True
+    memory = framework.profile_memory
+    spans.clear()
+    for package in INSTRUMENTED_PACKAGES:
+        instrument(package)
+    if memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    framework.logger.info('Profiling enabled')
+
+def get_report(wall_time, top_allocations=None):
+    """Returns the text of the per-phase report"""
+    lines = [f'{"phase":<50} {"count":>7} {"total (s)":>10} {"mean (s)":>10} '
+             f'{"max (s)":>10} {"% wall":>7}' + (f' {"alloc (KB)":>11}' if memory else '')]
+    for name, stats in sorted(spans.items(), key=lambda item: item[1]['total'], reverse=True):
+        line = (f'{name:<50} {stats["count"]:>7} {stats["total"]:>10.3f} '
+                f'{stats["total"] / stats["count"]:>10.4f} {stats["max"]:>10.3f} '
+                f'{100 * stats["total"] / wall_time if wall_time else 0:>6.1f}%')
+        if memory:
+            line += f' {stats["allocated"] / 1024:>11.1f}'
+        lines.append(line)
+
+    tools_time = spans.get(TOOLS_SPAN, {}).get('total', 0)
+    lines.append('')
+    lines.append(f'Wall time: {wall_time:.3f} s')
+    lines.append(f'Time waiting for the tools: {tools_time:.3f} s '
+                 f'(added up, it may be more than the wall time when running in parallel)')
+    lines.append(f'Time in FVM itself: {max(wall_time - tools_time, 0):.3f} s '
+                 f'(only accurate when running sequentially)')
+    if top_allocations:
+        lines.append('')
+        lines.append('Top memory allocations:')
+        lines += [f'  {statistic}' for statistic in top_allocations]
+    return '\n'.join(lines) + '\n'
+
+def stop(framework):
+    """
+    Stop profiling and write the per-phase report and the cProfile
+    statistics to the output directory
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    """
+    global enabled, profiler
+    if not enabled:
+        return
+    profiler.disable()
+    wall_time = time.perf_counter() - start_time
+    top_allocations = None
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        top_allocations = [f'Current: {current / 1024:.1f} KB, peak: {peak / 1024:.1f} KB']
+        top_allocations += tracemalloc.take_snapshot().statistics('lineno')[:10]
+        tracemalloc.stop()
+
+    os.makedirs(framework.outdir, exist_ok=True)
+    report = get_report(wall_time, top_allocations)
+    report_file = os.path.join(framework.outdir, 'fvm_profile.txt')
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write(report)
+    prof_file = os.path.join(framework.outdir, 'fvm_profile.prof')
+    pstats.Stats(profiler).dump_stats(prof_file)
+    enabled = False
+    profiler = None
+    for line in report.splitlines():
+        framework.logger.info(line)
+    framework.logger.info(f'Profile written to {report_file} and {prof_file}')
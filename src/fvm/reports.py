@@ -8,6 +8,8 @@ import subprocess
 import shutil
 import signal
 import importlib.resources
+import xml.dom.minidom
+import xml.etree.ElementTree as ET
 
 from pathlib import Path
 from datetime import datetime
@@ -19,6 +21,8 @@ from junit_xml import TestSuite, TestCase, to_xml_report_string
 from fvm import helpers
 from fvm import generate_test_cases
 from fvm import manage_allure
+from fvm import archive
+from fvm import profiling
 from fvm.toolchains.questa_pkg.parsers import parse_prove
 
 def get_all_steps(steps, post_steps):
@@ -81,6 +85,7 @@ def rich_table_to_markdown(rich_table_str):
 
     return "\n".join([header, separator] + body)
 
+@profiling.profiled('reports.pretty_summary')
 def pretty_summary(framework, logger):
     """
     Prints the final summary
@@ -99,6 +104,8 @@ def pretty_summary(framework, logger):
 
     # Accumulators for total values
     total_time = 0
+    total_cpu_time = 0
+    max_rss = 0
     total_pass = 0
     total_fail = 0
     total_skip = 0
@@ -116,6 +123,9 @@ def pretty_summary(framework, logger):
         table.add_column("step", justify="left", min_width=25)
         table.add_column("results", justify="right", min_width=5)
         table.add_column("elapsed time", justify="right", min_width=12)
+        table.add_column("cpu time", justify="right", min_width=8)
+        table.add_column("peak memory", justify="right", min_width=8)
+        table.add_column("disk r/w", justify="right", min_width=8)
         all_steps = get_all_steps(framework.steps.steps, framework.steps.post_steps)
         for step in all_steps:
             total_cont += 1
@@ -201,6 +211,20 @@ def pretty_summary(framework, logger):
                     total_time += time
                     time_str_for_table = helpers.readable_time(time)
 
+                # Resource usage of the tools, if any tool was run
+                cpu_str_for_table = "N/A"
+                rss_str_for_table = "N/A"
+                io_str_for_table = "N/A"
+                if "resources" in framework.results[design][step]:
+                    usage = framework.results[design][step]["resources"]
+                    cpu_time = usage["user_time"] + usage["system_time"]
+                    total_cpu_time += cpu_time
+                    max_rss = max(max_rss, usage["max_rss"])
+                    cpu_str_for_table = helpers.readable_time(cpu_time)
+                    rss_str_for_table = helpers.readable_size(usage["max_rss"])
+                    io_str_for_table = (f'{helpers.readable_size(usage["read_bytes"])}/'
+                                        f'{helpers.readable_size(usage["write_bytes"])}')
+
                 if status == 'pass':
                     style = 'bold green'
                     total_pass += 1
@@ -215,7 +239,8 @@ def pretty_summary(framework, logger):
 
                 table.add_row(f'[{style}]{status}[/{style}]',
                               f'{step}', result_str,
-                              time_str_for_table)
+                              time_str_for_table, cpu_str_for_table,
+                              rss_str_for_table, io_str_for_table)
 
                 if step == "prove" and step_summary:
                     prop_summary = step_summary
@@ -328,6 +353,9 @@ def pretty_summary(framework, logger):
     separator_line += "─" * table_width
     summary += f"{separator_line}\n"
     summary += f"{'  Total time:'} [bold cyan]{helpers.readable_time(total_time)}[/bold cyan]\n"
+    summary += (f"{'  Total CPU time:'} "
+                f"[bold cyan]{helpers.readable_time(total_cpu_time)}[/bold cyan]\n")
+    summary += f"{'  Peak memory:'} [bold cyan]{helpers.readable_size(max_rss)}[/bold cyan]\n"
     summary_console.print(summary)
     # If framework.outdir doesn't exist, something went wrong: in that case, do
     # not try to save the HTML summary
@@ -337,6 +365,46 @@ def pretty_summary(framework, logger):
     else:
         logger.error(f'Cannot access output directory {framework.outdir}, something went wrong')
 
+def get_resource_properties(usage):
+    """
+    Get the resource usage of a step as a dict of report properties
+
+    :param usage: resource usage, as stored in the results of the step
+    :type usage: dict
+
+    :return: the properties, with their values as strings
+    :rtype: dict
+    """
+    return {'max_rss_bytes': str(usage['max_rss']),
+            'user_time_sec': f"{usage['user_time']:.2f}",
+            'system_time_sec': f"{usage['system_time']:.2f}",
+            'read_bytes': str(usage['read_bytes']),
+            'write_bytes': str(usage['write_bytes'])}
+
+def add_testcase_properties(xml_string, testcase_properties):
+    """
+    Add a <properties> element to the testcases of a JUnit XML string, since
+    junit_xml only supports properties in testsuites
+
+    :param xml_string: the JUnit XML report
+    :type xml_string: str
+    :param testcase_properties: the properties of each testcase, by name
+    :type testcase_properties: dict[str, dict[str, str]]
+
+    :return: the JUnit XML report with the properties
+    :rtype: str
+    """
+    root = ET.fromstring(xml_string)
+    for testcase in root.iter('testcase'):
+        properties = testcase_properties.get(testcase.get('name'))
+        if properties:
+            properties_element = ET.Element('properties')
+            for name, value in properties.items():
+                ET.SubElement(properties_element, 'property', {'name': name, 'value': value})
+            testcase.insert(0, properties_element)
+    return ET.tostring(root, encoding='unicode')
+
+@profiling.profiled('reports.generate_xml_report')
 def generate_xml_report(framework, logger):
     """
     Generates output reports
@@ -352,6 +420,7 @@ def generate_xml_report(framework, logger):
     #   For all steps:
     #     Define a TestCase per step
     testsuites = []
+    testcase_properties = {}
     for design in framework.designs:
         testcases = []
         all_steps = get_all_steps(framework.steps.steps, framework.steps.post_steps)
@@ -383,6 +452,10 @@ def generate_xml_report(framework, logger):
             else:
                 timestamp = None
 
+            if 'resources' in framework.results[design][step]:
+                usage = framework.results[design][step]['resources']
+                testcase_properties[f'{design}.{step}'] = get_resource_properties(usage)
+
             # status and category are optional attributes and as such they
             # will no be automatically rendered by Allure
             testcase = TestCase(name = f'{design}.{step}',
@@ -428,7 +501,11 @@ def generate_xml_report(framework, logger):
     # error in FvmFramework.setup(). But we will generate the directory and
     # the report nevertheless, because CI tools may depend on the report
     # being there.
-    xml_string = to_xml_report_string(testsuites, prettyprint=True)
+    # The resource usage of each step is added as testcase properties
+    # before pretty printing the report
+    xml_string = to_xml_report_string(testsuites, prettyprint=False)
+    xml_string = add_testcase_properties(xml_string, testcase_properties)
+    xml_string = xml.dom.minidom.parseString(xml_string.encode('utf-8')).toprettyxml()
 
     # Since junit_xml doesn't support adding a name to the global
     # testsuites set, we will modify the generated xml string before
@@ -459,11 +536,13 @@ def generate_xml_report(framework, logger):
                     f'{framework.resultsdir} to {os.path.join(framework.outdir, "fvm_history", timestamp)}')
         shutil.move(framework.resultsdir, os.path.join(framework.outdir, "fvm_history", timestamp))
         os.makedirs(framework.resultsdir, exist_ok=True)
+        archive.prune_in_background(framework, os.path.join(framework.outdir, "fvm_history"))
 
     os.makedirs(framework.resultsdir, exist_ok=True)
     with open(xmlfile, 'w', encoding="utf-8") as f:
         f.write(xml_string)
 
+@profiling.profiled('reports.generate_html_report')
 def generate_html_report(framework, logger):
     """
     Generates an Allure report from the framework results
@@ -506,6 +585,7 @@ def generate_html_report(framework, logger):
                     friendliness_score = None
                     properties = None
                     drom_svg_path = None
+                    parameters = None
 
                     step_path = os.path.join(framework.outdir, design, step)
                     step_summary = f"{step}_summary.html"
@@ -531,6 +611,10 @@ def generate_html_report(framework, logger):
                         start_time = int(start_time_sec * 1000)
                         stop_time = start_time + framework.results[design][step]["elapsed_time"] * 1000
 
+                    if 'resources' in framework.results[design][step]:
+                        usage = framework.results[design][step]['resources']
+                        parameters = get_resource_properties(usage)
+
                     if step == 'friendliness' and 'score' in framework.results[design][step]:
                         friendliness_score = framework.results[design][step]['score']
 
@@ -552,7 +636,8 @@ def generate_html_report(framework, logger):
                                                         properties=properties,
                                                         step_summary_html=step_summary_html,
                                                         html_files=html_files,
-                                                        drom_svg_path=drom_svg_path
+                                                        drom_svg_path=drom_svg_path,
+                                                        parameters=parameters
                                                         )
                 elif ('status' in framework.results[design][step] and
                     framework.results[design][step]['status'] == "skip"):
@@ -670,6 +755,7 @@ def copy_results_to_allure_results(base_dir, dst_dir):
                 dst = os.path.join(dst_dir, file)
                 shutil.copy2(src, dst)
 
+@profiling.profiled('reports.generate_text_report')
 def generate_text_report(framework, logger):
     """
     Generate a Markdown report from the framework results
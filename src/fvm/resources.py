@@ -0,0 +1,263 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Resource usage accounting for the tool processes
+
+The commands launched by :mod:`fvm.runner` run in their own session, which
+includes all the processes they spawn. While a command is running, the
+``/proc`` entries of the processes of its session are sampled periodically,
+and the following values are accumulated:
+
+- ``max_rss``: peak resident memory of the whole session, in bytes
+- ``user_time`` and ``system_time``: CPU time, in seconds
+- ``read_bytes`` and ``write_bytes``: bytes read from and written to storage
+
+Since the values are sampled, processes that live less than the sampling
+interval may be missed. In systems without ``/proc`` all values are zero.
+
+Optionally, the CPU usage, resident memory and number of threads of every
+process of the session can also be written periodically to a CSV file (see
+:meth:`fvm.FvmFramework.set_sample_interval`), and plotted in an HTML file
+that is attached to the dashboard.
+"""
+import os
+import csv
+import time
+from datetime import datetime
+
+PROC = '/proc'
+
+# Clock ticks per second and page size, used to convert /proc values
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Values that are added when merging usages. max_rss is merged with max()
+ADDED = ['user_time', 'system_time', 'read_bytes', 'write_bytes']
+
+# Columns of the time series CSV files
+SAMPLE_FIELDS = ['time', 'pid', 'name', 'cpu_percent', 'rss', 'threads']
+
+def new_usage():
+    """Returns an empty resource usage dict"""
+    usage = {'max_rss': 0}
+    for name in ADDED:
+        usage[name] = 0
+    return usage
+
+def merge_usage(total, usage):
+    """Accumulates a resource usage dict into total, and returns total"""
+    total['max_rss'] = max(total.get('max_rss', 0), usage['max_rss'])
+    for name in ADDED:
+        total[name] = total.get(name, 0) + usage[name]
+    return total
+
+def read_stat(pid):
+    """Returns a tuple (name, fields) with the command name of a process and
+    the fields of /proc/<pid>/stat after it, or None if the process does not
+    exist anymore"""
+    try:
+        with open(os.path.join(PROC, str(pid), 'stat'), 'r', encoding='utf-8') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name is between parentheses and may contain spaces
+    return stat[stat.find('(') + 1:stat.rfind(')')], stat[stat.rfind(')') + 2:].split()
+
+def read_uptime():
+    """Returns the system uptime in seconds, or None if it cannot be read"""
+    try:
+        with open(os.path.join(PROC, 'uptime'), 'r', encoding='utf-8') as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+def read_io(pid):
+    """Returns the storage bytes (read, written) of a process, or (0, 0) if
+    they cannot be read"""
+    read_bytes = write_bytes = 0
+    try:
+        with open(os.path.join(PROC, str(pid), 'io'), 'r', encoding='utf-8') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name == 'read_bytes':
+                    read_bytes = int(value)
+                elif name == 'write_bytes':
+                    write_bytes = int(value)
+    except (OSError, ValueError):
+        pass
+    return read_bytes, write_bytes
+
+def get_session_pids(sid):
+    """Returns the pids of all the processes of a session"""
+    pids = []
+    try:
+        entries = os.listdir(PROC)
+    except OSError:
+        return pids
+    for entry in entries:
+        if entry.isdigit():
+            stat = read_stat(entry)
+            # fields[3] is the session id
+            if stat is not None and len(stat[1]) > 3 and stat[1][3] == str(sid):
+                pids.append(int(entry))
+    return pids
+
+def sample(sid, state):
+    """
+    Sample the processes of a session and update its resource usage
+
+    :param sid: session id, the pid of the command started by the runner
+    :type sid: int
+    :param state: sampling state, a dict with the ``usage`` so far and the
+                  last values seen for each process in ``processes``. Use
+                  ``{}`` for the first sample
+    :type state: dict
+
+    :return: the resource usage of the session so far
+    :rtype: dict
+    """
+    usage = state.setdefault('usage', new_usage())
+    processes = state.setdefault('processes', {})
+    # Processes that are alive in this sample, for the time series
+    state['time'] = time.time()
+    state['uptime'] = read_uptime()
+    state['alive'] = {}
+    rss = 0
+    for pid in get_session_pids(sid):
+        stat = read_stat(pid)
+        if stat is None or len(stat[1]) < 22:
+            continue
+        name, fields = stat
+        # utime, stime, threads, start time (in clock ticks since boot) and
+        # rss (in pages) of the process itself. The time of its children is
+        # sampled separately, so cutime and cstime are not used, to avoid
+        # counting it twice
+        read_bytes, write_bytes = read_io(pid)
+        processes[pid] = {'user_time': int(fields[11]) / CLOCK_TICKS,
+                          'system_time': int(fields[12]) / CLOCK_TICKS,
+                          'read_bytes': read_bytes,
+                          'write_bytes': write_bytes}
+        process_rss = int(fields[21]) * PAGE_SIZE
+        state['alive'][pid] = {'name': name,
+                               'cpu_time': processes[pid]['user_time'] +
+                                           processes[pid]['system_time'],
+                               'start': int(fields[19]) / CLOCK_TICKS,
+                               'rss': process_rss,
+                               'threads': int(fields[17])}
+        rss += process_rss
+
+    usage['max_rss'] = max(usage['max_rss'], rss)
+    for name in ADDED:
+        usage[name] = sum(process[name] for process in processes.values())
+    return usage
+
+def write_samples(state, filename):
+    """
+    Append the processes of the last sample to a time series CSV file
+
+    The CPU usage of each process is averaged since the previous time it
+    was written, or since it started if it was not written before (as
+    ``ps`` does)
+
+    :param state: sampling state, as updated by :func:`sample`
+    :type state: dict
+    :param filename: path of the CSV file
+    :type filename: str
+    """
+    now = state.get('time')
+    if now is None:
+        return
+    written = state.setdefault('written', {})
+    written_time = state.get('written_time')
+    rows = []
+    for pid, process in state['alive'].items():
+        if pid in written and written_time is not None and now > written_time:
+            cpu_percent = 100 * (process['cpu_time'] - written[pid]) / (now - written_time)
+        elif state['uptime'] is not None and state['uptime'] > process['start']:
+            cpu_percent = 100 * process['cpu_time'] / (state['uptime'] - process['start'])
+        else:
+            cpu_percent = 0
+        rows.append([f'{now:.3f}', pid, process['name'], f'{cpu_percent:.1f}',
+                     process['rss'], process['threads']])
+    state['written'] = {pid: process['cpu_time'] for pid, process in state['alive'].items()}
+    state['written_time'] = now
+
+    new_file = not os.path.exists(filename)
+    with open(filename, 'a', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(SAMPLE_FIELDS)
+        writer.writerows(rows)
+
+def read_samples(filename):
+    """
+    Read a time series CSV file and add up the values of all the processes
+    of each sample
+
+    :param filename: path of the CSV file
+    :type filename: str
+
+    :return: A list of (time, cpu_percent, rss, threads) tuples, sorted by
+             time
+    :rtype: list[tuple[float, float, int, int]]
+    """
+    totals = {}
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            sample_time = float(row['time'])
+            cpu_percent, rss, threads = totals.get(sample_time, (0, 0, 0))
+            totals[sample_time] = (cpu_percent + float(row['cpu_percent']),
+                                   rss + int(row['rss']), threads + int(row['threads']))
+    return [(sample_time, *values) for sample_time, values in sorted(totals.items())]
+
+def svg_chart(points, label, color, width=800, height=200):
+    """Returns an SVG line chart of a list of (x, y) points"""
+    margin = 50
+    max_x = max(x for x, _ in points) or 1
+    max_y = max(y for _, y in points) or 1
+    def scale(x, y):
+        return (margin + x / max_x * (width - 2 * margin),
+                height - margin + 10 - y / max_y * (height - 2 * margin))
+    polyline = ' '.join(f'{px:.1f},{py:.1f}' for px, py in (scale(x, y) for x, y in points))
+    left, bottom = scale(0, 0)
+    right, top = scale(max_x, max_y)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'
+            f'<line x1="{left}" y1="{bottom}" x2="{right}" y2="{bottom}" stroke="black"/>'
+            f'<line x1="{left}" y1="{bottom}" x2="{left}" y2="{top}" stroke="black"/>'
+            f'<text x="{left}" y="{top - 10:.1f}" font-size="12">{label} '
+            f'(max {max_y:.1f})</text>'
+            f'<text x="{right}" y="{bottom + 20}" font-size="12" text-anchor="end">'
+            f'{max_x:.0f} s</text>'
+            f'<polyline fill="none" stroke="{color}" stroke-width="1.5" points="{polyline}"/>'
+            '</svg>')
+
+def write_chart(csv_filename, html_filename, title):
+    """
+    Plot the memory, CPU and thread count curves of a time series CSV file
+    into an HTML file
+
+    :param csv_filename: path of the CSV file
+    :type csv_filename: str
+    :param html_filename: path of the HTML file
+    :type html_filename: str
+    :param title: title of the charts
+    :type title: str
+    """
+    samples = read_samples(csv_filename)
+    if not samples:
+        return
+    start = samples[0][0]
+    memory = [(sample_time - start, rss / (1024 * 1024))
+              for sample_time, _, rss, _ in samples]
+    cpu = [(sample_time - start, cpu_percent) for sample_time, cpu_percent, _, _ in samples]
+    threads = [(sample_time - start, thread_count) for sample_time, _, _, thread_count in samples]
+    started = datetime.fromtimestamp(start).isoformat(timespec='seconds')
+    html = ('<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>{title} resource usage</title></head><body>'
+            f'<h3>{title} resource usage (started {started})</h3>'
+            f'{svg_chart(memory, "Memory (MB)", "#1f77b4")}<br/>'
+            f'{svg_chart(cpu, "CPU (%)", "#d62728")}<br/>'
+            f'{svg_chart(threads, "Threads", "#2ca02c")}'
+            '</body></html>')
+    with open(html_filename, 'w', encoding='utf-8') as f:
+        f.write(html)
@@ -0,0 +1,319 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Asynchronous execution engine for the tool subprocesses
+
+All the commands launched by :meth:`fvm.FvmFramework.run_cmd` are supervised
+by a single asyncio event loop, which runs in its own thread. Each command is
+started in its own process group, and its stdout and stderr lines are sent
+through a queue to the thread that called ``run_cmd``, which classifies and
+logs them. Since the event loop is shared, any number of commands can be
+running at the same time (for example, when running steps concurrently) and
+all of them can be stopped at once on Ctrl+C.
+
+While a command runs, the resource usage of its processes is sampled every
+``SAMPLE_INTERVAL`` seconds (see :mod:`fvm.resources`).
+
+Commands can have a wall-clock deadline. When it expires, the command is
+interrupted with SIGINT, and if it is still running ``KILL_DELAY`` seconds
+later it is killed with SIGKILL. The same escalation is used on Ctrl+C, and
+when the command is cancelled by setting its cancel event (for example, when
+another command already produced the results it was computing).
+
+Commands can also run in another host or in a batch scheduler (see
+:mod:`fvm.executors`). In that case, the local process is the one that runs
+the job (``ssh`` or the submission command), the output written by the job
+to its log file is followed, the exit status saved by the job is used, and
+interrupting the command also cancels the job.
+"""
+import os
+import time
+import signal
+import asyncio
+import shutil
+import threading
+
+from fvm import resources
+from fvm import executors
+
+# Seconds to wait after SIGINT before sending SIGKILL
+KILL_DELAY = 10
+
+# Seconds between resource usage samples
+SAMPLE_INTERVAL = 0.5
+
+# Seconds between checks of the cancel event of a command
+CANCEL_INTERVAL = 0.5
+
+# Maximum length of a line of output
+LINE_LIMIT = 16 * 1024 * 1024
+
+# Command that runs a command pinned to a set of CPUs
+TASKSET = 'taskset'
+
+# Event loop and the thread where it runs. Worker processes are forked, and
+# forking does not copy threads, so the loop is created again if the pid
+# changes
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+
+# Processes that are still running, the remote jobs that some of them run,
+# and the commands that are cancelling jobs. Only accessed from the event
+# loop thread
+processes = set()
+jobs = {}
+cancel_tasks = set()
+
+def get_loop():
+    """Returns the event loop that supervises the commands, starting it the
+    first time"""
+    global _loop, _loop_pid
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            processes.clear()
+            jobs.clear()
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            thread = threading.Thread(target=_loop.run_forever, name='fvm runner',
+                                      daemon=True)
+            thread.start()
+        return _loop
+
+def start(framework, cmd, output, cwd=None, env=None, deadline=None, series=None, job=None,
+          cpus=None, cancel=None):
+    """
+    Start a command in the event loop
+
+    Each line written by the command is put in the output queue as a tuple
+    (stream, line), where stream is "stdout" or "stderr". When the command
+    has finished and all its output has been read, (None, None) is put in
+    the queue.
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param cmd: the command and its arguments
+    :type cmd: list[str]
+    :param output: queue where the output lines are put
+    :type output: queue.Queue
+    :param cwd: working directory of the command
+    :type cwd: str or None
+    :param env: environment of the command
+    :type env: dict or None
+    :param deadline: ``time.monotonic()`` value at which the command is
+                     interrupted, or None for no deadline
+    :type deadline: float or None
+    :param series: a tuple (filename, interval) to write the resource usage
+                   time series of the command to a CSV file every interval
+                   seconds, or None to not write it
+    :type series: tuple[str, float] or None
+    :param job: a remote job prepared by :func:`fvm.executors.prepare` that
+                runs the command, or None to run the command locally
+    :type job: dict or None
+    :param cpus: CPUs where the command runs, or None to run it in any CPU
+    :type cpus: list[int] or None
+    :param cancel: event that interrupts the command when it is set, or None
+    :type cancel: threading.Event or None
+
+    :return: A future whose result is a dict with the ``returncode`` of the
+             command, whether it was ``timed_out`` or ``cancelled``, and its
+             resource ``usage``
+    :rtype: concurrent.futures.Future
+    """
+    return asyncio.run_coroutine_threadsafe(
+        supervise(framework, cmd, output, cwd, env, deadline, series, job, cpus, cancel),
+        get_loop())
+
+async def read_stream(stream, name, output):
+    """Put the lines of a stream in the output queue until it is closed"""
+    while True:
+        line = await stream.readline()
+        if not line:
+            break
+        output.put((name, line.decode('utf-8', errors='replace')))
+
+async def follow_file(filename, output, finished):
+    """Put the lines of a file in the output queue as they are written to it,
+    until finished is set"""
+    position = 0
+    pending = b''
+    while True:
+        last_read = finished.is_set()
+        try:
+            with open(filename, 'rb') as f:
+                f.seek(position)
+                data = f.read()
+                position = f.tell()
+        except OSError:
+            data = b''
+        *lines, pending = (pending + data).split(b'\n')
+        for line in lines:
+            output.put(('stdout', (line + b'\n').decode('utf-8', errors='replace')))
+        if last_read:
+            break
+        await asyncio.sleep(executors.POLL_INTERVAL)
+    if pending:
+        output.put(('stdout', pending.decode('utf-8', errors='replace')))
+
+async def get_job_returncode(framework, job, returncode):
+    """Returns the exit status saved by a remote job. If the job did not
+    save it, the exit status of the command that ran the job is returned"""
+    status = executors.read_status(job)
+    waited = 0
+    while status is None and returncode == 0 and waited < executors.STATUS_WAIT:
+        await asyncio.sleep(executors.POLL_INTERVAL)
+        waited += executors.POLL_INTERVAL
+        status = executors.read_status(job)
+    if status is not None:
+        return status
+    if returncode == 0:
+        framework.logger.error(f'Job {job["name"]} finished without saving its exit status')
+        return 1
+    return returncode
+
+async def watch_cancel(framework, process, cancel, state):
+    """Interrupt a command when its cancel event is set"""
+    while process.returncode is None:
+        if cancel.is_set():
+            state['cancelled'] = True
+            interrupt(framework, process)
+            return
+        await asyncio.sleep(CANCEL_INTERVAL)
+
+async def sample_resources(pid, state, series):
+    """Sample the resource usage of the session of a command until it is
+    cancelled, and write its time series if required"""
+    interval = SAMPLE_INTERVAL
+    filename = series_interval = last_write = None
+    if series is not None:
+        filename, series_interval = series
+        interval = min(interval, series_interval)
+    while True:
+        resources.sample(pid, state)
+        if series is not None and (last_write is None or
+                                   time.monotonic() - last_write >= series_interval):
+            resources.write_samples(state, filename)
+            last_write = time.monotonic()
+        await asyncio.sleep(interval)
+
+async def supervise(framework, cmd, output, cwd, env, deadline, series, job, cpus,
+                    cancel=None):
+    """Run a command, reading its output, until it finishes or its deadline
+    expires"""
+    try:
+        # The affinity is set by taskset before running the command, so all
+        # the threads and processes of the command inherit it. A preexec_fn
+        # is not safe here, since this thread forks from a multithreaded
+        # process
+        command = list(cmd if job is None else job['command'])
+        taskset = TASKSET if cpus is not None and shutil.which(TASKSET) else None
+        if taskset is not None:
+            command = [taskset, '-c', ','.join(str(cpu) for cpu in cpus)] + command
+        process = await asyncio.create_subprocess_exec(
+            *command, cwd=cwd, env=env,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            start_new_session=True, limit=LINE_LIMIT)
+        if cpus is not None and taskset is None:
+            # Without taskset, only the processes and threads started after
+            # this call inherit the affinity
+            try:
+                os.sched_setaffinity(process.pid, cpus)
+            except OSError:
+                pass
+        processes.add(process)
+        if job is not None:
+            jobs[process] = job
+        sampling_state = {}
+        sampler = asyncio.ensure_future(sample_resources(process.pid, sampling_state,
+                                                       series))
+        cancel_state = {}
+        watcher = None
+        if cancel is not None:
+            watcher = asyncio.ensure_future(watch_cancel(framework, process, cancel,
+                                                         cancel_state))
+        # Set when the output file of the job does not have to be followed
+        # anymore
+        finished = asyncio.Event()
+        try:
+            readers = [read_stream(process.stdout, 'stdout', output),
+                       read_stream(process.stderr, 'stderr', output)]
+            if job is not None and job['log'] is not None:
+                readers.append(follow_file(job['log'], output, finished))
+            readers = asyncio.gather(*readers)
+            waiter = asyncio.ensure_future(process.wait())
+            timed_out = False
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                framework.logger.error(f'Deadline expired, interrupting {cmd[0]}')
+                interrupt(framework, process)
+                await waiter
+            returncode = process.returncode
+            if job is not None:
+                returncode = await get_job_returncode(framework, job, returncode)
+            finished.set()
+            await readers
+        finally:
+            finished.set()
+            sampler.cancel()
+            if watcher is not None:
+                watcher.cancel()
+            processes.discard(process)
+            jobs.pop(process, None)
+        usage = sampling_state.get('usage', resources.new_usage())
+        return {'returncode': returncode, 'timed_out': timed_out,
+                'cancelled': cancel_state.get('cancelled', False), 'usage': usage}
+    finally:
+        output.put((None, None))
+
+async def cancel_job(framework, job):
+    """Run the cancel command of a remote job, if it has one"""
+    cancel = executors.get_cancel_command(job)
+    if cancel is None:
+        return
+    framework.logger.warning(f'Cancelling job {job["name"]}: {" ".join(cancel)}')
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cancel, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        await process.wait()
+    except OSError as exception:
+        framework.logger.error(f'Could not cancel job {job["name"]}: {exception}')
+
+def interrupt(framework, process):
+    """Send SIGINT to the process group of a command, and SIGKILL if it is
+    still running after KILL_DELAY seconds. Must be called from the event
+    loop thread"""
+    if process.returncode is not None:
+        return
+    if process in jobs:
+        task = asyncio.ensure_future(cancel_job(framework, jobs[process]))
+        cancel_tasks.add(task)
+        task.add_done_callback(cancel_tasks.discard)
+    try:
+        os.killpg(process.pid, signal.SIGINT)
+    except ProcessLookupError:
+        return
+
+    def kill_if_alive():
+        if process.returncode is None:
+            framework.logger.error(f'Process still running after {KILL_DELAY}s, sending SIGKILL')
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                framework.logger.warning("Process already terminated before SIGKILL")
+
+    asyncio.get_running_loop().call_later(KILL_DELAY, kill_if_alive)
+
+def interrupt_all(framework):
+    """Interrupt all the running commands. Can be called from any thread,
+    including signal handlers"""
+    if _loop is None or _loop_pid != os.getpid():
+        return
+
+    def interrupt_running():
+        for process in list(processes):
+            interrupt(framework, process)
+
+    _loop.call_soon_threadsafe(interrupt_running)
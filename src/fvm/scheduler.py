@@ -0,0 +1,161 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Dependency-aware scheduler for the steps of a design
+
+Steps declare which other steps they depend on when they are added (see
+:class:`fvm.steps.Steps`). A step is ready when all its dependencies have
+finished, and ready steps are run in the order in which they were defined.
+Steps that depend on a failed step are skipped, except if they only need to
+run after it.
+With ``framework.step_jobs`` set to 1, steps are run one after the other in
+the calling thread, so the behavior is the same as running them in a loop.
+With a higher value, up to ``framework.step_jobs`` ready steps are run
+concurrently in threads.
+
+Each step is run together with its pre/post hooks and its post_steps, since
+post_steps must always run after their step.
+"""
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+def get_dependencies(framework, steps):
+    """
+    Get the dependencies of each step, restricted to the steps that are going
+    to be run
+
+    Dependencies on steps that are not going to be run (because they were
+    skipped or because a single step was selected) are considered satisfied.
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param steps: the steps to run
+    :type steps: list[str]
+
+    :return: A dict with the list of dependencies of each step
+    :rtype: dict[str, list[str]]
+    """
+    dependencies = {}
+    for step in steps:
+        dependencies[step] = [dep for dep in framework.steps.get_dependencies(step)
+                              if dep in steps]
+        framework.logger.trace(f'{step=} depends on {dependencies[step]}')
+    return dependencies
+
+def get_ready(framework, design, pending, dependencies, finished):
+    """
+    Returns the first pending step whose dependencies have all finished, or
+    None if no step is ready
+
+    Pending steps that depend on a failed step will never be ready, so they
+    are removed from pending and marked as skipped, unless they only need to
+    run after it
+    """
+    for step in list(pending):
+        after = framework.steps.steps[step].get('after', [])
+        failed = [dep for dep in dependencies[step] if dep not in after
+                  and framework.results[design][dep].get('status') == 'fail']
+        if failed:
+            framework.logger.warning(f'{step=} of {design=} will not run because '
+                                     f'it depends on failed steps {failed}')
+            framework.results[design][step]['status'] = 'skip'
+            pending.remove(step)
+            finished.add(step)
+            continue
+        if all(dep in finished for dep in dependencies[step]):
+            return step
+    return None
+
+def run_step_in_thread(framework, design, step):
+    """
+    Run a step (with its hooks and post_steps) from a scheduler thread
+
+    :return: the error code if the step required the framework to exit, or
+             None otherwise
+    :rtype: dict or None
+    """
+    try:
+        framework.run_step_with_hooks(design, step)
+    except SystemExit:
+        return framework.exit_errorcode
+    return None
+
+def run_steps(framework, design, steps):
+    """
+    Run the specified steps of a design, honoring their dependencies
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: name of the design (or design.config)
+    :type design: str
+    :param steps: the steps to run, in their order of definition
+    :type steps: list[str]
+
+    :return: A tuple (pending, errorcode) with the steps that could not be
+             run because their dependencies cannot be satisfied, and the
+             error code of the first step that required the framework to exit
+             (or None)
+    :rtype: tuple[list[str], dict or None]
+    """
+    dependencies = get_dependencies(framework, steps)
+    pending = list(steps)
+    finished = set()
+
+    if framework.step_jobs == 1:
+        while pending:
+            step = get_ready(framework, design, pending, dependencies, finished)
+            if step is None:
+                break
+            pending.remove(step)
+            framework.run_step_with_hooks(design, step)
+            finished.add(step)
+        return pending, None
+
+    return pending, run_concurrently(framework, design, pending, dependencies, finished)
+
+def run_concurrently(framework, design, pending, dependencies, finished):
+    """Run the pending steps of a design in up to framework.step_jobs threads.
+    Returns the error code of the first step that required the framework to
+    exit, and stops launching new steps after it"""
+    running = {}
+    errorcode = None
+
+    # Only the main thread can receive signals, so the Ctrl+C handler that
+    # stops the running tools must be installed here and not in run_cmd
+    previous_handler = None
+    if threading.current_thread() is threading.main_thread():
+        previous_handler = signal.signal(signal.SIGINT, framework.handle_sigint)
+
+    try:
+        with ThreadPoolExecutor(max_workers=framework.step_jobs,
+                                thread_name_prefix=design) as executor:
+            while pending or running:
+                # Launch all ready steps, unless we have to stop
+                while (len(running) < framework.step_jobs and errorcode is None
+                       and framework.ctrl_c_pressed is False):
+                    step = get_ready(framework, design, pending, dependencies, finished)
+                    if step is None:
+                        break
+                    pending.remove(step)
+                    framework.logger.trace(f'Launching {design}.{step}')
+                    future = executor.submit(run_step_in_thread, framework, design, step)
+                    running[future] = step
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    finished.add(step)
+                    step_errorcode = future.result()
+                    if step_errorcode is not None and errorcode is None:
+                        errorcode = step_errorcode
+    finally:
+        if previous_handler is not None:
+            signal.signal(signal.SIGINT, previous_handler)
+
+    # Steps that were not launched because we had to stop are not pending
+    # because of their dependencies
+    if errorcode is not None or framework.ctrl_c_pressed:
+        pending.clear()
+    return errorcode
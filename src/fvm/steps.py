@@ -16,19 +16,30 @@ class Steps:
         self.steps = {}
         self.post_steps = {}
 
-    def add_step(self, framework, step, setup, run):
-        """Adds a step to the steps dictionary. Fails if the step already exists"""
+    def add_step(self, framework, step, setup, run, depends_on=None):
+        """Adds a step to the steps dictionary. Fails if the step already exists
+
+        depends_on is a list of steps that must have finished (and not
+        failed) before this step can run. Steps without dependencies between
+        them may be run concurrently. Steps that must only run after others,
+        whether those failed or not, can be listed in the "after" list of the
+        step"""
         if step in self.steps:
             framework.logger.error(f'{step=} already exists in {self.steps=}')
         self.steps[step] = {}
         self.steps[step]["setup"] = setup
         self.steps[step]["run"] = run
+        self.steps[step]["depends_on"] = self.check_dependencies(framework, step, depends_on)
 
     # Cannot reuse add_step for post_steps because post_steps are never run if
     # the relevant step fails, whereas steps may be run even if the previous
     # step fails (when using the --continue flag)
-    def add_post_step(self, framework, step, post_step, setup, run):
-        """Adds a post_step to the post_steps dictionary. Fails if the step does not exist"""
+    def add_post_step(self, framework, step, post_step, setup, run, depends_on=None):
+        """Adds a post_step to the post_steps dictionary. Fails if the step does not exist
+
+        post_steps always run after their step, so they implicitly depend on
+        it. depends_on is a list of other steps that must also have finished
+        before the post_step runs"""
         if step not in self.steps:
             framework.logger.error(f'{step=} does not exist in {self.steps=}')
         if post_step in self.post_steps:
@@ -40,8 +51,35 @@ class Steps:
         self.post_steps[step][post_step] = {}
         self.post_steps[step][post_step]["setup"] = setup
         self.post_steps[step][post_step]["run"] = run
+        self.post_steps[step][post_step]["depends_on"] = self.check_dependencies(framework,
+                                                                                 f'{step}.{post_step}',
+                                                                                 depends_on)
+
+    def check_dependencies(self, framework, step, depends_on):
+        """Returns depends_on as a list, logging an error for each dependency
+        that is not an already existing step"""
+        if depends_on is None:
+            return []
+        for dependency in depends_on:
+            if dependency not in self.steps:
+                framework.logger.error(f'{step=} depends on {dependency=}, which does '
+                                       f'not exist in {list(self.steps)}')
+        return list(depends_on)
+
+    def get_dependencies(self, step):
+        """Returns the steps that must be finished before running step and its
+        post_steps"""
+        dependencies = list(self.steps[step].get("depends_on", []))
+        for dependency in self.steps[step].get("after", []):
+            if dependency not in dependencies:
+                dependencies.append(dependency)
+        for post_step in self.post_steps.get(step, {}).values():
+            for dependency in post_step.get("depends_on", []):
+                if dependency not in dependencies and dependency != step:
+                    dependencies.append(dependency)
+        return dependencies
 
-    def append_step(self, framework, target, step, setup, run):
+    def append_step(self, framework, target, step, setup, run, depends_on=None):
         """Appends a step after the target step."""
         # Fail if target not in dict
         if target not in self.steps:
@@ -51,11 +89,12 @@ class Steps:
         # Convert dict to list
         l = list(self.steps.items())
         # Add step after target
-        l.insert(pos+1, (step, {"setup": setup, "run": run}))
+        l.insert(pos+1, (step, {"setup": setup, "run": run,
+                                "depends_on": self.check_dependencies(framework, step, depends_on)}))
         # Convert list to dict
         self.steps = dict(l)
 
-    def prepend_step(self, framework, target, step, setup, run):
+    def prepend_step(self, framework, target, step, setup, run, depends_on=None):
         """Prepends a step before the target step."""
         # Fail if target not in dict
         if target not in self.steps:
@@ -65,6 +104,7 @@ class Steps:
         # Convert dict to list
         l = list(self.steps.items())
         # Add step before target
-        l.insert(pos, (step, {"setup": setup, "run": run}))
+        l.insert(pos, (step, {"setup": setup, "run": run,
+                              "depends_on": self.check_dependencies(framework, step, depends_on)}))
         # Convert list to dict
         self.steps = dict(l)
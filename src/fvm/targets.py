@@ -0,0 +1,170 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Enumeration and partitioning of the targets of the prove step
+
+The targets are the ``assert`` and ``cover`` directives of the PSL files.
+To prove them in several groups, a copy of the PSL files is written for
+each group, where the directives of the other groups are blanked out while
+the declarations, the default clock and the ``assume`` and ``restrict``
+directives are kept, so every group is proven under the same constraints.
+
+Assertions and covers embedded in the HDL sources are not directives of the
+PSL files, so they are proven in every group.
+"""
+import os
+import re
+
+# A directive, optionally with a label, at the start of a statement
+DIRECTIVE_REGEX = re.compile(r'^\s*(?:(\w+)\s*:\s*)?(assert|cover)\b', re.IGNORECASE)
+
+def get_comment_markers(flavor):
+    """Returns the line comment marker of a PSL flavor"""
+    return '--' if flavor == 'vhdl' else '//'
+
+def strip_comments(text, flavor):
+    """
+    Replace the comments of a PSL file with spaces, keeping the position of
+    every other character
+
+    :param text: contents of the PSL file
+    :type text: str
+    :param flavor: ``vhdl`` or ``verilog``
+    :type flavor: str
+
+    :return: the contents without comments
+    :rtype: str
+    """
+    marker = get_comment_markers(flavor)
+    pattern = re.compile(rf'{re.escape(marker)}[^\n]*|/\*.*?\*/', re.DOTALL)
+    return pattern.sub(lambda match: re.sub(r'[^\n]', ' ', match.group(0)), text)
+
+def find_directives(text, flavor):
+    """
+    Find the ``assert`` and ``cover`` directives of a PSL file
+
+    Statements end with a semicolon at the top level of a vunit. Semicolons
+    inside braces (such as the ones that concatenate the elements of a SERE)
+    do not end a statement
+
+    :param text: contents of the PSL file
+    :type text: str
+    :param flavor: ``vhdl`` or ``verilog``
+    :type flavor: str
+
+    :return: for each directive, a dict with its ``start`` and ``end``
+             offsets in the text, its ``label`` (None if it has none), its
+             ``kind`` (``assert`` or ``cover``) and the ``line`` where it
+             starts
+    :rtype: list[dict]
+    """
+    code = strip_comments(text, flavor)
+    directives = []
+    depth = 0
+    start = 0
+    for offset, char in enumerate(code):
+        end = None
+        if char == '{':
+            depth += 1
+            if depth == 1:
+                start = offset + 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                start = offset + 1
+        elif char == ';' and depth == 1:
+            end = offset + 1
+        if end is None:
+            continue
+        statement = code[start:end]
+        match = DIRECTIVE_REGEX.match(statement)
+        if match:
+            # Do not include the whitespace before the directive
+            first = start + len(statement) - len(statement.lstrip())
+            directives.append({'start': first, 'end': end, 'label': match.group(1),
+                               'kind': match.group(2).lower(),
+                               'line': code.count('\n', 0, first) + 1})
+        start = end
+    return directives
+
+def get_targets(psl_files):
+    """
+    Get the targets of the PSL files
+
+    :param psl_files: the PSL files, as dicts with their ``file``,
+                      ``flavor`` and ``library``
+    :type psl_files: list[dict]
+
+    :return: for each target, a dict with the ``psl`` file it is in, its
+             ``index`` in the file, its ``kind`` and a ``name``, which is its
+             label or its file and line if it has no label
+    :rtype: list[dict]
+    """
+    targets = []
+    for psl in psl_files:
+        with open(psl['file'], 'r', encoding='utf-8') as f:
+            text = f.read()
+        for index, directive in enumerate(find_directives(text, psl['flavor'])):
+            name = directive['label'] or f'{os.path.basename(psl["file"])}:{directive["line"]}'
+            targets.append({'psl': psl, 'index': index, 'kind': directive['kind'],
+                            'name': name})
+    return targets
+
+def is_named(target, name):
+    """Returns True if name, as reported by the tools, is the name of a
+    target, either alone or preceded by its hierarchy"""
+    return name == target['name'] or name.endswith(f'.{target["name"]}')
+
+def split(targets, groups):
+    """
+    Split the targets into groups, alternating between them so directives of
+    the same file, which are usually related, are spread over the groups
+
+    :param targets: the targets, as returned by :func:`get_targets`
+    :type targets: list[dict]
+    :param groups: maximum number of groups
+    :type groups: int
+
+    :return: the non-empty groups
+    :rtype: list[list[dict]]
+    """
+    groups = min(groups, len(targets))
+    return [targets[index::groups] for index in range(groups)]
+
+def write_sources(psl_files, group, outdir):
+    """
+    Write a copy of the PSL files where only the directives of a group are
+    kept
+
+    :param psl_files: the PSL files, as dicts with their ``file``,
+                      ``flavor`` and ``library``
+    :type psl_files: list[dict]
+    :param group: the targets to keep
+    :type group: list[dict]
+    :param outdir: directory where the copies are written
+    :type outdir: str
+
+    :return: the copies of the PSL files, as dicts like the ones in
+             psl_files
+    :rtype: list[dict]
+    """
+    os.makedirs(outdir, exist_ok=True)
+    copies = []
+    for number, psl in enumerate(psl_files):
+        with open(psl['file'], 'r', encoding='utf-8') as f:
+            text = f.read()
+        kept = {target['index'] for target in group if target['psl'] is psl}
+        chars = list(text)
+        for index, directive in enumerate(find_directives(text, psl['flavor'])):
+            if index in kept:
+                continue
+            # Blank the directive, but keep its lines so the messages of the
+            # tools point to the same lines as in the original file
+            for offset in range(directive['start'], directive['end']):
+                if chars[offset] != '\n':
+                    chars[offset] = ' '
+        filename = os.path.join(outdir, f'{number}_{os.path.basename(psl["file"])}')
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(''.join(chars))
+        copies.append(dict(psl, file=os.path.abspath(filename)))
+    return copies
@@ -0,0 +1,104 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Execution timeline in Chrome trace-event format
+
+Every step, post-step and tool subprocess run by FVM is recorded as a span,
+and at the end of the execution all of them are written to
+``<outdir>/timeline.json``. The file can be opened in ``chrome://tracing``
+or in https://ui.perfetto.dev, which show one lane per process (the main
+process and each worker, see :mod:`fvm.parallel`) and thread (each
+concurrent step, see :mod:`fvm.scheduler`), so idle gaps, stragglers and
+serialization points are easy to spot.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+TIMELINE_FILE = 'timeline.json'
+
+# Recorded events and the names of the threads that recorded them. Worker
+# processes send theirs to the main process when their job finishes
+events = []
+thread_names = {}
+events_lock = threading.Lock()
+
+def record(name, category, start, duration, args=None):
+    """
+    Record a span in the timeline
+
+    :param name: name of the span
+    :type name: str
+    :param category: category of the span, such as "step" or "subprocess"
+    :type category: str
+    :param start: start time, in seconds since the epoch
+    :type start: float
+    :param duration: duration of the span, in seconds
+    :type duration: float
+    :param args: extra information shown when the span is selected
+    :type args: dict or None
+    """
+    thread = threading.current_thread()
+    pid = os.getpid()
+    event = {'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': thread.ident,
+             'ts': int(start * 1e6), 'dur': int(duration * 1e6), 'args': args or {}}
+    with events_lock:
+        events.append(event)
+        thread_names[pid, thread.ident] = thread.name
+
+@contextmanager
+def span(name, category, args=None):
+    """Record the code inside the context as a span, even if it raises an
+    exception (for example, SystemExit)"""
+    start = time.time()
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, category, start, time.perf_counter() - begin, args)
+
+def get_recorded():
+    """Returns the recorded events and thread names, to send them from a
+    worker process to the main process"""
+    with events_lock:
+        return {'events': list(events), 'thread_names': list(thread_names.items())}
+
+def clear():
+    """Forget the recorded events"""
+    with events_lock:
+        events.clear()
+        thread_names.clear()
+
+def merge(recorded):
+    """Add the events recorded by a worker process"""
+    with events_lock:
+        events.extend(recorded['events'])
+        thread_names.update({tuple(key): name for key, name in recorded['thread_names']})
+
+def write(framework):
+    """
+    Write the timeline to ``<outdir>/timeline.json``, if anything was recorded
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    """
+    with events_lock:
+        if not events:
+            return
+        trace_events = list(events)
+        main_pid = os.getpid()
+        for pid in sorted({event['pid'] for event in trace_events}):
+            process_name = 'fvm' if pid == main_pid else f'fvm worker {pid}'
+            trace_events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                                 'args': {'name': process_name}})
+        for (pid, tid), thread_name in thread_names.items():
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                                 'args': {'name': thread_name}})
+
+    os.makedirs(framework.outdir, exist_ok=True)
+    filename = os.path.join(framework.outdir, TIMELINE_FILE)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+    framework.logger.info(f'Execution timeline written to {filename}')
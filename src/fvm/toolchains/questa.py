@@ -5,24 +5,44 @@
 # Questa toolchain definition
 
 import os
+import re
+import json
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
 import glob
 import pathlib
 import shutil
+import hashlib
+import fcntl
+import functools
+import signal
+import shlex
+import queue
+import threading
+import time
 
-from fvm.toolchains.questa_pkg.parsers import parse_formal_signoff
-from fvm.toolchains.questa_pkg.parsers import parse_reachability
-from fvm.toolchains.questa_pkg.parsers import parse_reports
-from fvm.toolchains.questa_pkg.parsers import parse_simcover
-from fvm.toolchains.questa_pkg.parsers import parse_lint
-from fvm.toolchains.questa_pkg.parsers import parse_rulecheck
-from fvm.toolchains.questa_pkg.parsers import parse_xverify
-from fvm.toolchains.questa_pkg.parsers import parse_resets
-from fvm.toolchains.questa_pkg.parsers import parse_clocks
-from fvm.toolchains.questa_pkg.parsers import parse_prove
-from fvm.toolchains.questa_pkg.parsers import parse_design_rpt
 from fvm import helpers
-from fvm import tables
+from fvm import runner
+from fvm import executors
+from fvm import affinity
+from fvm import resources
+from fvm import targets
+
+# The parsers and the summary tables are only needed after the tools have
+# run, so they are imported lazily
+parse_formal_signoff = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_formal_signoff')
+parse_reachability = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_reachability')
+parse_reports = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_reports')
+parse_simcover = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_simcover')
+parse_lint = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_lint')
+parse_rulecheck = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_rulecheck')
+parse_xverify = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_xverify')
+parse_resets = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_resets')
+parse_clocks = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_clocks')
+parse_prove = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_prove')
+parse_design_rpt = helpers.lazy_import('fvm.toolchains.questa_pkg.parsers.parse_design_rpt')
+tables = helpers.lazy_import('fvm.tables')
 
 # For the Questa tools, each tool is run through a wrapper which is the actual
 # command that must be run in the command-line
@@ -35,6 +55,7 @@ tools = {
         "reachability"      : ["covercheck", "qverify"],
         "resets"            : ["rdc",        "qverify"],
         "clocks"            : ["cdc",        "qverify"],
+        "bughunt"           : ["propcheck",  "qverify"],
         "prove"             : ["propcheck",  "qverify"],
         "prove.formalcover" : ["propcheck",  "qverify"],
 #        "simulate"       : ["vsim", "vsim"],
@@ -43,6 +64,50 @@ tools = {
 #        "compileverilog" : ["vlog", "vlog"],
         }
 
+# Steps that need the PSL files to be compiled together with the design
+psl_steps = ["bughunt", "prove", "prove.formalcover"]
+
+# Steps that can run back to back in a single qverify session, in the order
+# in which they run
+session_steps = ["lint", "friendliness", "rulecheck", "xverify", "reachability",
+                 "resets", "clocks"]
+
+# Files where the prove step saves the targets of each partition, when it
+# runs in partitions, the variant that decided each target, when it runs a
+# portfolio, and the targets decided by the bughunt step, when they are not
+# proven again
+PARTITIONS_FILE = 'partitions.json'
+PORTFOLIO_FILE = 'portfolio.json'
+BUGHUNT_FILE = 'bughunt.json'
+# Best result of each target escalated after the prove step
+ESCALATION_FILE = 'escalation.json'
+
+# Sections of formal_verify.rpt with conclusive results, by the name that
+# parse_prove.normalize_sections gives them, and the kind of their targets
+DECIDED_SECTIONS = {
+        "Proven"               : ["Targets Proven",                "Asserts"],
+        "Vacuous"              : ["Targets Vacuously Proven",      "Asserts"],
+        "Fired"                : ["Targets Fired",                 "Asserts"],
+        "Fired with Warning"   : ["Targets Fired with Warnings",   "Asserts"],
+        "Covered"              : ["Targets Covered",               "Covers"],
+        "Covered with Warning" : ["Targets Covered with Warnings", "Covers"],
+        "Uncoverable"          : ["Targets Uncoverable",           "Covers"],
+        }
+
+# Seconds between checks of the jobs of the prove step that run in parallel
+JOBS_INTERVAL = 1
+
+# Lines printed by the session script before and after each step, with the
+# time in milliseconds
+SESSION_MARKER = re.compile(r'FVM-SESSION-(BEGIN|END) (\S+) (\d+)')
+
+# Output of the qverify session of each design, split by step, and the lock
+# that makes the steps of a design wait for its session. The results of the
+# design are saved with its output, so a new execution does not reuse it
+sessions = {}
+sessions_lock = threading.Lock()
+session_locks = {}
+
 # Set sensible default options for the tools
 default_flags = {
         "lint methodology" : "ip -goal start",
@@ -52,10 +117,17 @@ default_flags = {
         "rdc generate report" : "-resetcheck",
         "cdc generate report" : "-clockcheck",
         "formal verify" : "-justify_initial_x -auto_constraint_off",
+        "formal verify bughunt" : "",
         }
 
 coverage_goal = {}
 
+# Versions of the tools, by executor and environment, obtained only once
+tool_versions = {}
+
+# Seconds to wait for qverify to report its version
+VERSION_TIMEOUT = 300
+
 setup_toplevel = None
 
 def define_steps(framework, steps):
@@ -64,7 +136,10 @@ def define_steps(framework, steps):
 
     This function is called by the framework to register the steps available
     in this toolchain. The steps are registered in the order they are defined here,
-    so this also defines the order of execution
+    so this also defines the order of execution when steps are run sequentially.
+    None of these steps uses the results of the others, so they do not declare
+    dependencies and may be run concurrently, except for the post_steps of
+    prove, which always run after prove
 
     Each step is defined by a setup function and a run function. The setup
     function generates the script to run the tool, while the run function
@@ -87,6 +162,33 @@ def define_steps(framework, steps):
                         setup_prove_formalcover, run_prove_formalcover)
     steps.add_post_step(framework, 'prove', 'simcover', setup_prove_simcover, run_prove_simcover)
 
+def set_bughunt_step(framework, steps, enabled, fail_fast=False):
+    """
+    Add the bughunt step before the prove step, or remove it. The prove step
+    always runs after it, and in fail-fast mode it depends on it, so it is
+    skipped if the bughunt step fails
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param steps: the Steps object where the steps are registered
+    :type steps: fvm.steps.Steps
+    :param enabled: True to add the step, False to remove it
+    :type enabled: bool
+    :param fail_fast: True to skip the prove step if the bughunt step fails
+    :type fail_fast: bool
+    """
+    prove = steps.steps['prove']
+    after = prove.setdefault('after', [])
+    for dependencies in [prove['depends_on'], after]:
+        if 'bughunt' in dependencies:
+            dependencies.remove('bughunt')
+    if enabled:
+        if 'bughunt' not in steps.steps:
+            steps.prepend_step(framework, 'prove', 'bughunt', setup_bughunt, run_bughunt)
+        (prove['depends_on'] if fail_fast else after).append('bughunt')
+    elif 'bughunt' in steps.steps:
+        del steps.steps['bughunt']
+
 def create_f_file(filename, sources):
     """
     Create a .f file with the list of sources
@@ -100,12 +202,13 @@ def create_f_file(filename, sources):
         for src in sources:
             print(src, file=f)
 
-def gencompilescript(framework, filename, path, psl_compile=False):
+def genstepscript(framework, filename, path):
     """
-    Generate script to compile design sources
+    Generate the header of the script of a step
 
-    This is used as header for the other scripts, since we need to have
-    a compiled netlist in order to do anything
+    The design sources are compiled once by :func:`ensure_compiled`, and
+    the scripts of the steps use the already compiled libraries through the
+    modelsim.ini pointed by the MODELSIM environment variable
 
     :param framework: the FvmFramework object
     :type framework: fvm.framework.FvmFramework
@@ -114,34 +217,200 @@ def gencompilescript(framework, filename, path, psl_compile=False):
     :param path: the path where to create the script
     :type path: str
     """
-    library_path = os.path.join(framework.outdir, "libraries")
-    os.makedirs(library_path, exist_ok=True)
+    with open(os.path.join(path, filename), "w", encoding='utf-8') as f:
+        print('onerror exit', file=f)
+
+def gencompilescript(framework, filename, path, psl_compile=False, psl_files=None):
+    """
+    Generate script to compile design sources
+
+    The libraries are compiled inside path, which must be a new directory
+    with a modelsim.ini where vmap will map them
 
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param filename: the name of the script to create
+    :type filename: str
+    :param path: the path where to create the script and compile the libraries
+    :type path: str
+    :param psl_compile: if True, also compile the PSL files
+    :type psl_compile: bool
+    :param psl_files: the PSL files to compile, if not the ones of the
+                      framework
+    :type psl_files: list[dict] or None
+    """
     with open(os.path.join(path, filename), "w", encoding='utf-8') as f:
         print('onerror exit', file=f)
         ordered_libraries = OrderedDict.fromkeys(framework.libraries_from_hdl_sources)
         for lib in ordered_libraries:
-            lib_dir = os.path.join(library_path, lib)
-            print(f'if {{[file exists {lib_dir}]}} {{', file=f)
-            print(f'    vdel -lib {lib_dir} -all', file=f)
-            print('}', file=f)
+            lib_dir = os.path.join(path, lib)
             print(f'vlib {framework.get_tool_flags("vlib")} {lib_dir}', file=f)
             print(f'vmap {framework.get_tool_flags("vmap")} {lib} {lib_dir}', file=f)
             if framework.vhdl_sources:
-                compile_vhdl(path, framework, lib, f, psl_compile)
+                compile_vhdl(path, framework, lib, f, psl_compile, psl_files)
             if framework.verilog_sources:
-                compile_verilog(path, framework, lib, f, psl_compile)
+                compile_verilog(path, framework, lib, f, psl_compile, psl_files)
             if framework.systemverilog_sources:
-                compile_systemverilog(path, framework, lib, f, psl_compile)
+                compile_systemverilog(path, framework, lib, f, psl_compile, psl_files)
+        print('exit', file=f)
+
+def get_compile_key(framework, psl_compile=False, psl_files=None):
+    """
+    Get a key that identifies a compilation of the design sources
+
+    The key is a hash of everything that affects the compiled libraries:
+    the contents of the sources and their libraries, the compilation flags,
+    the VHDL standard and, if psl_compile is True, the PSL files. Generics
+    are not included, since they are applied when elaborating the design, so
+    all configurations of a design share the same libraries
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param psl_compile: if True, the PSL files are also compiled
+    :type psl_compile: bool
+    :param psl_files: the PSL files to compile, if not the ones of the
+                      framework
+    :type psl_files: list[dict] or None
+
+    :return: the compilation key
+    :rtype: str
+    """
+    items = [framework.vhdlstd, psl_compile, framework.libraries_from_hdl_sources]
+    items += [framework.get_tool_flags(tool) for tool in ["vlib", "vmap", "vcom", "vlog"]]
+    for sources in [framework.vhdl_sources, framework.verilog_sources,
+                    framework.systemverilog_sources]:
+        items += [(os.path.abspath(src), helpers.file_digest(src)) for src in sources]
+    if psl_compile:
+        if psl_files is None:
+            psl_files = framework.psl_sources + framework.drom_generated_psl
+        for psl in psl_files:
+            items.append((psl['flavor'], psl['library'], helpers.file_digest(psl['file'])))
+    return hashlib.sha256(repr(items).encode('utf-8')).hexdigest()[:16]
+
+def ensure_compiled(framework, design, step, psl_compile=False, psl_files=None):
+    """
+    Compile the design sources, unless they were already compiled
 
-def compile_vhdl(path, framework, lib, f, psl_compile):
+    Libraries are compiled into ``outdir/libraries/<key>``, where the key is
+    obtained with :func:`get_compile_key`, so they are only compiled again if
+    something that affects the compilation has changed. A lock file prevents
+    steps or designs that run in parallel from compiling the same libraries
+    at the same time. Each use of the libraries updates the modification time
+    of their ``compiled`` stamp, so the ones that are no longer used can be
+    removed with :func:`prune_libraries`
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: name of the design (or design.config)
+    :type design: str
+    :param step: name of the step that needs the compiled libraries
+    :type step: str
+    :param psl_compile: if True, also compile the PSL files
+    :type psl_compile: bool
+    :param psl_files: the PSL files to compile, if not the ones of the
+                      framework
+    :type psl_files: list[dict] or None
+
+    :return: A tuple (cmd_stdout, cmd_stderr, err, env, elapsed_time), where
+             env is the environment to use the compiled libraries
+    :rtype: tuple[str, str, int, dict, float]
+    """
+    key = get_compile_key(framework, psl_compile, psl_files)
+    libraries_path = os.path.join(framework.outdir, "libraries")
+    library_path = os.path.join(libraries_path, key)
+    modelsim_ini = os.path.abspath(os.path.join(library_path, "modelsim.ini"))
+    stamp = os.path.join(library_path, "compiled")
+    env = framework.env.copy()
+    env["MODELSIM"] = modelsim_ini
+    cmd_stdout, cmd_stderr = "", ""
+    err = 0
+    elapsed_time = 0
+
+    os.makedirs(libraries_path, exist_ok=True)
+    with open(f'{library_path}.lock', "w", encoding='utf-8') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(stamp):
+                framework.logger.info(f'Reusing libraries compiled in {library_path}')
+                os.utime(stamp)
+            else:
+                # Remove any leftovers from a previous failed compilation
+                if os.path.exists(library_path):
+                    shutil.rmtree(library_path)
+                os.makedirs(library_path)
+                with open(modelsim_ini, "w", encoding='utf-8') as f:
+                    print('[Library]', file=f)
+                    print('others = $MODEL_TECH/../modelsim.ini', file=f)
+                gencompilescript(framework, "compile.do", library_path, psl_compile, psl_files)
+                cmd = ['qverify', '-c', '-od', library_path,
+                       '-do', os.path.join(library_path, "compile.do")]
+                cmd_stdout, cmd_stderr = framework.run_cmd(cmd, design, step, 'compile',
+                                                           framework.verbose, env=env)
+                elapsed_time = framework.results[design][step]['elapsed_time']
+                err += framework.logcheck(cmd_stdout, design, step, 'compile')
+                err += framework.logcheck(cmd_stderr, design, step, 'compile')
+                if err == 0:
+                    pathlib.Path(stamp).touch()
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    return cmd_stdout, cmd_stderr, err, env, elapsed_time
+
+def prune_libraries(framework, since):
+    """
+    Remove the compiled libraries that have not been used since a time
+
+    Each prove partition, portfolio and escalation round may compile its own
+    libraries (see :func:`ensure_compiled`), so the libraries that the
+    current run did not use are removed when it finishes, instead of
+    accumulating in ``outdir/libraries`` across runs. The lock files are
+    kept, since another FVM process may be waiting on them
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param since: the time when the run started, as returned by time.time()
+    :type since: float
+    """
+    libraries_path = os.path.join(framework.outdir, "libraries")
+    if not os.path.isdir(libraries_path):
+        return
+    # Some filesystems only store the modification times with a resolution
+    # of seconds
+    since = int(since)
+    for entry in os.listdir(libraries_path):
+        library_path = os.path.join(libraries_path, entry)
+        if not os.path.isdir(library_path):
+            continue
+        with open(f'{library_path}.lock', "w", encoding='utf-8') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                stamp = os.path.join(library_path, "compiled")
+                try:
+                    last_used = os.path.getmtime(stamp if os.path.exists(stamp)
+                                                 else library_path)
+                except OSError:
+                    continue
+                if last_used < since:
+                    framework.logger.trace(f'Removing unused libraries in {library_path}')
+                    shutil.rmtree(library_path, ignore_errors=True)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+def compile_vhdl(path, framework, lib, f, psl_compile, psl_files=None):
     """Compile VHDL sources for a given library"""
     lib_sources = [src for src, library in zip(framework.vhdl_sources,
                                             framework.libraries_from_hdl_sources)
                                             if library == lib]
     f_file_path = os.path.join(path, f'{lib}_design.f')
     create_f_file(f_file_path, lib_sources)
-    if psl_compile:
+    if psl_compile and psl_files is not None:
+        psl_flags = ' '.join(
+            f'-pslfile {psl["file"]}'
+            for psl in psl_files
+            if psl['flavor'] == 'vhdl' and psl['library'] == lib
+        )
+        drom_generated_psl = ' '
+    elif psl_compile:
         psl_flags = ' '.join(
             f'-pslfile {psl["file"]}'
             for psl in framework.psl_sources
@@ -160,7 +429,7 @@ def compile_vhdl(path, framework, lib, f, psl_compile):
         f' -work {lib} -autoorder -f {f_file_path} {drom_generated_psl} {psl_flags}', file=f)
     print('', file=f)
 
-def compile_verilog(path, framework, lib, f, psl_compile):
+def compile_verilog(path, framework, lib, f, psl_compile, psl_files=None):
     """Compile Verilog sources for a given library"""
     lib_sources = [src for src, library in zip(framework.verilog_sources,
                                             framework.libraries_from_hdl_sources)
@@ -168,9 +437,11 @@ def compile_verilog(path, framework, lib, f, psl_compile):
     f_file_path = os.path.join(path, f'{lib}_verilog_design.f')
     create_f_file(f_file_path, lib_sources)
     if psl_compile:
+        if psl_files is None:
+            psl_files = framework.psl_sources
         psl_flags = ' '.join(
             f'-pslfile {psl["file"]}'
-            for psl in framework.psl_sources
+            for psl in psl_files
             if psl['flavor'] == 'verilog' and psl['library'] == lib
         )
     else:
@@ -179,7 +450,7 @@ def compile_verilog(path, framework, lib, f, psl_compile):
             file=f)
     print('', file=f)
 
-def compile_systemverilog(path, framework, lib, f, psl_compile):
+def compile_systemverilog(path, framework, lib, f, psl_compile, psl_files=None):
     """Compile SystemVerilog sources for a given library"""
     lib_sources = [src for src, library in zip(framework.systemverilog_sources,
                                             framework.libraries_from_hdl_sources)
@@ -187,9 +458,11 @@ def compile_systemverilog(path, framework, lib, f, psl_compile):
     f_file_path = os.path.join(path, f'{lib}_systemverilog_design.f')
     create_f_file(f_file_path, lib_sources)
     if psl_compile:
+        if psl_files is None:
+            psl_files = framework.psl_sources
         psl_flags = ' '.join(
             f'-pslfile {psl["file"]}'
-            for psl in framework.psl_sources
+            for psl in psl_files
             if psl['flavor'] == 'verilog' and psl['library'] == lib
         )
     else:
@@ -198,7 +471,212 @@ def compile_systemverilog(path, framework, lib, f, psl_compile):
             file=f)
     print('', file=f)
 
-def run_qverify_step(framework, design, step):
+def get_session_steps(framework, design):
+    """
+    Get the steps of a design that run together in a qverify session
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: the name of the design (or design.config)
+    :type design: str
+
+    :return: the steps, in the order in which they run in the session, or an
+             empty list if session mode is disabled or there are less than
+             two steps to run
+    :rtype: list[str]
+    """
+    # The session runs as the first step, under its deadline, and it would
+    # race with the other steps if they were started concurrently
+    if (not framework.session or framework.step is not None or framework.cache or
+            framework.gui or framework.guinorun or framework.step_jobs > 1):
+        return []
+    steps = [step for step in session_steps
+             if step in framework.steps.steps and not framework.is_skipped(design, step)]
+    if any(step in framework.timeouts for step in steps):
+        framework.logger.debug(f'Some of {steps=} have a timeout, not running them in a session')
+        return []
+    # The pre-hook of the first step runs before the session starts, but the
+    # pre-hooks of the rest would run after their tools already did
+    if any(framework.get_hook(framework.pre_hooks, design, step) is not None
+           for step in steps[1:]):
+        framework.logger.debug(f'Some of {steps=} have a pre-hook, not running them in a session')
+        return []
+    return steps if len(steps) > 1 else []
+
+def gensessionscript(framework, path, steps):
+    """
+    Generate the script that runs several steps in a single qverify session
+
+    The commands of the scripts of the steps are run one after the other. The
+    reports of each step are written to the output directory of the session,
+    and moved to the output directory of the step when it finishes. Before
+    and after each step, a marker is printed, so the output of the session
+    can be split by step
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param path: the path where the scripts of the steps are
+    :type path: str
+    :param steps: the steps to run
+    :type steps: list[str]
+    """
+    session_path = os.path.join(path, 'session')
+    with open(os.path.join(path, 'session.do'), "w", encoding='utf-8') as f:
+        print('onerror exit', file=f)
+        for step in steps:
+            step_path = os.path.join(path, step)
+            print(f'puts "FVM-SESSION-BEGIN {step} [clock milliseconds]"', file=f)
+            with open(os.path.join(path, f'{step}.do'), 'r', encoding='utf-8') as step_script:
+                for line in step_script:
+                    if line.strip() not in ['onerror exit', 'exit']:
+                        f.write(line)
+            print(f'file mkdir {{{step_path}}}', file=f)
+            print(f'foreach item [glob -nocomplain -directory {{{session_path}}} *] '
+                  f'{{ file rename -force $item {{{step_path}}} }}', file=f)
+            print(f'puts "FVM-SESSION-END {step} [clock milliseconds]"', file=f)
+        print('exit', file=f)
+
+def split_session_output(stdout, stderr, end_time):
+    """
+    Split the output of a qverify session by step
+
+    Lines before the first step are assigned to it. Since stderr cannot be
+    ordered with respect to the markers, it is assigned to the last step that
+    started, which is the one that was running if the session failed
+
+    :param stdout: stdout of the session
+    :type stdout: str
+    :param stderr: stderr of the session
+    :type stderr: str
+    :param end_time: time at which the session finished, in seconds since the
+                     epoch
+    :type end_time: float
+
+    :return: a dict with the ``stdout``, ``stderr``, ``start`` and ``end``
+             times (in seconds since the epoch) and whether it ``finished``,
+             for each step that started
+    :rtype: dict[str, dict]
+    """
+    parts = {}
+    step = None
+    header = []
+    for line in stdout.splitlines(keepends=True):
+        match = SESSION_MARKER.search(line)
+        if match:
+            kind, marker_step, milliseconds = match.groups()
+            if kind == 'BEGIN':
+                step = marker_step
+                parts[step] = {'stdout': ''.join(header), 'stderr': '',
+                               'start': int(milliseconds) / 1000, 'end': end_time,
+                               'finished': False}
+                header = []
+            elif marker_step in parts:
+                parts[marker_step]['end'] = int(milliseconds) / 1000
+                parts[marker_step]['finished'] = True
+            continue
+        if step is None:
+            header.append(line)
+        else:
+            parts[step]['stdout'] += line
+    if step is not None:
+        parts[step]['stderr'] = stderr
+    return parts
+
+def run_session(framework, design, steps):
+    """
+    Run several steps of a design in a single qverify session, and save the
+    output of each step in its log
+
+    The session runs as part of the first step, so its compilation, resource
+    usage and license checkout are accounted to that step
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: the name of the design (or design.config)
+    :type design: str
+    :param steps: the steps to run
+    :type steps: list[str]
+
+    :return: the output of each step that started, as returned by
+             :func:`split_session_output`, or None if the design could not be
+             compiled
+    :rtype: dict[str, dict] or None
+    """
+    path = framework.current_path
+    first = steps[0]
+    cmd_stdout, cmd_stderr, compile_err, env, compile_time = ensure_compiled(
+        framework, design, first)
+    if compile_err:
+        return None
+    gensessionscript(framework, path, steps)
+    os.makedirs(os.path.join(path, 'session'), exist_ok=True)
+    cmd = ['qverify', '-c', '-od', os.path.join(path, 'session'),
+           '-do', os.path.join(path, 'session.do')]
+    results = framework.results[design][first]
+    logfile = os.path.join(path, first, f'{first}.log')
+    log_size = os.path.getsize(logfile) if os.path.exists(logfile) else 0
+    previous_stdout, previous_stderr = results['stdout'], results['stderr']
+    framework.logger.info(f'Running {steps=} in a single qverify session')
+    session_stdout, session_stderr = framework.run_cmd(cmd, design, first, 'qverify',
+                                                       framework.verbose, env=env)
+    parts = split_session_output(session_stdout, session_stderr, time.time())
+    # Keep the whole output of the session, and leave only the output of
+    # each step in its log
+    shutil.copyfile(logfile, os.path.join(path, 'session.log'))
+    with open(logfile, 'r+', encoding='utf-8') as f:
+        f.truncate(log_size)
+    results['stdout'], results['stderr'] = previous_stdout, previous_stderr
+    for step, part in parts.items():
+        step_results = framework.results[design][step]
+        os.makedirs(os.path.join(path, step), exist_ok=True)
+        with open(os.path.join(path, step, f'{step}.log'), 'a', encoding='utf-8') as f:
+            f.write(part['stdout'])
+            f.write(part['stderr'])
+        step_results['stdout'] += part['stdout']
+        step_results['stderr'] += part['stderr']
+        step_results['timestamp'] = datetime.fromtimestamp(part['start']).isoformat()
+        step_results['elapsed_time'] = part['end'] - part['start']
+    if first in parts:
+        results['elapsed_time'] += compile_time
+        parts[first]['stdout'] = cmd_stdout + parts[first]['stdout']
+        parts[first]['stderr'] = cmd_stderr + parts[first]['stderr']
+    return parts
+
+def run_in_session(framework, design, step):
+    """
+    Get the output of a step that runs in the qverify session of its design,
+    running the session if it has not run yet
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: the name of the design (or design.config)
+    :type design: str
+    :param step: the name of the step
+    :type step: str
+
+    :return: A tuple (cmd_stdout, cmd_stderr), or None if the step did not
+             start in the session, so it must run on its own
+    :rtype: tuple[str, str] or None
+    """
+    steps = get_session_steps(framework, design)
+    if step not in steps:
+        return None
+    with sessions_lock:
+        lock = session_locks.setdefault(design, threading.Lock())
+    with lock:
+        session = sessions.get(design)
+        if session is None or session['results'] is not framework.results[design]:
+            session = {'results': framework.results[design],
+                       'parts': run_session(framework, design, steps) or {}}
+            sessions[design] = session
+    part = session['parts'].get(step)
+    if part is None:
+        framework.logger.warning(f'{step=} did not run in the qverify session of {design=}, '
+                                 f'running it on its own')
+        return None
+    return part['stdout'], part['stderr']
+
+def run_qverify_step(framework, design, step, psl_files=None):
     """
     Run a specific step with the Questa formal toolchain.
 
@@ -211,6 +689,9 @@ def run_qverify_step(framework, design, step):
     :type design: str
     :param step: the name of the step to run
     :type step: str
+    :param psl_files: the PSL files to compile, if not the ones of the
+                      framework
+    :type psl_files: list[dict] or None
 
     :return: A tuple (cmd_stdout, cmd_stderr, stdout_err, stderr_err)
     :rtype: tuple[str, str, int, int]
@@ -226,14 +707,32 @@ def run_qverify_step(framework, design, step):
     stdout_err, stderr_err = 0, 0
 
     if framework.check_tool(wrapper, quiet=True):
+        session_output = run_in_session(framework, design, step)
         if framework.guinorun is True :
             framework.logger.info(f'{framework.guinorun=}, will not run {step=} with {tool=}')
             open_gui = True
-        else :
-            framework.logger.trace(f'command: {" ".join(cmd)=}')
-            cmd_stdout, cmd_stderr = framework.run_cmd(cmd, design, step, tool, framework.verbose)
+        elif session_output is not None:
+            cmd_stdout, cmd_stderr = session_output
             stdout_err += framework.logcheck(cmd_stdout, design, step, tool)
             stderr_err += framework.logcheck(cmd_stderr, design, step, tool)
+        else :
+            cmd_stdout, cmd_stderr, compile_err, env, compile_time = ensure_compiled(
+                framework, design, step, step in psl_steps, psl_files)
+            if compile_err:
+                framework.logger.error(f'Compilation failed, cannot run {step=} with {tool=}')
+                return cmd_stdout, cmd_stderr, compile_err, compile_err
+            timestamp = framework.results[design][step].get('timestamp')
+            framework.logger.trace(f'command: {" ".join(cmd)=}')
+            step_stdout, step_stderr = framework.run_cmd(cmd, design, step, tool,
+                                                         framework.verbose, env=env)
+            stdout_err += framework.logcheck(step_stdout, design, step, tool)
+            stderr_err += framework.logcheck(step_stderr, design, step, tool)
+            cmd_stdout += step_stdout
+            cmd_stderr += step_stderr
+            # Account for the compilation, if it was done in this step
+            if compile_time:
+                framework.results[design][step]['timestamp'] = timestamp
+                framework.results[design][step]['elapsed_time'] += compile_time
 
             if framework.gui :
                 open_gui = True
@@ -246,7 +745,8 @@ def run_qverify_step(framework, design, step):
             else:
                 framework.logger.trace(f'command: {" ".join(cmd)=}')
                 aux_cmd_stdout, aux_cmd_stderr = framework.run_cmd(cmd, design, step, tool,
-                                                                framework.verbose)
+                                                                framework.verbose,
+                                                                remote=False)
                 stdout_err += framework.logcheck(aux_cmd_stdout, design, step, tool)
                 stderr_err += framework.logcheck(aux_cmd_stderr, design, step, tool)
                 cmd_stdout += aux_cmd_stdout
@@ -286,7 +786,7 @@ def setup_lint(framework, path):
     :type path: str
     """
     filename = "lint.do"
-    gencompilescript(framework, filename, path)
+    genstepscript(framework, filename, path)
     with open(os.path.join(path, filename), "a", encoding='utf-8') as f:
         print(f'lint methodology {framework.get_tool_flags("lint methodology")}', file=f)
         print(f'lint run -d {framework.current_toplevel} {framework.get_tool_flags("lint run")} '
@@ -346,7 +846,7 @@ def setup_friendliness(framework, path):
     :type path: str
     """
     filename = "friendliness.do"
-    gencompilescript(framework, filename, path)
+    genstepscript(framework, filename, path)
     with open(os.path.join(path, filename), "a", encoding='utf-8') as f:
         print(f'autocheck compile {framework.get_tool_flags("autocheck compile")} -d '
               f'{framework.current_toplevel} {framework.generic_args}', file=f)
@@ -403,7 +903,7 @@ def setup_rulecheck(framework, path):
     :type path: str
     """
     filename = "rulecheck.do"
-    gencompilescript(framework, filename, path)
+    genstepscript(framework, filename, path)
     with open(os.path.join(path, filename), "a", encoding='utf-8') as f:
         print('autocheck report inconclusives', file=f)
         for line in framework.init_reset:
@@ -471,7 +971,7 @@ def setup_xverify(framework, path):
     :type path: str
     """
     filename = "xverify.do"
-    gencompilescript(framework, filename, path)
+    genstepscript(framework, filename, path)
     with open(os.path.join(path, filename), "a", encoding='utf-8') as f:
         for line in framework.init_reset:
             print(line, file=f)
@@ -538,7 +1038,7 @@ def setup_reachability(framework, path):
     :type path: str
     """
     filename = "reachability.do"
-    gencompilescript(framework, filename, path)
+    genstepscript(framework, filename, path)
     with open(os.path.join(path, filename), "a", encoding='utf-8') as f:
         for line in framework.init_reset:
             print(line, file=f)
@@ -783,7 +1283,7 @@ def setup_resets(framework, path):
     filename = "resets.do"
     # We first write the header to compile the netlist and then append
     # (mode "a") the tool-specific instructions
-    gencompilescript(framework, filename, path)
+    genstepscript(framework, filename, path)
     gen_clock_config(framework, filename, path)
     gen_clock_domain_config(framework, filename, path)
     gen_reset_config(framework, filename, path)
@@ -851,7 +1351,7 @@ def setup_clocks(framework, path):
     filename = "clocks.do"
     # We first write the header to compile the netlist  and then append
     # (mode "a") the tool-specific instructions
-    gencompilescript(framework, filename, path)
+    genstepscript(framework, filename, path)
     gen_clock_config(framework, filename, path)
     gen_clock_domain_config(framework, filename, path)
     gen_reset_config(framework, filename, path)
@@ -912,20 +1412,508 @@ def get_linecheck_clocks():
     patterns["warning"] += ["inconclusive", "inconclusives"]
     return patterns
 
-def setup_prove(framework, path):
+def get_prove_groups(framework, candidates=None):
     """
-    Generate script to run PropCheck
+    Get the groups of targets to prove in parallel, as set with
+    :meth:`fvm.FvmFramework.set_prove_partitions`
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param candidates: the targets to prove, if not all the targets of the
+                       PSL files
+    :type candidates: list[dict] or None
+
+    :return: the groups of targets, or an empty list if the prove step must
+             run as a single job
+    :rtype: list[list[dict]]
+    """
+    if (framework.prove_partitions < 2 or framework.gui or framework.guinorun
+            or not framework.check_tool(tools['prove'][1], quiet=True)):
+        return []
+    if candidates is None:
+        candidates = targets.get_targets(framework.drom_generated_psl + framework.psl_sources)
+    groups = targets.split(candidates, framework.prove_partitions)
+    if len(groups) < 2:
+        framework.logger.info(f'Less than two targets in the PSL files, not partitioning '
+                              f'the prove step of {framework.current_toplevel}')
+        return []
+    return groups
+
+def get_prove_portfolio(framework):
+    """
+    Get the variants of ``formal verify`` to race in the prove step, as set
+    with :meth:`fvm.FvmFramework.set_portfolio`
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: the flags of each variant, or an empty list if the prove step
+             must run as a single job
+    :rtype: list[str]
+    """
+    if (framework.gui or framework.guinorun
+            or not framework.check_tool(tools['prove'][1], quiet=True)):
+        return []
+    return framework.portfolios.get('prove', [])
+
+def is_merged_prove(path):
+    """Returns True if the results of the prove step in path were merged from
+    several jobs, so there is no single database with all of them"""
+    return any(os.path.exists(os.path.join(path, 'prove', filename))
+               for filename in [PARTITIONS_FILE, PORTFOLIO_FILE, BUGHUNT_FILE])
+
+def write_prove_report(filename, summary, sections):
+    """
+    Write a formal_verify.rpt with a property summary and the targets of each
+    section, in the format that the parsers of the prove step expect
+
+    :param filename: path of the report
+    :type filename: str
+    :param summary: property summary, as returned by
+                    :func:`parse_prove.property_summary`
+    :type summary: dict
+    :param sections: targets of each section, such as
+                     ``{'Targets Proven': ['a', 'b']}``
+    :type sections: dict[str, list[str]]
+    """
+    separator = '=' * 40
+    with open(filename, 'w', encoding='utf-8') as f:
+        print(separator, file=f)
+        print(f'{"Property Summary":<35}Count', file=f)
+        for name, prop in summary.items():
+            print(separator, file=f)
+            print(f'{name:<34}{prop["Count"]:>6}', file=f)
+            if prop.get('Children'):
+                print('-' * 40, file=f)
+            for child, values in prop.get('Children', {}).items():
+                print(f'  {child:<32}{values.get("Count", 0):>6}', file=f)
+                for key, value in values.items():
+                    if key != 'Count':
+                        print(f'    {key} ({value})', file=f)
+        print(separator, file=f)
+        print('', file=f)
+        print('', file=f)
+        for name, items in sections.items():
+            print(f'{name} ({len(items)})', file=f)
+            print('-' * 40, file=f)
+            for item in items:
+                print(f'  {item}', file=f)
+            print('', file=f)
+        print('Assumptions', file=f)
+
+def merge_prove_reports(reports, merged_report):
+    """
+    Merge the formal_verify.rpt reports of the partitions of the prove step
+
+    The counts of the property summaries are added, except the assumptions,
+    which are the same in all the partitions, and the targets of each section
+    are concatenated. Only the property summary and the target sections are
+    written, in the format of a single formal_verify.rpt, so the merged report
+    can be parsed and shown as the report of a single run
+
+    :param reports: paths of the reports of the partitions
+    :type reports: list[str]
+    :param merged_report: path of the merged report
+    :type merged_report: str
+    """
+    summary = {}
+    sections = {}
+    for report in reports:
+        for name, prop in parse_prove.property_summary(report).items():
+            merged = summary.setdefault(name, {'Count': 0})
+            if name == 'Assumes':
+                merged['Count'] = max(merged['Count'], prop['Count'])
+            else:
+                merged['Count'] += prop['Count']
+            for child, values in prop.get('Children', {}).items():
+                merged_child = merged.setdefault('Children', {}).setdefault(child, {})
+                for key, value in values.items():
+                    merged_child[key] = merged_child.get(key, 0) + value
+        for section, data in parse_prove.parse_targets_report(report).items():
+            name = re.sub(r'\s*\(\d+\)', '', section).strip()
+            sections.setdefault(name, []).extend(data['items'])
+    write_prove_report(merged_report, summary, sections)
+
+def run_prove_jobs(framework, design, path, jobs, monitor=None, append=False):
+    """
+    Run several jobs of the prove step at the same time, each one in its own
+    thread and with its own ``prove.<name>`` results, log and directory, and
+    account them to the prove step. The output of all the jobs is written to
+    the log of the prove step
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: the name of the design
+    :type design: str
+    :param path: the output path of the design
+    :type path: str
+    :param jobs: for the step name of each job, a tuple (description,
+                 function), where the function runs the job and returns a
+                 tuple (cmd_stdout, cmd_stderr, stdout_err, stderr_err)
+    :type jobs: dict[str, tuple[str, callable]]
+    :param monitor: function called every ``JOBS_INTERVAL`` seconds while
+                    the jobs run, with the step names of the jobs that have
+                    finished
+    :type monitor: callable or None
+    :param append: True if the prove step already ran, so the jobs are added
+                   to its elapsed time and log instead of replacing them
+    :type append: bool
+
+    :return: A tuple (cmd_stdout, cmd_stderr, stdout_err, stderr_err)
+    :rtype: tuple[str, str, int, int]
+    """
+    report_path = os.path.join(path, 'prove')
+    os.makedirs(report_path, exist_ok=True)
+    for step in jobs:
+        framework.results[design][step] = {'message': '', 'stdout': '', 'stderr': '',
+                                           'summary': {}}
+        # The jobs share the deadline of the prove step
+        if (design, 'prove') in framework.deadlines:
+            framework.deadlines[design, step] = framework.deadlines[design, 'prove']
+
+    timestamp = datetime.now().isoformat()
+    start_time = time.perf_counter()
+    # Only the main thread can receive signals, so the Ctrl+C handler that
+    # stops the running tools must be installed here and not in run_cmd
+    previous_handler = None
+    if threading.current_thread() is threading.main_thread():
+        previous_handler = signal.signal(signal.SIGINT, framework.handle_sigint)
+    try:
+        with ThreadPoolExecutor(max_workers=len(jobs),
+                                thread_name_prefix=f'{design}.prove') as executor:
+            futures = {step: executor.submit(function) for step, (_, function) in jobs.items()}
+            while True:
+                finished = [step for step, future in futures.items() if future.done()]
+                if monitor is not None:
+                    monitor(finished)
+                if len(finished) == len(futures):
+                    break
+                wait(futures.values(), timeout=JOBS_INTERVAL, return_when=FIRST_COMPLETED)
+            outputs = {step: future.result() for step, future in futures.items()}
+    finally:
+        if previous_handler is not None:
+            signal.signal(signal.SIGINT, previous_handler)
+    elapsed_time = time.perf_counter() - start_time
+
+    # Account the jobs to the prove step
+    step_results = framework.results[design]['prove']
+    if append:
+        elapsed_time += step_results.get('elapsed_time', 0)
+    else:
+        step_results['timestamp'] = timestamp
+    step_results['elapsed_time'] = elapsed_time
+    usage = step_results.setdefault('resources', resources.new_usage())
+    for step in jobs:
+        job_results = framework.results[design].pop(step)
+        framework.deadlines.pop((design, step), None)
+        if 'resources' in job_results:
+            resources.merge_usage(usage, job_results['resources'])
+        if job_results.get('timed_out'):
+            step_results['timed_out'] = True
+
+    cmd_stdout, cmd_stderr = "", ""
+    stdout_err, stderr_err = 0, 0
+    with open(os.path.join(report_path, 'prove.log'), 'a' if append else 'w',
+              encoding='utf-8') as log:
+        for step, (description, _) in jobs.items():
+            job_stdout, job_stderr, job_stdout_err, job_stderr_err = outputs[step]
+            log.write(f'FVM: {step}: {description}\n')
+            log.write(job_stdout)
+            log.write(job_stderr)
+            cmd_stdout += job_stdout
+            cmd_stderr += job_stderr
+            stdout_err += job_stdout_err
+            stderr_err += job_stderr_err
+    step_results['stdout'] += cmd_stdout
+    step_results['stderr'] += cmd_stderr
+
+    # Gather the testbenches of the counterexamples and witnesses, for
+    # prove.simcover
+    for step in jobs:
+        testbenches = os.path.join(path, step, 'qsim_tb')
+        if os.path.isdir(testbenches):
+            shutil.copytree(testbenches, os.path.join(report_path, 'qsim_tb'),
+                            dirs_exist_ok=True)
+    return cmd_stdout, cmd_stderr, stdout_err, stderr_err
+
+def run_prove_job(framework, design, step, script, env, cancel=None):
+    """
+    Run PropCheck with a script in the ``<step>`` directory
+
+    :return: A tuple (cmd_stdout, cmd_stderr, stdout_err, stderr_err)
+    :rtype: tuple[str, str, int, int]
+    """
+    tool, wrapper = tools['prove']
+    path = framework.current_path
+    # Create the output directory before starting the tool, which may write
+    # to it before run_cmd creates it for the log
+    os.makedirs(os.path.join(path, step), exist_ok=True)
+    cmd = [wrapper, '-c', '-od', os.path.join(path, step), '-do', os.path.join(path, script)]
+    cmd_stdout, cmd_stderr = framework.run_cmd(cmd, design, step, tool, framework.verbose,
+                                               env=env, cancel=cancel)
+    stdout_err = framework.logcheck(cmd_stdout, design, 'prove', tool)
+    stderr_err = framework.logcheck(cmd_stderr, design, 'prove', tool)
+    return cmd_stdout, cmd_stderr, stdout_err, stderr_err
+
+def run_prove_partition(framework, design, step, group):
+    """
+    Run PropCheck on a group of targets, with the libraries compiled with
+    only its PSL directives
+
+    :return: A tuple (cmd_stdout, cmd_stderr, stdout_err, stderr_err)
+    :rtype: tuple[str, str, int, int]
+    """
+    psl_files = targets.write_sources(framework.drom_generated_psl + framework.psl_sources,
+                                      group, os.path.join(framework.current_path, step, 'psl'))
+    cmd_stdout, cmd_stderr, compile_err, env, _ = ensure_compiled(framework, design, step,
+                                                                  True, psl_files)
+    if compile_err:
+        framework.logger.error(f'Compilation failed, cannot run {step=}')
+        return cmd_stdout, cmd_stderr, compile_err, compile_err
+    step_stdout, step_stderr, stdout_err, stderr_err = run_prove_job(framework, design, step,
+                                                                     'prove.do', env)
+    return cmd_stdout + step_stdout, cmd_stderr + step_stderr, stdout_err, stderr_err
+
+def run_partitioned_prove(framework, design, path, groups):
+    """
+    Run the prove step as one PropCheck job per group of targets, all of them
+    at the same time, and merge their results into the prove directory
+
+    Each partition runs in its own ``prove.partition<index>`` directory, with
+    its own log, database and reports. The merged formal_verify.rpt, the
+    testbenches of all the partitions (for prove.simcover) and the targets of
+    each partition (in partitions.json) are written to the prove directory.
+    The prove.formalcover post-step needs the database of a single run, so it
+    is skipped
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: the name of the design
+    :type design: str
+    :param path: the output path of the design
+    :type path: str
+    :param groups: the targets of each partition
+    :type groups: list[list[dict]]
+
+    :return: A tuple (cmd_stdout, cmd_stderr, stdout_err, stderr_err)
+    :rtype: tuple[str, str, int, int]
+    """
+    framework.logger.info(f'Proving the {sum(len(group) for group in groups)} targets of '
+                          f'{design} in {len(groups)} partitions')
+    jobs = {f'prove.partition{index}':
+            (', '.join(target['name'] for target in group),
+             functools.partial(run_prove_partition, framework, design,
+                               f'prove.partition{index}', group))
+            for index, group in enumerate(groups)}
+    output = run_prove_jobs(framework, design, path, jobs)
+
+    reports = [os.path.join(path, step, 'formal_verify.rpt') for step in jobs]
+    reports = [report for report in reports if os.path.exists(report)]
+    if reports:
+        merge_prove_reports(reports, os.path.join(path, 'prove', 'formal_verify.rpt'))
+    with open(os.path.join(path, 'prove', PARTITIONS_FILE), 'w', encoding='utf-8') as f:
+        json.dump({step: [target['name'] for target in group]
+                   for step, group in zip(jobs, groups)}, f, indent=2)
+    return output
+
+def race_prove_report(reports, decisions):
+    """
+    Build the report of a portfolio of the prove step, with the first
+    conclusive result of each target
+
+    :param reports: paths of the formal_verify.rpt of the variants that
+                    finished. The first one gives the targets and the
+                    assumptions
+    :type reports: list[str]
+    :param decisions: the conclusive results, as returned by
+                      :func:`parse_prove.parse_target_results`, with the
+                      ``variant`` that decided each target
+    :type decisions: dict[str, dict]
+
+    :return: A tuple (summary, sections) for :func:`write_prove_report`
+    :rtype: tuple[dict, dict[str, list[str]]]
+    """
+    base = parse_prove.property_summary(reports[0])
+    universe = []
+    for data in parse_prove.parse_targets_report(reports[0]).values():
+        universe += [item.split()[0] for item in data['items']]
+    section_names = {'Proven': 'Targets Proven', 'Vacuous': 'Targets Vacuously Proven',
+                     'Fired': 'Targets Fired', 'Covered': 'Targets Covered',
+                     'Uncoverable': 'Targets Uncoverable'}
+    sections = {name: [] for name in section_names.values()}
+    for target, decision in decisions.items():
+        sections[section_names[decision['status']]].append(target)
+    sections['Targets Inconclusive'] = [target for target in universe
+                                        if target not in decisions]
+
+    summary = {}
+    if 'Assumes' in base:
+        summary['Assumes'] = {'Count': base['Assumes']['Count']}
+    for kind, statuses in [('Asserts', ['Proven', 'Vacuous', 'Fired']),
+                           ('Covers', ['Covered', 'Uncoverable'])]:
+        if kind not in base:
+            continue
+        children = {status: {'Count': len(sections[section_names[status]])}
+                    for status in statuses}
+        decided = sum(child['Count'] for child in children.values())
+        children['Inconclusive'] = {'Count': max(0, base[kind]['Count'] - decided)}
+        summary[kind] = {'Count': base[kind]['Count'],
+                         'Children': {status: child for status, child in children.items()
+                                      if child['Count'] > 0}}
+    return summary, {name: items for name, items in sections.items() if items}
+
+def race_prove_jobs(framework, design, path, steps, env, universe=None, append=False):
+    """
+    Run several prove jobs at the same time, each one with its own
+    ``<step>.do`` script on the same compiled model. The result of each
+    target is taken from the transcript of the job that decided it first,
+    and the jobs that are still running are cancelled when all the targets
+    have a conclusive result
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: the name of the design
+    :type design: str
+    :param path: the output path of the design
+    :type path: str
+    :param steps: for the step name of each job, a description of it
+    :type steps: dict[str, str]
+    :param env: the environment of the compiled model
+    :type env: dict
+    :param universe: the targets of the jobs, or None to take them from the
+                     report of the first job that finishes
+    :type universe: list[str] or None
+    :param append: passed to :func:`run_prove_jobs`
+    :type append: bool
+
+    :return: A tuple (cmd_stdout, cmd_stderr, stdout_err, stderr_err,
+             decisions, reports), where decisions are the conclusive results
+             returned by :func:`parse_prove.parse_target_results` with the
+             index of the job (``variant``) that decided each target, and
+             reports are the formal_verify.rpt of the jobs that finished
+    :rtype: tuple[str, str, int, int, dict[str, dict], list[str]]
+    """
+    cancel = threading.Event()
+    decisions = {}
+    transcripts = {step: {'offset': 0, 'results': {}} for step in steps}
+    reports = []
+
+    def monitor(finished):
+        for index, step in enumerate(steps):
+            transcript = transcripts[step]
+            logfile = os.path.join(path, step, f'{step}.log')
+            if os.path.exists(logfile):
+                with open(logfile, 'r', encoding='utf-8', errors='replace') as log:
+                    log.seek(transcript['offset'])
+                    lines = log.readlines()
+                # Only parse complete lines
+                if lines and not lines[-1].endswith('\n'):
+                    lines.pop()
+                transcript['offset'] += sum(len(line.encode('utf-8')) for line in lines)
+                parse_prove.parse_target_results(lines, transcript['results'])
+            for target, result in transcript['results'].items():
+                if target not in decisions or result['time'] < decisions[target]['time']:
+                    decisions[target] = dict(result, variant=index)
+            report = os.path.join(path, step, 'formal_verify.rpt')
+            if step in finished and report not in reports and os.path.exists(report):
+                reports.append(report)
+        if cancel.is_set():
+            return
+        if universe is not None:
+            inconclusive = [target for target in universe if target not in decisions]
+        elif reports:
+            inconclusive = race_prove_report(reports, decisions)[1].get('Targets Inconclusive')
+        else:
+            return
+        if not inconclusive and len(finished) < len(steps):
+            framework.logger.info(f'All the targets of {design} have a conclusive '
+                                  f'result, cancelling the other jobs')
+            cancel.set()
+
+    jobs = {step: (description, functools.partial(run_prove_job, framework, design, step,
+                                                  f'{step}.do', env, cancel))
+            for step, description in steps.items()}
+    step_stdout, step_stderr, stdout_err, stderr_err = run_prove_jobs(framework, design, path,
+                                                                      jobs, monitor, append)
+    return step_stdout, step_stderr, stdout_err, stderr_err, decisions, reports
+
+def run_portfolio_prove(framework, design, path, variants, psl_files=None):
+    """
+    Race several variants of ``formal verify`` on the same compiled model
+
+    Each variant runs in its own ``prove.variant<index>`` directory. The
+    result of each target is taken from the transcript of the variant that
+    decided it first. When all the targets have a conclusive result (the
+    targets are known when the first variant finishes), the variants that
+    are still running are cancelled. The report with the result of each
+    target, the testbenches of the variants that finished (for
+    prove.simcover) and the variant that decided each target (in
+    portfolio.json) are written to the prove directory. The prove.formalcover
+    post-step needs the database of a single run, so it is skipped
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: the name of the design
+    :type design: str
+    :param path: the output path of the design
+    :type path: str
+    :param variants: the flags of ``formal verify`` of each variant
+    :type variants: list[str]
+    :param psl_files: the PSL files to compile, if not the ones of the
+                      framework
+    :type psl_files: list[dict] or None
+
+    :return: A tuple (cmd_stdout, cmd_stderr, stdout_err, stderr_err)
+    :rtype: tuple[str, str, int, int]
+    """
+    framework.logger.info(f'Racing {len(variants)} variants of formal verify for {design}')
+    cmd_stdout, cmd_stderr, compile_err, env, compile_time = ensure_compiled(
+        framework, design, 'prove', True, psl_files)
+    if compile_err:
+        framework.logger.error(f'Compilation failed, cannot run the prove step of {design}')
+        return cmd_stdout, cmd_stderr, compile_err, compile_err
+
+    with open(os.path.join(path, 'prove.do'), 'r', encoding='utf-8') as f:
+        script = f.read().splitlines()
+    steps = [f'prove.variant{index}' for index in range(len(variants))]
+    for step, flags in zip(steps, variants):
+        with open(os.path.join(path, f'{step}.do'), 'w', encoding='utf-8') as f:
+            for line in script:
+                if line.startswith('formal verify '):
+                    line = f'formal verify {get_formal_verify_flags(framework)} {flags} -cov_mode'
+                print(line, file=f)
+
+    step_stdout, step_stderr, stdout_err, stderr_err, decisions, reports = race_prove_jobs(
+        framework, design, path, dict(zip(steps, variants)), env)
+    # Account for the compilation, if it was done in this step
+    framework.results[design]['prove']['elapsed_time'] += compile_time
+
+    if reports:
+        summary, sections = race_prove_report(reports, decisions)
+        write_prove_report(os.path.join(path, 'prove', 'formal_verify.rpt'), summary, sections)
+    with open(os.path.join(path, 'prove', PORTFOLIO_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'variants': dict(zip(steps, variants)),
+                   'targets': {target: dict(decision, variant=steps[decision['variant']])
+                               for target, decision in sorted(decisions.items())}},
+                  f, indent=2)
+    return cmd_stdout + step_stdout, cmd_stderr + step_stderr, stdout_err, stderr_err
+
+def gen_formal_compile(framework, filename, path, include_code_cov=True):
+    """
+    Generate the part of a PropCheck script that compiles the formal model,
+    with its clocks, reset, blackboxes and cutpoints
 
     :param framework: the FvmFramework object
     :type framework: fvm.framework.FvmFramework
+    :param filename: the name of the script to create
+    :type filename: str
     :param path: the path where to create the script
     :type path: str
+    :param include_code_cov: if True, compile the model with the code
+                             coverage items, to compute formal coverage
+    :type include_code_cov: bool
     """
-    filename = "prove.do"
-    # We need to save the current toplevel to use it in the setup
-    # of the post-steps.
-    set_setup_toplevel(framework.current_toplevel)
-    gencompilescript(framework, filename, path, psl_compile=True)
+    genstepscript(framework, filename, path)
     # Only add the clocks since we don't want to add any extra constraint
     # Also, adding the clock domain make propcheck throw errors because
     # output ports in the clock domain cannot be constrained
@@ -964,14 +1952,352 @@ def setup_prove(framework, path):
 
         print('formal compile ', end='', file=f)
         print(f'-d {framework.current_toplevel} {framework.generic_args} ', end='', file=f)
-        print('-include_code_cov ', end='', file=f)
+        if include_code_cov:
+            print('-include_code_cov ', end='', file=f)
         print(f'{framework.get_tool_flags("formal compile")}', file=f)
 
+def setup_bughunt(framework, path):
+    """
+    Generate script to run the bug-hunting pass of PropCheck
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param path: the path where to create the script
+    :type path: str
+    """
+    filename = "bughunt.do"
+    gen_formal_compile(framework, filename, path, include_code_cov=False)
+    with open(os.path.join(path, filename), "a", encoding='utf-8') as f:
+        print(f'formal verify {get_bughunt_verify_flags(framework)}', file=f)
+        print('', file=f)
+        print('formal generate waveforms', file=f)
+        print('formal generate waveforms -vcd', file=f)
+        print('formal generate report', file=f)
+        print('', file=f)
+        print('exit', file=f)
+
+def run_bughunt(framework, path):
+    """
+    Run the bughunt step and parse results
+
+    In fail-fast mode, the step fails if any assertion fired, so the prove
+    step is skipped. Otherwise, the fired assertions are reported by the
+    prove step, together with the targets that it proves
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param path: the path where to create the script
+    :type path: str
+
+    :return: A tuple (cmd_stdout, cmd_stderr, stdout_err, stderr_err, status)
+    :rtype: tuple[str, str, int, int, str]
+    """
+    status = "pass"
+    design = framework.current_toplevel
+    run_stdout, run_stderr, stdout_err, stderr_err = run_qverify_step(framework, design,
+                                                                      'bughunt')
+    rpt_path = os.path.join(path, 'bughunt', 'formal_verify.rpt')
+    if os.path.exists(rpt_path):
+        res = parse_prove.property_summary(rpt_path)
+        framework.results[design]['bughunt']['summary'] = res
+        properties = parse_prove.normalize_sections(parse_prove.parse_targets_report(rpt_path))
+        tables.show_prove_summary(properties,
+                                  title="Bug Hunting Summary",
+                                  outdir=os.path.join(path, 'bughunt'),
+                                  step='bughunt')
+        fired = res.get("Asserts", {}).get("Children", {}).get("Fired", {}).get("Count", 0)
+        if fired > 0 and framework.bughunt['fail_fast']:
+            framework.logger.error(f'{fired} assertions of {design} fired, skipping the '
+                                   f'full proof')
+            status = "fail"
+        elif fired > 0:
+            framework.logger.warning(f'{fired} assertions of {design} fired, they will be '
+                                     f'reported by the prove step')
+    return run_stdout, run_stderr, stdout_err, stderr_err, status
+
+def get_linecheck_bughunt():
+    """
+    Common patterns for linecheck in the Questa bughunt step. Fired
+    assertions only fail the step in fail-fast mode, which is checked from
+    the report, so they are warnings here
+
+    :return: A dictionary containing linecheck patterns
+    :rtype: dict[str, list[str]]
+    """
+    patterns = get_linecheck_common()
+
+    # Make a copy to avoid modifying the original dict
+    patterns = {k: v.copy() for k, v in patterns.items()}
+
+    patterns["warning"] += ["fired", "uncoverable", "inconclusives", "vacuous",
+                            r"^(?!Proven:).*inconclusive"]
+    patterns["success"] += ["covered", "proven"]
+
+    return patterns
+
+def get_bughunt_decisions(framework, path):
+    """
+    Get the targets decided by the bughunt step, so the prove step does not
+    prove again the PSL directives among them
+
+    Only the PSL directives with a label can be found in the report of the
+    bughunt step, so the ones without a label are always proven again, and so
+    are the assertions and covers written in the HDL sources
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param path: the output path of the design
+    :type path: str
+
+    :return: A tuple (decided, survivors, pending), where decided has the
+             status of each PSL directive decided by the bughunt step, by its
+             name in the report, survivors are the PSL directives that must
+             still be proven, and pending is True if any target of the report
+             was not decided. If no PSL directive was decided, decided is
+             empty and survivors is None
+    :rtype: tuple[dict[str, str], list[dict] or None, bool]
+    """
+    report = os.path.join(path, 'bughunt', 'formal_verify.rpt')
+    if framework.bughunt is None or not os.path.exists(report):
+        return {}, None, True
+    # The report of a bughunt step that failed, for example because of a
+    # tool error, cannot be trusted, so all the targets are proven
+    status = framework.results[framework.current_toplevel].get('bughunt', {}).get('status')
+    if status != 'pass':
+        framework.logger.warning(f'The bughunt step of {framework.current_toplevel} did not '
+                                 f'pass, proving all the targets')
+        return {}, None, True
+    statuses = {}
+    for status, data in parse_prove.normalize_sections(
+            parse_prove.parse_targets_report(report)).items():
+        for item in data['items']:
+            statuses[item.split()[0]] = status
+    decided = {}
+    survivors = []
+    for target in targets.get_targets(framework.drom_generated_psl + framework.psl_sources):
+        names = [name for name, status in statuses.items()
+                 if status in DECIDED_SECTIONS and targets.is_named(target, name)]
+        if names:
+            decided[names[0]] = statuses[names[0]]
+        else:
+            survivors.append(target)
+    if not decided:
+        return {}, None, True
+    return decided, survivors, any(name not in decided for name in statuses)
+
+def add_bughunt_results(path, decided):
+    """
+    Add the targets decided by the bughunt step to the report of the prove
+    step, which did not prove them again. The report written by the tool, if
+    any, is kept as formal_verify_survivors.rpt
+
+    :param path: the output path of the design
+    :type path: str
+    :param decided: the status of each target decided by the bughunt step
+    :type decided: dict[str, str]
+    """
+    report = os.path.join(path, 'prove', 'formal_verify.rpt')
+    os.makedirs(os.path.dirname(report), exist_ok=True)
+    if os.path.exists(report):
+        summary = parse_prove.property_summary(report)
+        sections = {status: data['items'] for status, data in parse_prove.normalize_sections(
+            parse_prove.parse_targets_report(report)).items()}
+        os.replace(report, os.path.join(path, 'prove', 'formal_verify_survivors.rpt'))
+    else:
+        summary = parse_prove.property_summary(os.path.join(path, 'bughunt',
+                                                            'formal_verify.rpt'))
+        summary = {'Assumes': summary['Assumes']} if 'Assumes' in summary else {}
+        sections = {}
+    for name, status in decided.items():
+        kind = DECIDED_SECTIONS[status][1]
+        parent = summary.setdefault(kind, {'Count': 0})
+        parent['Count'] += 1
+        child = parent.setdefault('Children', {}).setdefault(status, {'Count': 0})
+        child['Count'] += 1
+        sections.setdefault(status, []).append(name)
+    write_prove_report(report, summary,
+                       {DECIDED_SECTIONS.get(status, [f'Targets {status}'])[0]: items
+                        for status, items in sections.items()})
+    with open(os.path.join(path, 'prove', BUGHUNT_FILE), 'w', encoding='utf-8') as f:
+        json.dump(decided, f, indent=2, sort_keys=True)
+
+def add_escalation_results(path, results):
+    """
+    Move the targets decided by the escalation from the inconclusive targets
+    of the report of the prove step to their status. The report before the
+    escalation is kept as formal_verify_initial.rpt
+
+    :param path: the output path of the design
+    :type path: str
+    :param results: the result of each escalated target, as returned by
+                    :func:`run_escalation`
+    :type results: dict[str, dict]
+    """
+    decided = {name: result['status'] for name, result in results.items()
+               if result['status'] in DECIDED_SECTIONS}
+    if not decided:
+        return
+    report = os.path.join(path, 'prove', 'formal_verify.rpt')
+    summary = parse_prove.property_summary(report)
+    sections = {status: data['items'] for status, data in parse_prove.normalize_sections(
+        parse_prove.parse_targets_report(report)).items()}
+    shutil.copyfile(report, os.path.join(path, 'prove', 'formal_verify_initial.rpt'))
+    sections['Inconclusive'] = [item for item in sections.get('Inconclusive', [])
+                                if item.split()[0] not in decided]
+    for name, status in decided.items():
+        children = summary.setdefault(DECIDED_SECTIONS[status][1], {'Count': 1}) \
+                          .setdefault('Children', {})
+        if 'Inconclusive' in children:
+            children['Inconclusive']['Count'] -= 1
+            if children['Inconclusive']['Count'] <= 0:
+                del children['Inconclusive']
+        children.setdefault(status, {'Count': 0})['Count'] += 1
+        sections.setdefault(status, []).append(name)
+    write_prove_report(report, summary,
+                       {DECIDED_SECTIONS.get(status, [f'Targets {status}'])[0]: items
+                        for status, items in sections.items() if items})
+
+def run_escalation(framework, design, path):
+    """
+    Prove again the inconclusive targets of the prove step, as set with
+    :meth:`fvm.FvmFramework.set_prove_escalation`
+
+    Each round writes a copy of the PSL files with only the targets that are
+    still inconclusive, compiles it, and races one job per engine mix on it,
+    in ``prove.escalation<round>_<mix>`` directories, with the timeout of the
+    round. The timeout grows geometrically from round to round, and the
+    rounds stop when all the targets are decided or the budget runs out. The
+    best result of each target (its status, or its largest proof radius if
+    it is still inconclusive) is added to the results of the prove step and
+    written to escalation.json in the prove directory
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: the name of the design
+    :type design: str
+    :param path: the output path of the design
+    :type path: str
+
+    :return: A tuple (cmd_stdout, cmd_stderr, stdout_err, stderr_err)
+    :rtype: tuple[str, str, int, int]
+    """
+    cmd_stdout, cmd_stderr, stdout_err, stderr_err = "", "", 0, 0
+    escalation = framework.prove_escalation
+    report = os.path.join(path, 'prove', 'formal_verify.rpt')
+    if escalation is None or not os.path.exists(report):
+        return cmd_stdout, cmd_stderr, stdout_err, stderr_err
+    psl_files = framework.drom_generated_psl + framework.psl_sources
+    all_targets = targets.get_targets(psl_files)
+    results = {}
+    candidates = {}
+    sections = parse_prove.normalize_sections(parse_prove.parse_targets_report(report))
+    for item in sections.get('Inconclusive', {}).get('items', []):
+        name = item.split()[0]
+        matches = [target for target in all_targets if targets.is_named(target, name)]
+        # Only the PSL directives can be compiled alone
+        if matches:
+            candidates[name] = matches
+            results[name] = {'status': 'Inconclusive', 'radius': parse_prove.get_radius(item),
+                             'round': None}
+    if not candidates:
+        return cmd_stdout, cmd_stderr, stdout_err, stderr_err
+
+    with open(os.path.join(path, 'prove.do'), 'r', encoding='utf-8') as f:
+        script = f.read().splitlines()
+    flags = remove_timeout(get_formal_verify_flags(framework))
+    deadline = time.monotonic() + escalation['budget']
+    timeout = escalation['timeout']
+    rounds = 0
+    while candidates and not framework.ctrl_c_pressed:
+        remaining = deadline - time.monotonic()
+        if remaining < 1:
+            framework.logger.warning(f'Escalation budget of {design} exhausted with '
+                                     f'{len(candidates)} inconclusive targets')
+            break
+        round_timeout = int(min(timeout, remaining))
+        framework.logger.info(f'Escalating {len(candidates)} inconclusive targets of {design}, '
+                              f'round {rounds} with a timeout of {round_timeout}s')
+        round_psl_files = targets.write_sources(
+            psl_files, [target for matches in candidates.values() for target in matches],
+            os.path.join(path, 'prove', f'escalation{rounds}'))
+        # The compilation runs as the prove step, so keep its timestamp and
+        # add the compilation to the time it already took
+        step_results = framework.results[design]['prove']
+        timestamp = step_results.get('timestamp')
+        elapsed_time = step_results.get('elapsed_time', 0)
+        compile_stdout, compile_stderr, compile_err, env, compile_time = ensure_compiled(
+            framework, design, 'prove', True, round_psl_files)
+        step_results['timestamp'] = timestamp
+        step_results['elapsed_time'] = elapsed_time + compile_time
+        cmd_stdout += compile_stdout
+        cmd_stderr += compile_stderr
+        if compile_err:
+            framework.logger.error(f'Compilation failed, cannot escalate the prove step of '
+                                   f'{design}')
+            stdout_err += compile_err
+            stderr_err += compile_err
+            break
+        steps = {}
+        for index, engines in enumerate(escalation['engines']):
+            step = f'prove.escalation{rounds}_{index}'
+            steps[step] = f'-timeout {round_timeout}s {engines}'.strip()
+            with open(os.path.join(path, f'{step}.do'), 'w', encoding='utf-8') as f:
+                for line in script:
+                    if line.startswith('formal verify '):
+                        line = (f'formal verify {flags} -timeout {round_timeout}s {engines} '
+                                f'-cov_mode')
+                    print(line, file=f)
+        (step_stdout, step_stderr, step_stdout_err, step_stderr_err,
+         decisions, reports) = race_prove_jobs(framework, design, path, steps, env,
+                                               universe=list(candidates), append=True)
+        cmd_stdout += step_stdout
+        cmd_stderr += step_stderr
+        stdout_err += step_stdout_err
+        stderr_err += step_stderr_err
+        for name, decision in decisions.items():
+            if name in candidates:
+                results[name].update(status=decision['status'], round=rounds,
+                                     engines=escalation['engines'][decision['variant']])
+                del candidates[name]
+        # Keep the largest proof radius of the targets that are still
+        # inconclusive
+        for rpt in reports:
+            for item in parse_prove.normalize_sections(parse_prove.parse_targets_report(rpt)) \
+                                   .get('Inconclusive', {}).get('items', []):
+                name = item.split()[0]
+                radius = parse_prove.get_radius(item)
+                if name in candidates and radius is not None and \
+                        (results[name]['radius'] is None or radius > results[name]['radius']):
+                    results[name]['radius'] = radius
+        timeout *= escalation['factor']
+        rounds += 1
+
+    add_escalation_results(path, results)
+    framework.results[design]['prove']['escalation'] = results
+    with open(os.path.join(path, 'prove', ESCALATION_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'rounds': rounds, 'targets': results}, f, indent=2, sort_keys=True)
+    return cmd_stdout, cmd_stderr, stdout_err, stderr_err
+
+def setup_prove(framework, path):
+    """
+    Generate script to run PropCheck
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param path: the path where to create the script
+    :type path: str
+    """
+    filename = "prove.do"
+    # We need to save the current toplevel to use it in the setup
+    # of the post-steps.
+    set_setup_toplevel(framework.current_toplevel)
+    gen_formal_compile(framework, filename, path)
+    with open(os.path.join(path, filename), "a", encoding='utf-8') as f:
         #print('log_info "***** Running formal verify (model checking)..."', file=f)
         # If -cov_mode is specified without arguments, it calculates
         # observability coverage
         print('formal coverage enable -code sbceft', file=f)
-        print(f'formal verify {framework.get_tool_flags("formal verify")} -cov_mode', file=f)
+        print(f'formal verify {get_formal_verify_flags(framework)} -cov_mode', file=f)
         print('', file=f)
         print('## Compute Formal Coverage', file=f)
         print(f'formal generate testbenches '
@@ -995,9 +2321,37 @@ def run_prove(framework, path):
     :rtype: tuple[str, str, int, int, str]
     """
     status = "pass"
-    run_stdout, run_stderr, stdout_err, stderr_err = run_qverify_step(framework,
-                                                                      framework.current_toplevel,
-                                                                      'prove')
+    design = framework.current_toplevel
+    # Only prove the targets that the bughunt step did not decide
+    decided, survivors, pending = get_bughunt_decisions(framework, path)
+    psl_files = None
+    if decided:
+        framework.logger.info(f'{len(decided)} targets of {design} were decided by the '
+                              f'bughunt step, proving the other {len(survivors)} PSL targets')
+        psl_files = targets.write_sources(framework.drom_generated_psl + framework.psl_sources,
+                                          survivors, os.path.join(path, 'bughunt', 'survivors'))
+    variants = get_prove_portfolio(framework)
+    groups = [] if variants else get_prove_groups(framework, survivors)
+    if decided and not survivors and not pending:
+        framework.logger.info(f'All the targets of {design} were decided by the bughunt step')
+        run_stdout, run_stderr, stdout_err, stderr_err = "", "", 0, 0
+    elif variants:
+        run_stdout, run_stderr, stdout_err, stderr_err = run_portfolio_prove(
+            framework, design, path, variants, psl_files)
+    elif groups:
+        run_stdout, run_stderr, stdout_err, stderr_err = run_partitioned_prove(
+            framework, design, path, groups)
+    else:
+        run_stdout, run_stderr, stdout_err, stderr_err = run_qverify_step(
+            framework, design, 'prove', psl_files)
+    if decided:
+        add_bughunt_results(path, decided)
+    # Prove again the targets that are still inconclusive
+    escalation_output = run_escalation(framework, design, path)
+    run_stdout += escalation_output[0]
+    run_stderr += escalation_output[1]
+    stdout_err += escalation_output[2]
+    stderr_err += escalation_output[3]
     rpt_path = os.path.join(path, 'prove', 'formal_verify.rpt')
     if os.path.exists(rpt_path):
         res = parse_prove.property_summary(rpt_path)
@@ -1069,10 +2423,7 @@ def setup_prove_simcover(framework, path):
     os.makedirs(simcover_path, exist_ok=True)
 
     # Generate the script to exclude unreachable code from simulation coverage
-    gencompilescript(framework,
-                     os.path.join('prove.simcover', 'reachability_exclusions.do'),
-                     path,
-                     psl_compile=False)
+    genstepscript(framework, os.path.join('prove.simcover', 'reachability_exclusions.do'), path)
     with open(os.path.join(simcover_path, 'reachability_exclusions.do'), "a", encoding='utf-8') as f:
         for line in framework.init_reset:
             print(line, file=f)
@@ -1110,11 +2461,11 @@ def run_prove_simcover(framework, path):
 
     # Function to run a command in prove.simcover, updating
     # the relevant variables. Used to avoid code duplication
-    def simcover_run(tool):
+    def simcover_run(tool, env=None):
         nonlocal timestamp, elapsed_time, stdout_err, stderr_err, sum_cmd_stdout, sum_cmd_stderr
         if framework.check_tool(tool, quiet=True):
             cmd_stdout, cmd_stderr = framework.run_cmd(cmd, design, 'prove.simcover',
-                                                    tool, framework.verbose, path)
+                                                    tool, framework.verbose, path, env)
             elapsed_time += framework.results[design]['prove.simcover']['elapsed_time']
             if timestamp is None:
                 timestamp = framework.results[design]['prove.simcover']['timestamp']
@@ -1190,9 +2541,17 @@ def run_prove_simcover(framework, path):
                                              ' step is skipped')
                 elif any(row.get("Misses", 0) > 0 for row in res):
                     path = None
+                    compile_stdout, compile_stderr, compile_err, env, compile_time = \
+                        ensure_compiled(framework, design, step)
+                    elapsed_time += compile_time
+                    stdout_err += compile_err
+                    sum_cmd_stdout += compile_stdout
+                    sum_cmd_stderr += compile_stderr
+                    framework.results[design][step]['elapsed_time'] = elapsed_time
                     cmd = ['qverify', '-c', '-od', simcover_path,
                         '-do', os.path.join(simcover_path, 'reachability_exclusions.do')]
-                    simcover_run('qverify')
+                    if compile_err == 0:
+                        simcover_run('qverify', env)
 
                     goal = 0.0
                     res2 = parse_reachability_summary(simcover_path, goal=goal)
@@ -1248,6 +2607,13 @@ def setup_prove_formalcover(framework, path):
     :type path: str
     """
     filename = "prove.formalcover.do"
+    # There is no single database to load if prove ran in several jobs
+    if is_merged_prove(path):
+        framework.logger.warning(f'prove of {framework.current_toplevel} ran in several jobs, '
+                                 f'skipping prove.formalcover')
+        framework.skip('prove.formalcover', framework.current_toplevel)
+        framework.results[framework.current_toplevel]['prove.formalcover']['status'] = 'skip'
+        return
     property_summary = parse_prove.parse_property_summary(os.path.join(path, 'prove', 'prove.log'))
     inconclusives = property_summary.get('Assertions', {}).get('Inconclusive', 0)
     with open(os.path.join(path, filename), "w", encoding='utf-8') as f:
@@ -1256,15 +2622,15 @@ def setup_prove_formalcover(framework, path):
         if not framework.is_disabled('observability'):
             print('formal generate coverage -detail_all -cov_mode o', file=f)
         if not framework.is_disabled('reachability'):
-            print(f'formal verify {framework.get_tool_flags("formal verify")} '
+            print(f'formal verify {get_formal_verify_flags(framework)} '
                   f'-cov_mode reachability', file=f)
             print('formal generate coverage -detail_all -cov_mode r', file=f)
         if not framework.is_disabled('bounded_reachability') and inconclusives != 0:
-            print(f'formal verify {framework.get_tool_flags("formal verify")} '
+            print(f'formal verify {get_formal_verify_flags(framework)} '
                   f'-cov_mode bounded_reachability', file=f)
             print('formal generate coverage -detail_all -cov_mode b', file=f)
         if not framework.is_disabled('signoff'):
-            print(f'formal verify {framework.get_tool_flags("formal verify")} '
+            print(f'formal verify {get_formal_verify_flags(framework)} '
                   f'-cov_mode signoff', file=f)
             print('formal generate coverage -detail_all -cov_mode s', file=f)
         print('', file=f)
@@ -1358,6 +2724,143 @@ def get_linecheck_prove_formalcover():
 
     return patterns
 
+def get_tool_version(framework):
+    """
+    Get the version of the Questa formal tools, as reported by qverify
+
+    qverify is run with the executor and the environment of the tools (see
+    :meth:`fvm.FvmFramework.set_executor`), so the version is the one of the
+    machines where the steps run. It is only run once for each executor and
+    environment
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: the version string, or None if qverify cannot be run
+    :rtype: str or None
+    """
+    key = json.dumps([framework.executor, framework.env], sort_keys=True)
+    if key not in tool_versions:
+        tool_versions[key] = run_tool_version(framework)
+        framework.logger.debug(f'tool_version={tool_versions[key]!r}')
+    return tool_versions[key]
+
+def run_tool_version(framework):
+    """Run qverify -version with the executor of the tools. The version is
+    written to a file in the output directory, since remote executors may
+    print other things in the output of the command. Returns the version
+    string, or None if qverify cannot be run"""
+    if (framework.executor['kind'] == 'local' and
+            shutil.which('qverify', path=framework.env.get('PATH')) is None):
+        return None
+    jobdir = os.path.abspath(os.path.join(framework.outdir, 'fvm_cache'))
+    os.makedirs(jobdir, exist_ok=True)
+    version_file = os.path.join(jobdir, f'qverify.{os.getpid()}.{threading.get_ident()}.version')
+    cmd = ['sh', '-c', f'qverify -version > {shlex.quote(version_file)}']
+    job = executors.prepare(framework.executor, cmd, jobdir, framework.env, jobdir, 'version')
+    output = queue.Queue()
+    future = runner.start(framework, cmd, output, cwd=jobdir, env=framework.env,
+                          deadline=time.monotonic() + VERSION_TIMEOUT, job=job)
+    while output.get() != (None, None):
+        pass
+    result = future.result()
+    try:
+        with open(version_file, 'r', encoding='utf-8') as f:
+            version = f.read().strip()
+        os.remove(version_file)
+    except OSError:
+        version = ''
+    if result['returncode'] != 0 or result['timed_out'] or version == '':
+        return None
+    return version
+
+def get_cache_key_inputs(framework):
+    """
+    Get the Questa-specific values that are part of the cache key of a step
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: the tool version and the coverage goals, or None if the tool
+             version cannot be found, since the results of other versions
+             could be restored otherwise
+    :rtype: list or None
+    """
+    version = get_tool_version(framework)
+    if version is None:
+        return None
+    return [version, coverage_goal]
+
+def get_tool(step):
+    """
+    Get the name of the tool that runs a step
+
+    :param step: step name
+    :type step: str
+
+    :return: tool name, or None if the step is not run by a qverify tool
+    :rtype: str or None
+    """
+    if step in tools:
+        return tools[step][0]
+    return None
+
+def get_difficulty(framework, design):
+    """
+    Get the difficulty score of a design from the design report of its
+    last friendliness step
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param design: design name, or design.config for configurations
+    :type design: str
+
+    :return: difficulty score, or None if there is no design report
+    :rtype: float or None
+    """
+    rpt = os.path.join(framework.outdir, design, 'friendliness', 'autocheck_design.rpt')
+    if not os.path.exists(rpt):
+        return None
+    return parse_design_rpt.difficulty_score(parse_design_rpt.data_from_design_summary(rpt))
+
+def get_formal_verify_flags(framework):
+    """
+    Get the flags of ``formal verify``. When the tools are pinned to
+    partitions of the CPU cores, the number of parallel engines is set to the
+    number of cores of a partition, unless the user already set it
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: the flags
+    :rtype: str
+    """
+    flags = framework.get_tool_flags("formal verify")
+    engines = affinity.get_engines(framework)
+    if engines is not None and '-jobs' not in flags.split():
+        flags += f' -jobs {engines} '
+    return flags
+
+def remove_timeout(flags):
+    """Returns the flags without their ``-timeout`` option, if any"""
+    return re.sub(r'-timeout\s+\S+', '', flags)
+
+def get_bughunt_verify_flags(framework):
+    """
+    Get the flags of ``formal verify`` for the bughunt step: the ones of the
+    prove step, with the timeout of the bughunt step instead of the one of
+    the prove step, and the ones set for ``formal verify bughunt``
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+
+    :return: the flags
+    :rtype: str
+    """
+    flags = remove_timeout(get_formal_verify_flags(framework))
+    return (f'{flags} -timeout {framework.bughunt["timeout"]} '
+            f'{framework.get_tool_flags("formal verify bughunt")}')
+
 def set_timeout(framework, step, timeout):
     """
     Set the timeout for a specific step
@@ -1372,7 +2875,7 @@ def set_timeout(framework, step, timeout):
     :param framework: the FvmFramework object
     :type framework: fvm.framework.FvmFramework
     :param step: the step to set the timeout for. One of "rulecheck",
-                 "xverify", "reachability", "prove"
+                 "xverify", "reachability", "bughunt", "prove"
     :type step: str
     :param timeout: Timeout value as a string with a number and unit.
     :type timeout: str
@@ -1386,6 +2889,8 @@ def set_timeout(framework, step, timeout):
         framework.tool_flags["covercheck verify"] += timeout_value
     elif step == "prove":
         framework.tool_flags["formal verify"] += timeout_value
+    elif step == "bughunt" and framework.bughunt is not None:
+        framework.bughunt["timeout"] = timeout
 
 def set_coverage_goal(step, goal):
     """
@@ -6,6 +6,24 @@ import re
 import json
 from datetime import datetime
 
+# Line of the transcript of PropCheck with the result of a target
+PROPERTY_PATTERN = re.compile(
+    r"^# \[(\d{2}:\d{2}:\d{2})\]\s+(Proven|Covered|Vacuity Check Passed|"
+    r"Fired|Vacuity Check Failed|Uncoverable):\s+([A-Za-z0-9_.]+)"
+    r"\s*\(engine:(\d+)(?:, vacuity check:([\w]+))?(?:, radius:(-?\d+))?\)"
+)
+
+# Proof radius of a target, in the transcript or the report of PropCheck
+RADIUS_PATTERN = re.compile(r"radius[:\s]\s*(-?\d+)")
+
+def get_radius(text):
+    """
+    Get the proof radius of a target from its line of the transcript or the
+    report, or None if the line has no radius.
+    """
+    match = RADIUS_PATTERN.search(text)
+    return int(match.group(1)) if match else None
+
 def parse_targets_report(report_path):
     """
     Parses the targets report and extracts relevant information.
@@ -122,6 +140,37 @@ def parse_property_summary(file_path):
 
     return summary
 
+def parse_target_results(lines, results=None):
+    """
+    Get the result of each target decided in (part of) the transcript of
+    PropCheck.
+
+    :param lines: lines of the transcript
+    :param results: results of the previous lines of the same transcript,
+                    which are updated
+    :return: A dictionary with the ``status`` (Proven, Vacuous, Fired,
+             Covered or Uncoverable) of each target and the ``time`` in
+             seconds at which it was decided.
+    """
+    results = {} if results is None else results
+    for line in lines:
+        match = PROPERTY_PATTERN.search(line)
+        if not match:
+            continue
+        time, category, target, _, vacuity_check, _ = match.groups()
+        if category == "Vacuity Check Passed":
+            continue
+        if category == "Vacuity Check Failed":
+            if results.get(target, {}).get("status") == "Proven":
+                results[target]["status"] = "Vacuous"
+            continue
+        if category == "Proven" and vacuity_check == "failed":
+            category = "Vacuous"
+        t = datetime.strptime(time, "%H:%M:%S")
+        results[target] = {"status": category,
+                           "time": t.hour * 3600 + t.minute * 60 + t.second}
+    return results
+
 def parse_properties_extended(log_file):
     """
     Parses the properties from a log file and categorizes them.
@@ -137,11 +186,7 @@ def parse_properties_extended(log_file):
 
     inconclusive_entries = {}
 
-    pattern = re.compile(
-        r"^# \[(\d{2}:\d{2}:\d{2})\]\s+(Proven|Covered|Vacuity Check Passed|"
-        r"Fired|Vacuity Check Failed|Uncoverable):\s+([A-Za-z0-9_.]+)"
-        r"\s*\(engine:(\d+)(?:, vacuity check:([\w]+))?(?:, radius:(-?\d+))?\)"
-    )
+    pattern = PROPERTY_PATTERN
 
     def time_to_seconds(time_str):
         """Converts time in format HH:MM:SS to seconds"""
@@ -58,6 +58,25 @@ def define_steps(framework, steps, toolchain):
     module = importlib.import_module(f'fvm.toolchains.{toolchain}')
     module.define_steps(framework, steps)
 
+def set_bughunt_step(framework, steps, toolchain, enabled, fail_fast=False):
+    """
+    Import the corresponding toolchain module and call its set_bughunt_step
+    function to add or remove the bughunt step before the prove step.
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param steps: the Steps object where the steps are registered
+    :type steps: fvm.steps.Steps
+    :param toolchain: toolchain name
+    :type toolchain: str
+    :param enabled: True to add the step, False to remove it
+    :type enabled: bool
+    :param fail_fast: True to skip the prove step if the bughunt step fails
+    :type fail_fast: bool
+    """
+    module = importlib.import_module(f'fvm.toolchains.{toolchain}')
+    module.set_bughunt_step(framework, steps, enabled, fail_fast)
+
 def set_timeout(framework, toolchain, step, timeout):
     """
     Import the corresponding toolchain module and call its set_timeout function
@@ -75,6 +94,73 @@ def set_timeout(framework, toolchain, step, timeout):
     module = importlib.import_module(f'fvm.toolchains.{toolchain}')
     module.set_timeout(framework, step, timeout)
 
+def prune_libraries(framework, toolchain, since):
+    """
+    Import the corresponding toolchain module and call its prune_libraries
+    function to remove the compiled libraries not used since a time.
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param toolchain: toolchain name
+    :type toolchain: str
+    :param since: the time when the run started, as returned by time.time()
+    :type since: float
+    """
+    module = importlib.import_module(f'fvm.toolchains.{toolchain}')
+    module.prune_libraries(framework, since)
+
+def get_cache_key_inputs(framework, toolchain):
+    """
+    Import the corresponding toolchain module and call its
+    get_cache_key_inputs function to get the toolchain-specific values that
+    must be part of the cache key of a step (such as the tool versions).
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param toolchain: toolchain name
+    :type toolchain: str
+
+    :return: list of values, or None if they cannot be found
+    :rtype: list or None
+    """
+    module = importlib.import_module(f'fvm.toolchains.{toolchain}')
+    return module.get_cache_key_inputs(framework)
+
+def get_tool(toolchain, step):
+    """
+    Import the corresponding toolchain module and call its get_tool function
+    to get the name of the tool that runs a step.
+
+    :param toolchain: toolchain name
+    :type toolchain: str
+    :param step: step name
+    :type step: str
+
+    :return: tool name, or None if it is not known
+    :rtype: str or None
+    """
+    module = importlib.import_module(f'fvm.toolchains.{toolchain}')
+    return module.get_tool(step)
+
+def get_difficulty(framework, toolchain, design):
+    """
+    Import the corresponding toolchain module and call its get_difficulty
+    function to estimate how hard a design is to verify, from the reports
+    of its previous executions.
+
+    :param framework: the FvmFramework object
+    :type framework: fvm.framework.FvmFramework
+    :param toolchain: toolchain name
+    :type toolchain: str
+    :param design: design name, or design.config for configurations
+    :type design: str
+
+    :return: difficulty score, or None if it is not known
+    :rtype: float or None
+    """
+    module = importlib.import_module(f'fvm.toolchains.{toolchain}')
+    return module.get_difficulty(framework, design)
+
 def set_coverage_goal(toolchain, step, goal):
     """
     Import the corresponding toolchain module and call its set_coverage_goal function
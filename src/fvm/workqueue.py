@@ -0,0 +1,290 @@
+# Copyright 2024-2026 Universidad de Sevilla
+# SPDX-License-Identifier: Apache-2.0
+
+"""Job queue in a shared directory, for a self-hosted pool of FVM workers
+
+With the ``queue:<dir>`` executor (see :mod:`fvm.executors`), each tool
+command is written to a job script and its job is put in the queue
+directory. Workers started with ``fvm worker <dir>`` in any machine that can
+see the directory claim the pending jobs, run them and write their output
+and exit status next to the job script, from where FVM reads them as usual.
+Only Python, FVM and the tools are needed in the workers.
+
+The queue directory has these subdirectories:
+
+- ``pending``: one JSON file per job waiting for a worker
+- ``running``: the JSON files of the jobs claimed by a worker. Jobs are
+  claimed by renaming their file, which is atomic, so each job runs only
+  once. The worker touches the file periodically, so FVM can detect workers
+  that died
+- ``cancel``: one empty file per job that FVM wants to cancel
+
+In FVM, each job is waited for by a process running ``python -m
+fvm.workqueue``, which puts the job in the queue, waits for its exit status
+and cancels the job if it is interrupted. Since that process is supervised
+by :mod:`fvm.runner` like any other command, deadlines and Ctrl+C work the
+same as with local commands.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import threading
+import subprocess
+
+from loguru import logger
+
+from fvm import executors
+
+PENDING = 'pending'
+RUNNING = 'running'
+CANCEL = 'cancel'
+
+# Seconds between checks of the queue
+POLL_INTERVAL = 0.5
+
+# Seconds between touches of the file of a running job, and seconds without
+# touches after which its worker is considered dead
+HEARTBEAT_INTERVAL = 5
+WORKER_TIMEOUT = 60
+
+# Seconds to wait after SIGINT before sending SIGKILL to a cancelled job
+KILL_DELAY = 10
+
+# Exit status of a job that was cancelled or whose worker died
+CANCELLED_STATUS = 130
+LOST_STATUS = 1
+
+def get_job_file(queue_dir, state, name):
+    """Returns the path of the file of a job in one of the subdirectories"""
+    return os.path.join(queue_dir, state, f'{name}.json')
+
+def create_queue(queue_dir):
+    """Create the subdirectories of a queue directory"""
+    for state in [PENDING, RUNNING, CANCEL]:
+        os.makedirs(os.path.join(queue_dir, state), exist_ok=True)
+
+def enqueue(queue_dir, job):
+    """
+    Put a job in the queue
+
+    :param queue_dir: path of the queue directory
+    :type queue_dir: str
+    :param job: a dict with the ``name`` of the job and the paths of its
+                ``script``, ``log`` and ``status`` files
+    :type job: dict
+    """
+    create_queue(queue_dir)
+    filename = get_job_file(queue_dir, PENDING, job['name'])
+    # Write to a temporary file first, so workers never read half a job
+    with open(f'{filename}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+    os.replace(f'{filename}.tmp', filename)
+
+def cancel(queue_dir, name):
+    """Cancel a job. Pending jobs are removed from the queue, and running
+    jobs are stopped by their worker"""
+    try:
+        os.remove(get_job_file(queue_dir, PENDING, name))
+        return
+    except FileNotFoundError:
+        pass
+    with open(os.path.join(queue_dir, CANCEL, name), 'w', encoding='utf-8'):
+        pass
+
+def wait(queue_dir, job):
+    """
+    Put a job in the queue and wait for its exit status. If interrupted with
+    Ctrl+C (SIGINT), the job is cancelled
+
+    :param queue_dir: path of the queue directory
+    :type queue_dir: str
+    :param job: the job, as in :func:`enqueue`
+    :type job: dict
+
+    :return: the exit status of the job
+    :rtype: int
+    """
+    enqueue(queue_dir, job)
+    print(f'Job {job["name"]} queued in {queue_dir}', flush=True)
+    try:
+        while True:
+            status = executors.read_status(job)
+            if status is not None:
+                return status
+            running = get_job_file(queue_dir, RUNNING, job['name'])
+            try:
+                heartbeat = os.path.getmtime(running)
+            except OSError:
+                heartbeat = None
+            if heartbeat is not None and time.time() - heartbeat > WORKER_TIMEOUT:
+                print(f'The worker running job {job["name"]} stopped responding',
+                      file=sys.stderr, flush=True)
+                return LOST_STATUS
+            if heartbeat is None and not os.path.exists(get_job_file(queue_dir, PENDING,
+                                                                     job['name'])):
+                # The job may have finished between the checks
+                time.sleep(POLL_INTERVAL)
+                status = executors.read_status(job)
+                if status is None and not os.path.exists(running):
+                    print(f'Job {job["name"]} left the queue without an exit status',
+                          file=sys.stderr, flush=True)
+                    return LOST_STATUS
+                continue
+            time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print(f'Cancelling job {job["name"]}', file=sys.stderr, flush=True)
+        cancel(queue_dir, job['name'])
+        return CANCELLED_STATUS
+
+def claim(queue_dir):
+    """Claim the oldest pending job of the queue. Returns the job, or None if
+    there are no pending jobs"""
+    pending_dir = os.path.join(queue_dir, PENDING)
+    entries = []
+    try:
+        for entry in os.scandir(pending_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, entry.name, entry))
+            except OSError:
+                # Another worker claimed it first, or it was cancelled
+                continue
+    except OSError:
+        return None
+    for _, _, entry in sorted(entries, key=lambda item: item[:2]):
+        running = os.path.join(queue_dir, RUNNING, entry.name)
+        try:
+            os.rename(entry.path, running)
+        except OSError:
+            # Another worker claimed it first, or it was cancelled
+            continue
+        with open(running, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return None
+
+def run_job(queue_dir, job):
+    """
+    Run a claimed job until it finishes or is cancelled, and make sure that
+    its exit status is saved
+
+    :param queue_dir: path of the queue directory
+    :type queue_dir: str
+    :param job: the job, as returned by :func:`claim`
+    :type job: dict
+
+    :return: the exit status of the job
+    :rtype: int
+    """
+    running = get_job_file(queue_dir, RUNNING, job['name'])
+    cancel_file = os.path.join(queue_dir, CANCEL, job['name'])
+    with open(job['log'], 'a', encoding='utf-8') as log:
+        process = subprocess.Popen(['sh', job['script']], stdout=log,
+                                   stderr=subprocess.STDOUT, start_new_session=True)
+    last_heartbeat = time.monotonic()
+    kill_time = None
+    while process.poll() is None:
+        time.sleep(POLL_INTERVAL)
+        if time.monotonic() - last_heartbeat >= HEARTBEAT_INTERVAL:
+            os.utime(running)
+            last_heartbeat = time.monotonic()
+        if kill_time is None and os.path.exists(cancel_file):
+            logger.warning(f'Cancelling job {job["name"]}')
+            signal_job(process, signal.SIGINT)
+            kill_time = time.monotonic() + KILL_DELAY
+        elif kill_time is not None and time.monotonic() > kill_time:
+            signal_job(process, signal.SIGKILL)
+
+    returncode = process.returncode if process.returncode >= 0 else 128 - process.returncode
+    # The job script saves the exit status of the command, unless it was
+    # killed before doing it
+    status = executors.read_status(job)
+    if status is None:
+        status = returncode
+        with open(job['status'], 'w', encoding='utf-8') as f:
+            f.write(f'{status}\n')
+    for filename in [running, cancel_file]:
+        if os.path.exists(filename):
+            os.remove(filename)
+    return status
+
+def signal_job(process, signalnum):
+    """Send a signal to the process group of a job"""
+    try:
+        os.killpg(process.pid, signalnum)
+    except ProcessLookupError:
+        pass
+
+def work(queue_dir, jobs=1, max_jobs=None, idle_timeout=None):
+    """
+    Run the jobs of a queue as they arrive
+
+    :param queue_dir: path of the queue directory
+    :type queue_dir: str
+    :param jobs: number of jobs to run at the same time
+    :type jobs: int
+    :param max_jobs: stop after running this many jobs, or None to not stop
+    :type max_jobs: int or None
+    :param idle_timeout: stop after this many seconds without pending jobs,
+                         or None to not stop
+    :type idle_timeout: float or None
+
+    :return: the number of jobs run
+    :rtype: int
+    """
+    create_queue(queue_dir)
+    worker = f'{socket.gethostname()}.{os.getpid()}'
+    logger.info(f'Worker {worker} waiting for jobs in {queue_dir}')
+    lock = threading.Lock()
+    state = {'run': 0, 'claimed': 0, 'running': 0, 'last_job': time.monotonic()}
+
+    def run_jobs():
+        while True:
+            with lock:
+                if max_jobs is not None and state['claimed'] >= max_jobs:
+                    return
+                # The worker is only idle when none of its jobs is running
+                if (idle_timeout is not None and state['running'] == 0 and
+                        time.monotonic() - state['last_job'] > idle_timeout):
+                    return
+                job = claim(queue_dir)
+                if job is not None:
+                    state['claimed'] += 1
+                    state['running'] += 1
+            if job is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+            try:
+                logger.info(f'Running job {job["name"]}: {job["script"]}')
+                status = run_job(queue_dir, job)
+                logger.info(f'Job {job["name"]} finished with exit status {status}')
+            finally:
+                with lock:
+                    state['run'] += 1
+                    state['running'] -= 1
+                    state['last_job'] = time.monotonic()
+
+    threads = [threading.Thread(target=run_jobs, name=f'fvm worker {index}')
+               for index in range(jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger.info(f'Worker {worker} finished after running {state["run"]} jobs')
+    return state['run']
+
+def main(cli_args=None):
+    """Put a job in the queue and wait for it, exiting with its exit
+    status. This is the command that FVM runs for each job"""
+    parser = argparse.ArgumentParser(description='Put an FVM job in a queue and wait for it')
+    parser.add_argument('queue_dir')
+    parser.add_argument('job', help='JSON description of the job')
+    args = parser.parse_args(cli_args)
+    sys.exit(wait(args.queue_dir, json.loads(args.job)))
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,16 @@
 from pathlib import Path
 import shutil
 import subprocess
+import os
+import json
+import re
 import sys
+import signal
+import threading
+import time
+import pstats
+from datetime import datetime, timedelta
+import importlib.metadata
 from contextlib import nullcontext as does_not_raise
 
 # Third party imports
@@ -13,6 +22,22 @@ import pytest
 
 # Our own imports
 from fvm import FvmFramework
+from fvm import helpers
+from fvm import parallel
+from fvm import executors
+from fvm import workqueue
+from fvm import cli
+from fvm import archive
+from fvm import reports
+from fvm import resources
+from fvm import profiling
+from fvm import admission
+from fvm import affinity
+from fvm import history
+from fvm import timeline
+from fvm.steps import Steps
+from fvm.toolchains import questa
+from fvm.toolchains import toolchains
 
 # Error codes
 BAD_VALUE = {"msg": "FVM exit condition: Bad value",
@@ -567,6 +592,1485 @@ def test_set_timeout_invalid() :
     fvm = FvmFramework(cli_args=[])
     fvm.set_timeout("invalid", "5m")
 
+def test_set_jobs() :
+    """Test setting a valid number of parallel jobs"""
+    fvm = FvmFramework(cli_args=[])
+    assert fvm.jobs == 1
+    fvm.set_jobs(4)
+    assert fvm.jobs == 4
+
+def test_set_jobs_cli() :
+    """Test setting the number of parallel jobs from the command line"""
+    fvm = FvmFramework(cli_args=["-j", "3"])
+    assert fvm.jobs == 3
+
+@pytest.mark.parametrize("jobs", [0, "2"])
+def test_set_jobs_invalid(jobs) :
+    """Test setting an invalid number of parallel jobs"""
+    fvm = FvmFramework(cli_args=[])
+    with pytest.raises(SystemExit) as pytest_wrapped_e:
+        fvm.set_jobs(jobs)
+    assert pytest_wrapped_e.type == SystemExit
+    assert pytest_wrapped_e.value.code == BAD_VALUE["value"]
+
+def test_parallel_run_designs(monkeypatch, tmp_path):
+    """Run two configurations in parallel without qverify in the PATH, and
+    check that the results of both worker processes are merged"""
+    real_which = shutil.which
+    monkeypatch.setattr(shutil, "which", lambda x: None if x == "qverify" else real_which(x))
+
+    fvm = FvmFramework(cli_args=["-j", "2", "-o", str(tmp_path)])
+    fvm.cont = True
+    fvm.add_vhdl_source("examples/counter/counter.vhd")
+    fvm.set_toplevel("counter")
+    fvm.add_config("counter", "first", {"MAX_COUNT": 8})
+    fvm.add_config("counter", "second", {"MAX_COUNT": 16})
+    fvm.step = "lint"
+    fvm.init_results()
+    timeline.clear()
+
+    errorcode = parallel.run_designs(fvm)
+
+    assert errorcode is None
+    for config in ["first", "second"]:
+        assert fvm.results[f"counter.{config}"]["lint"]["status"] == "fail"
+    assert fvm.check_errors() is True
+    # The timeline events of the workers are merged
+    step_events = [event for event in timeline.events if event["cat"] == "step"]
+    assert len(step_events) == 2
+    assert all(event["pid"] != os.getpid() for event in step_events)
+
+def test_parallel_run_designs_crash(monkeypatch, tmp_path):
+    """Test that a job whose worker raises is marked as failed, and that the
+    results of the other jobs are kept"""
+    real_which = shutil.which
+    monkeypatch.setattr(shutil, "which", lambda x: None if x == "qverify" else real_which(x))
+    real_run_configuration = FvmFramework.run_configuration
+
+    def run_configuration(self, design, config=None, skip_setup=False):
+        if config["name"] == "first":
+            raise RuntimeError("worker crashed")
+        return real_run_configuration(self, design, config, skip_setup)
+
+    monkeypatch.setattr(FvmFramework, "run_configuration", run_configuration)
+
+    fvm = FvmFramework(cli_args=["-j", "2", "-o", str(tmp_path)])
+    fvm.cont = True
+    fvm.add_vhdl_source("examples/counter/counter.vhd")
+    fvm.set_toplevel("counter")
+    fvm.add_config("counter", "first", {"MAX_COUNT": 8})
+    fvm.add_config("counter", "second", {"MAX_COUNT": 16})
+    fvm.step = "lint"
+    fvm.init_results()
+
+    errorcode = parallel.run_designs(fvm)
+
+    assert errorcode == ERROR_IN_TOOL
+    assert fvm.results["counter.first"]["lint"]["status"] == "fail"
+    assert "worker crashed" in fvm.results["counter.first"]["lint"]["message"]
+    # The other job ran (and failed because there is no qverify)
+    assert fvm.results["counter.second"]["lint"]["status"] == "fail"
+    assert "worker crashed" not in fvm.results["counter.second"]["lint"]["message"]
+
+def test_step_history_total_time(tmp_path):
+    """Test that the history keeps the total elapsed time of a step that runs
+    several commands, and not only the time of the last one"""
+    def setup(framework, path):
+        pass
+
+    def run(framework, path):
+        elapsed_time = 0
+        for duration in ["0.3", "0.1"]:
+            framework.run_cmd(["sleep", duration], "counter", "a", "sleep", verbose=False)
+            elapsed_time += framework.results["counter"]["a"]["elapsed_time"]
+        framework.results["counter"]["a"]["elapsed_time"] = elapsed_time
+        return "", "", 0, 0, "pass"
+
+    fvm = FvmFramework(cli_args=["-c", "-o", str(tmp_path)])
+    fvm.steps = Steps()
+    fvm.steps.add_step(fvm, "a", setup, run)
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    fvm.run_configuration("counter")
+    assert history.get(fvm, "counter", "a")["elapsed_time"] >= 0.4
+
+def test_order_jobs_longest_first(tmp_path):
+    """Test that jobs are sorted by their predicted duration, from the step
+    history, the XML results of previous executions and the design reports"""
+    fvm = FvmFramework(cli_args=["-j", "2", "-o", str(tmp_path)])
+    fvm.set_toplevel(["short", "unknown", "long", "fromxml", "fromrpt"])
+    history.update(fvm, "short", "lint", {"elapsed_time": 10})
+    history.update(fvm, "long", "lint", {"elapsed_time": 100})
+    history.update(fvm, "long", "prove", {"elapsed_time": 3000})
+    os.makedirs(fvm.resultsdir)
+    with open(os.path.join(fvm.resultsdir, "results.xml"), "w", encoding="utf-8") as f:
+        f.write('<testsuites><testsuite name="fromxml">'
+                '<testcase name="fromxml.prove" time="1000"/>'
+                '<testcase name="fromxml.lint" time="5"><skipped/></testcase>'
+                '</testsuite></testsuites>')
+    # The long design takes 3100 seconds for 3700 difficulty points, so the
+    # 4900 points of fromrpt are predicted to take about 4100 seconds
+    for design, clocks in [("fromrpt", 9), ("long", 7)]:
+        os.makedirs(tmp_path / design / "friendliness")
+        with open(tmp_path / design / "friendliness" / "autocheck_design.rpt", "w",
+                  encoding="utf-8") as f:
+            f.write(f"Design Summary\nClocks    {clocks}\nControl Point Bits   {clocks * 25}\n"
+                    "User-specified Constant Bits\n")
+    jobs = parallel.order_jobs(fvm, parallel.get_jobs(fvm))
+    assert [design for design, _ in jobs] == ["unknown", "fromrpt", "long", "fromxml", "short"]
+    assert history.get(fvm, "fromxml", "prove")["elapsed_time"] == 1000
+    assert "fromxml.lint" not in history.load(fvm)
+
+def test_plan(tmp_path):
+    """Test that --plan estimates the makespan and the peak memory from the
+    step history, without running anything"""
+    fvm = FvmFramework(cli_args=["--plan", "-j", "2", "-s", "prove", "-o", str(tmp_path)])
+    fvm.set_toplevel(["a", "b", "c"])
+    fvm.skip("prove.simcover")
+    for design, elapsed_time in [("a", 100), ("b", 60), ("c", 50)]:
+        history.update(fvm, design, "prove", {"elapsed_time": elapsed_time,
+                                              "max_rss": 1024**3})
+    history.update(fvm, "a", "prove.formalcover", {"elapsed_time": 20})
+    fvm.run()
+    with open(tmp_path / "fvm_plan.json", encoding="utf-8") as f:
+        plan = json.load(f)
+    assert [job["name"] for job in plan["jobs"]] == ["a", "b", "c"]
+    assert [step["name"] for step in plan["jobs"][0]["steps"]] == ["prove", "prove.formalcover"]
+    assert plan["jobs"][0]["duration"] == 120
+    # a runs alone while b and then c run in the other worker
+    assert plan["makespan"] == 120
+    assert plan["memory"] == 2 * int(1024**3 * admission.HISTORY_MARGIN)
+    assert plan["tools"]["propcheck"] == {"runs": 6, "time": 230, "licenses": 2}
+    assert not os.path.exists(tmp_path / "a")
+
+def test_set_step_jobs() :
+    """Test setting a valid number of concurrent steps"""
+    fvm = FvmFramework(cli_args=["--step-jobs", "2"])
+    assert fvm.step_jobs == 2
+    fvm.set_step_jobs(8)
+    assert fvm.step_jobs == 8
+
+def create_timed_steps(fvm, failing=()):
+    """Replace the toolchain steps with three dummy steps that record when
+    they start and finish. Step 'c' depends on step 'a'"""
+    times = {}
+
+    def make_run(step):
+        def run(framework, path):
+            times[step] = [time.perf_counter()]
+            time.sleep(0.2)
+            times[step].append(time.perf_counter())
+            status = "fail" if step in failing else "pass"
+            return "", "", 0, 0, status
+        return run
+
+    def setup(framework, path):
+        pass
+
+    fvm.steps = Steps()
+    fvm.steps.add_step(fvm, "a", setup, make_run("a"))
+    fvm.steps.add_step(fvm, "b", setup, make_run("b"))
+    fvm.steps.add_step(fvm, "c", setup, make_run("c"), depends_on=["a"])
+    return times
+
+def test_step_dependencies_concurrent(tmp_path):
+    """Test that independent steps run concurrently and that dependent steps
+    wait for their dependencies"""
+    fvm = FvmFramework(cli_args=["--step-jobs", "2", "-o", str(tmp_path)])
+    times = create_timed_steps(fvm)
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    fvm.run_configuration("counter")
+
+    assert [fvm.results["counter"][step]["status"] for step in "abc"] == ["pass"] * 3
+    # a and b overlap, c starts after a finishes
+    assert times["b"][0] < times["a"][1]
+    assert times["c"][0] >= times["a"][1]
+
+def test_timeline(tmp_path):
+    """Test that steps and subprocesses are written to the timeline, with
+    concurrent steps in different lanes"""
+    fvm = FvmFramework(cli_args=["--step-jobs", "2", "-o", str(tmp_path)])
+    create_timed_steps(fvm)
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    timeline.clear()
+    fvm.run_configuration("counter")
+    fvm.run_cmd(["true"], "counter", "a", "true", verbose=False)
+    timeline.write(fvm)
+
+    with open(tmp_path / "timeline.json", encoding="utf-8") as f:
+        trace = json.load(f)
+    spans = {event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X"}
+    assert {"counter.a", "counter.b", "counter.c", "counter.a (true)"} <= set(spans)
+    assert spans["counter.a"]["tid"] != spans["counter.b"]["tid"]
+    assert spans["counter.a"]["dur"] >= 200000
+    assert spans["counter.a (true)"]["args"]["returncode"] == 0
+    assert any(event["ph"] == "M" and event["name"] == "thread_name"
+               for event in trace["traceEvents"])
+
+def test_step_dependencies_sequential(tmp_path):
+    """Test that steps run in order, one after the other, by default"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    times = create_timed_steps(fvm)
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    fvm.run_configuration("counter")
+
+    assert times["a"][1] <= times["b"][0]
+    assert times["b"][1] <= times["c"][0]
+
+def test_step_dependency_failed(tmp_path):
+    """Test that steps that depend on a failed step are skipped"""
+    fvm = FvmFramework(cli_args=["--step-jobs", "3", "-c", "-o", str(tmp_path)])
+    create_timed_steps(fvm, failing=["a"])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    fvm.run_configuration("counter")
+
+    assert fvm.results["counter"]["a"]["status"] == "fail"
+    assert fvm.results["counter"]["b"]["status"] == "pass"
+    assert fvm.results["counter"]["c"]["status"] == "skip"
+
+def test_step_after_failed(tmp_path):
+    """Test that steps that only run after a failed step are not skipped"""
+    fvm = FvmFramework(cli_args=["--step-jobs", "3", "-c", "-o", str(tmp_path)])
+    times = create_timed_steps(fvm, failing=["a"])
+    fvm.steps.steps["b"]["after"] = ["a"]
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    fvm.run_configuration("counter")
+
+    assert fvm.results["counter"]["a"]["status"] == "fail"
+    assert fvm.results["counter"]["b"]["status"] == "pass"
+    assert times["b"][0] >= times["a"][1]
+    assert fvm.results["counter"]["c"]["status"] == "skip"
+
+def test_compile_key(tmp_path):
+    """Test that the compilation key only changes when something that affects
+    the compilation changes"""
+    src = tmp_path / "counter.vhd"
+    shutil.copy("examples/counter/counter.vhd", src)
+    fvm = FvmFramework(cli_args=[])
+    fvm.add_vhdl_source(str(src))
+    fvm.add_psl_source("examples/counter/counter_properties.psl", flavor="vhdl")
+    key = questa.get_compile_key(fvm)
+    psl_key = questa.get_compile_key(fvm, psl_compile=True)
+
+    # Same inputs, same key. PSL files are only part of the PSL compilation
+    assert questa.get_compile_key(fvm) == key
+    assert psl_key != key
+
+    # Generics are not part of the compilation
+    fvm.set_toplevel("counter")
+    fvm.add_config("counter", "config", {"MAX_COUNT": 8})
+    assert questa.get_compile_key(fvm) == key
+
+    # Changing the VHDL standard, the flags or the sources changes the key
+    fvm.set_vhdl_std("93")
+    assert questa.get_compile_key(fvm) != key
+    fvm.set_vhdl_std("08")
+    fvm.set_tool_flags("vcom", "-lint")
+    assert questa.get_compile_key(fvm) != key
+    fvm.set_tool_flags("vcom", "")
+    assert questa.get_compile_key(fvm) == key
+    with open(src, "a", encoding="utf-8") as f:
+        f.write("-- modified\n")
+    assert questa.get_compile_key(fvm) != key
+
+def test_ensure_compiled_once(tmp_path):
+    """Test that the libraries are only compiled the first time they are
+    needed, using a fake qverify that records its invocations"""
+    calls = tmp_path / "calls.txt"
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    qverify = bindir / "qverify"
+    qverify.write_text(f'#!/bin/sh\necho "$@" >> {calls}\n', encoding="utf-8")
+    qverify.chmod(0o755)
+
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path / "out")])
+    fvm.env["PATH"] = f'{bindir}:{fvm.env["PATH"]}'
+    fvm.add_vhdl_source("examples/counter/counter.vhd")
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+
+    for step in ["lint", "friendliness"]:
+        _, _, err, env, _ = questa.ensure_compiled(fvm, "counter", step)
+        assert err == 0
+        assert env["MODELSIM"].endswith("modelsim.ini")
+    assert len(calls.read_text(encoding="utf-8").splitlines()) == 1
+
+    # The PSL compilation is a different set of libraries
+    questa.ensure_compiled(fvm, "counter", "prove", psl_compile=True)
+    assert len(calls.read_text(encoding="utf-8").splitlines()) == 2
+
+    # Only the libraries used since a time are kept, and reusing libraries
+    # counts as using them
+    libraries = tmp_path / "out" / "libraries"
+    keys = sorted(path.name for path in libraries.iterdir() if path.is_dir())
+    assert len(keys) == 2
+    for key in keys:
+        os.utime(libraries / key / "compiled", (time.time() - 100, time.time() - 100))
+    questa.ensure_compiled(fvm, "counter", "lint")
+    questa.prune_libraries(fvm, time.time() - 50)
+    assert [path.name for path in libraries.iterdir() if path.is_dir()] == \
+        [questa.get_compile_key(fvm)]
+
+def test_qverify_session(monkeypatch, tmp_path):
+    """Test that the steps of a design run in a single qverify session, and
+    that its output is split by step"""
+    calls = tmp_path / "calls.txt"
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    qverify = bindir / "qverify"
+    # A fake qverify that prints the markers of the steps in the script
+    qverify.write_text(f"""#!/bin/sh
+echo "$@" >> {calls}
+eval script=\\${{$#}}
+for step in $(sed -n 's/.*FVM-SESSION-BEGIN \\([a-z]*\\) .*/\\1/p' "$script"); do
+  echo "# FVM-SESSION-BEGIN $step 1000"
+  echo "# Running $step"
+  echo "# FVM-SESSION-END $step 3500"
+done
+""", encoding="utf-8")
+    qverify.chmod(0o755)
+    monkeypatch.setenv("PATH", f'{bindir}:{os.environ["PATH"]}')
+
+    fvm = FvmFramework(cli_args=["--session", "-o", str(tmp_path / "out")])
+    fvm.env["PATH"] = os.environ["PATH"]
+    fvm.add_vhdl_source("examples/counter/counter.vhd")
+    fvm.set_toplevel("counter")
+    for step in ["rulecheck", "xverify", "reachability", "resets", "clocks"]:
+        fvm.skip(step)
+    fvm.init_results()
+    fvm.current_path = str(tmp_path / "out" / "counter")
+    os.makedirs(fvm.current_path)
+    for step in ["lint", "friendliness"]:
+        with open(os.path.join(fvm.current_path, f"{step}.do"), "w", encoding="utf-8") as f:
+            f.write(f"onerror exit\n{step} run\nexit\n")
+
+    outputs = {step: questa.run_qverify_step(fvm, "counter", step)
+               for step in ["lint", "friendliness"]}
+    # One call to compile and one for the session
+    assert len(calls.read_text(encoding="utf-8").splitlines()) == 2
+    with open(os.path.join(fvm.current_path, "session.do"), encoding="utf-8") as f:
+        script = f.read()
+    assert script.count("exit\n") == 2
+    assert "lint run" in script and "friendliness run" in script
+    for step, other in [("lint", "friendliness"), ("friendliness", "lint")]:
+        assert f"Running {step}" in outputs[step][0]
+        assert f"Running {other}" not in outputs[step][0]
+        with open(os.path.join(fvm.current_path, step, f"{step}.log"), encoding="utf-8") as f:
+            log = f.read()
+        assert f"Running {step}" in log and f"Running {other}" not in log
+        assert fvm.results["counter"][step]["elapsed_time"] >= 2.5
+    assert os.path.exists(os.path.join(fvm.current_path, "session.log"))
+
+    # Steps with a timeout of their own, with a pre-hook that would run after
+    # the session, or that run concurrently, do not share a session
+    assert questa.get_session_steps(fvm, "counter") != []
+    fvm.set_timeout("lint", "1h")
+    assert questa.get_session_steps(fvm, "counter") == []
+    fvm.timeouts.pop("lint")
+    fvm.set_pre_hook(lambda step, design: None, "lint")
+    assert questa.get_session_steps(fvm, "counter") != []
+    fvm.set_pre_hook(lambda step, design: None, "friendliness", "counter")
+    assert questa.get_session_steps(fvm, "counter") == []
+    fvm.pre_hooks.clear()
+    fvm.set_step_jobs(2)
+    assert questa.get_session_steps(fvm, "counter") == []
+
+def test_prove_partitions(monkeypatch, tmp_path):
+    """Test that the targets of the prove step are proven in parallel
+    partitions, and that their reports are merged"""
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    qverify = bindir / "qverify"
+    # A fake qverify that proves the labelled directives of the PSL files
+    # compiled in its libraries
+    qverify.write_text("""#!/bin/sh
+case "$5" in
+  *prove.do) ;;
+  *) exit 0 ;;
+esac
+files=$(grep -o -- '-pslfile [^ ]*' "$(dirname "$MODELSIM")/compile.do" | cut -d' ' -f2)
+asserts=$(grep -ho '^ *[a-z_]*: *assert' $files | sed 's/:.*//; s/ //g')
+covers=$(grep -ho '^ *[a-z_]*: *cover' $files | sed 's/:.*//; s/ //g')
+{
+  echo "Property Summary                   Count"
+  echo "========================================"
+  printf '%-34s%6d\n' Assumes 1
+  echo "========================================"
+  printf '%-34s%6d\n' Asserts $(echo $asserts | wc -w)
+  echo "----------------------------------------"
+  printf '  %-32s%6d\n' Proven $(echo $asserts | wc -w)
+  echo "========================================"
+  printf '%-34s%6d\n' Covers $(echo $covers | wc -w)
+  echo "----------------------------------------"
+  printf '  %-32s%6d\n' Covered $(echo $covers | wc -w)
+  echo "========================================"
+  echo ""
+  echo ""
+  echo "Targets Proven ($(echo $asserts | wc -w))"
+  echo "--------------"
+  for name in $asserts; do echo "  $name"; done
+  echo "Targets Covered ($(echo $covers | wc -w))"
+  echo "---------------"
+  for name in $covers; do echo "  $name"; done
+  echo "Assumptions (1)"
+} > "$3/formal_verify.rpt"
+echo "# Proven: $asserts"
+""", encoding="utf-8")
+    qverify.chmod(0o755)
+    monkeypatch.setenv("PATH", f'{bindir}:{os.environ["PATH"]}')
+
+    fvm = FvmFramework(cli_args=["--prove-partitions", "2", "-o", str(tmp_path / "out")])
+    fvm.env["PATH"] = os.environ["PATH"]
+    fvm.add_vhdl_source("examples/counter/counter.vhd")
+    fvm.add_psl_source("examples/counter/counter_properties.psl", flavor="vhdl")
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    fvm.current_toplevel = "counter"
+    path = str(tmp_path / "out" / "counter")
+    fvm.current_path = path
+    os.makedirs(path)
+    with open(os.path.join(path, "prove.do"), "w", encoding="utf-8") as f:
+        f.write("formal verify\nexit\n")
+
+    _, _, stdout_err, stderr_err, status = questa.run_prove(fvm, path)
+    assert (stdout_err, stderr_err, status) == (0, 0, "pass")
+    summary = fvm.results["counter"]["prove"]["summary"]
+    assert summary["Assumes"]["Count"] == 1
+    assert summary["Asserts"]["Count"] == 4
+    assert summary["Asserts"]["Children"]["Proven"]["Count"] == 4
+    assert summary["Covers"]["Children"]["Covered"]["Count"] == 2
+    with open(os.path.join(path, "prove", questa.PARTITIONS_FILE), encoding="utf-8") as f:
+        partitions = json.load(f)
+    assert partitions["prove.partition0"] == ["never_go_over_the_maximum", "count_increments",
+                                              "cover_overflow_to_zero"]
+    assert len(partitions["prove.partition1"]) == 3
+    # Each target is only proven by its own partition
+    with open(os.path.join(path, "prove", "prove.log"), encoding="utf-8") as f:
+        log = f.read()
+    assert log.count("count_increments") == 2
+    assert "prove.partition0" not in fvm.results["counter"]
+    # There is no single database for prove.formalcover
+    questa.setup_prove_formalcover(fvm, path)
+    assert fvm.is_skipped("counter", "prove.formalcover")
+
+def test_prove_portfolio(monkeypatch, tmp_path):
+    """Test that the variants of a portfolio race, that each target takes the
+    first conclusive result, and that the slower variants are cancelled"""
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    qverify = bindir / "qverify"
+    # A fake qverify where the -slow variant proves b first, and then never
+    # finishes, and the other variant decides all the targets
+    qverify.write_text("""#!/bin/sh
+case "$5" in
+  *prove.variant*.do) ;;
+  *) exit 0 ;;
+esac
+if grep -q -- '-slow' "$5"; then
+  echo "# [00:00:01]   Proven: b (engine:1)"
+  exec sleep 30
+fi
+echo "# [00:00:03]   Proven: a (engine:2)"
+echo "# [00:00:05]   Proven: b (engine:2)"
+echo "# [00:00:06]   Covered: c (engine:2)"
+{
+  echo "Property Summary                   Count"
+  echo "========================================"
+  echo "Assumes                                1"
+  echo "========================================"
+  echo "Asserts                                2"
+  echo "----------------------------------------"
+  echo "  Proven                               2"
+  echo "========================================"
+  echo "Covers                                 1"
+  echo "----------------------------------------"
+  echo "  Covered                              1"
+  echo "========================================"
+  echo ""
+  echo ""
+  echo "Targets Proven (2)"
+  echo "------------------"
+  echo "  a"
+  echo "  b"
+  echo "Targets Covered (1)"
+  echo "-------------------"
+  echo "  c"
+  echo "Assumptions (1)"
+} > "$3/formal_verify.rpt"
+""", encoding="utf-8")
+    qverify.chmod(0o755)
+    monkeypatch.setenv("PATH", f'{bindir}:{os.environ["PATH"]}')
+
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path / "out")])
+    fvm.env["PATH"] = os.environ["PATH"]
+    fvm.add_vhdl_source("examples/counter/counter.vhd")
+    fvm.set_toplevel("counter")
+    fvm.set_portfolio("prove", ["-fast", "-slow"])
+    fvm.init_results()
+    fvm.current_toplevel = "counter"
+    path = str(tmp_path / "out" / "counter")
+    fvm.current_path = path
+    os.makedirs(path)
+    with open(os.path.join(path, "prove.do"), "w", encoding="utf-8") as f:
+        f.write("formal verify -cov_mode\nexit\n")
+
+    start = time.monotonic()
+    _, _, stdout_err, stderr_err, status = questa.run_prove(fvm, path)
+    assert time.monotonic() - start < 20
+    assert (stdout_err, stderr_err, status) == (0, 0, "pass")
+    summary = fvm.results["counter"]["prove"]["summary"]
+    assert summary["Asserts"]["Children"]["Proven"]["Count"] == 2
+    assert summary["Covers"]["Children"]["Covered"]["Count"] == 1
+    with open(os.path.join(path, "prove", questa.PORTFOLIO_FILE), encoding="utf-8") as f:
+        portfolio = json.load(f)
+    assert portfolio["targets"]["a"]["variant"] == "prove.variant0"
+    assert portfolio["targets"]["b"]["variant"] == "prove.variant1"
+    with open(os.path.join(path, "prove.variant1", "prove.variant1.log"), encoding="utf-8") as f:
+        assert "FVM: Command cancelled" in f.read()
+    assert questa.is_merged_prove(path)
+
+def test_bughunt(monkeypatch, tmp_path):
+    """Test that the bughunt step runs before the prove step, that the prove
+    step only proves the targets it did not decide, and that fail-fast mode
+    skips the prove step"""
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    qverify = bindir / "qverify"
+    # A fake qverify where the bughunt step fires one assertion and covers
+    # one cover, and the prove step proves the labelled directives of the PSL
+    # files compiled in its libraries
+    qverify.write_text("""#!/bin/sh
+case "$5" in
+  *bughunt.do)
+    {
+      echo "Property Summary                   Count"
+      echo "========================================"
+      printf '%-34s%6d\\n' Assumes 1
+      echo "========================================"
+      printf '%-34s%6d\\n' Asserts 4
+      echo "----------------------------------------"
+      printf '  %-32s%6d\\n' Fired 1
+      printf '  %-32s%6d\\n' Inconclusive 3
+      echo "========================================"
+      printf '%-34s%6d\\n' Covers 2
+      echo "----------------------------------------"
+      printf '  %-32s%6d\\n' Covered 1
+      printf '  %-32s%6d\\n' Inconclusive 1
+      echo "========================================"
+      echo ""
+      echo ""
+      echo "Targets Fired (1)"
+      echo "-----------------"
+      echo "  never_go_over_the_maximum"
+      echo "Targets Covered (1)"
+      echo "-----------------"
+      echo "  cover_overflow_to_zero"
+      echo "Assumptions (1)"
+    } > "$3/formal_verify.rpt"
+    exit 0 ;;
+  *prove.do) ;;
+  *) exit 0 ;;
+esac
+files=$(grep -o -- '-pslfile [^ ]*' "$(dirname "$MODELSIM")/compile.do" | cut -d' ' -f2)
+asserts=$(grep -ho '^ *[a-z_]*: *assert' $files | sed 's/:.*//; s/ //g')
+covers=$(grep -ho '^ *[a-z_]*: *cover' $files | sed 's/:.*//; s/ //g')
+{
+  echo "Property Summary                   Count"
+  echo "========================================"
+  printf '%-34s%6d\\n' Assumes 1
+  echo "========================================"
+  printf '%-34s%6d\\n' Asserts $(echo $asserts | wc -w)
+  echo "----------------------------------------"
+  printf '  %-32s%6d\\n' Proven $(echo $asserts | wc -w)
+  echo "========================================"
+  printf '%-34s%6d\\n' Covers $(echo $covers | wc -w)
+  echo "----------------------------------------"
+  printf '  %-32s%6d\\n' Covered $(echo $covers | wc -w)
+  echo "========================================"
+  echo ""
+  echo ""
+  echo "Targets Proven ($(echo $asserts | wc -w))"
+  echo "--------------"
+  for name in $asserts; do echo "  $name"; done
+  echo "Targets Covered ($(echo $covers | wc -w))"
+  echo "---------------"
+  for name in $covers; do echo "  $name"; done
+  echo "Assumptions (1)"
+} > "$3/formal_verify.rpt"
+echo "# Proven: $asserts"
+""", encoding="utf-8")
+    qverify.chmod(0o755)
+    monkeypatch.setenv("PATH", f'{bindir}:{os.environ["PATH"]}')
+
+    fvm = FvmFramework(cli_args=["--bughunt", "-o", str(tmp_path / "out")])
+    fvm.env["PATH"] = os.environ["PATH"]
+    steps = list(fvm.steps.steps)
+    assert steps.index("bughunt") == steps.index("prove") - 1
+    # Outside fail-fast mode, the prove step runs even if the bughunt step fails
+    assert "bughunt" not in fvm.steps.steps["prove"]["depends_on"]
+    assert "bughunt" in fvm.steps.get_dependencies("prove")
+    fvm.add_vhdl_source("examples/counter/counter.vhd")
+    fvm.add_psl_source("examples/counter/counter_properties.psl", flavor="vhdl")
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    fvm.current_toplevel = "counter"
+    path = str(tmp_path / "out" / "counter")
+    fvm.current_path = path
+    os.makedirs(path)
+    for step in ["bughunt", "prove"]:
+        with open(os.path.join(path, f"{step}.do"), "w", encoding="utf-8") as f:
+            f.write("formal verify\nexit\n")
+
+    *_, status = questa.run_bughunt(fvm, path)
+    assert status == "pass"
+    fvm.results["counter"]["bughunt"]["status"] = status
+    _, _, stdout_err, stderr_err, status = questa.run_prove(fvm, path)
+    # The assertion that fired in the bughunt step fails the prove step
+    assert (stdout_err, stderr_err, status) == (0, 0, "fail")
+    summary = fvm.results["counter"]["prove"]["summary"]
+    assert summary["Assumes"]["Count"] == 1
+    assert summary["Asserts"]["Count"] == 4
+    assert summary["Asserts"]["Children"]["Proven"]["Count"] == 3
+    assert summary["Asserts"]["Children"]["Fired"]["Count"] == 1
+    assert summary["Covers"]["Children"]["Covered"]["Count"] == 2
+    # The targets decided by the bughunt step were not proven again
+    with open(os.path.join(path, "prove", "prove.log"), encoding="utf-8") as f:
+        log = f.read()
+    assert "count_increments" in log
+    assert "never_go_over_the_maximum" not in log
+    assert questa.is_merged_prove(path)
+
+    # If the bughunt step failed, for example with a tool error, all the
+    # targets are proven
+    fvm.results["counter"]["bughunt"]["status"] = "fail"
+    questa.run_prove(fvm, path)
+    with open(os.path.join(path, "prove", "prove.log"), encoding="utf-8") as f:
+        assert "never_go_over_the_maximum" in f.read()
+
+    fvm.set_timeout("bughunt", "1h")
+    fvm.set_bughunt(fail_fast=True)
+    assert "bughunt" in fvm.steps.steps["prove"]["depends_on"]
+    # The timeout is kept when it is not given
+    assert fvm.timeouts["bughunt"] == 3600
+    assert "-timeout 1h" in questa.get_bughunt_verify_flags(fvm)
+    *_, status = questa.run_bughunt(fvm, path)
+    assert status == "fail"
+    fvm.set_bughunt(enabled=False)
+    assert "bughunt" not in fvm.steps.steps
+    assert "bughunt" not in fvm.steps.get_dependencies("prove")
+    fvm.set_timeout("bughunt", "2h")
+    fvm.set_bughunt()
+    assert fvm.bughunt["timeout"] == "7200s"
+    assert fvm.timeouts["bughunt"] == 7200
+
+def test_prove_escalation(monkeypatch, tmp_path):
+    """Test that the inconclusive targets of the prove step are proven again
+    with increasing timeouts and several engine mixes, and that the best
+    result of each target is kept"""
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    qverify = bindir / "qverify"
+    # A fake qverify where the prove step leaves count_increments and
+    # count_overflow inconclusive, count_increments is proven with a timeout
+    # of 2s and count_overflow needs the -hp engines and a timeout of 4s
+    qverify.write_text("""#!/bin/sh
+case "$5" in
+  *prove.do) proven="never_go_over_the_maximum reset_clears_count"; sleep 1 ;;
+  *prove.escalation*.do)
+    proven=""
+    if grep -q -- '-timeout 2s' "$5" && ! grep -q -- '-hp' "$5"; then
+      proven="count_increments"
+    fi
+    if grep -q -- '-timeout 4s -hp' "$5"; then
+      proven="count_overflow"
+    fi ;;
+  *) exit 0 ;;
+esac
+for name in $proven; do echo "# [00:00:01]   Proven: $name (engine:1)"; done
+{
+  echo "Property Summary                   Count"
+  echo "========================================"
+  printf '%-34s%6d\\n' Assumes 1
+  echo "========================================"
+  printf '%-34s%6d\\n' Asserts 4
+  echo "----------------------------------------"
+  printf '  %-32s%6d\\n' Proven 2
+  printf '  %-32s%6d\\n' Inconclusive 2
+  echo "========================================"
+  printf '%-34s%6d\\n' Covers 2
+  echo "----------------------------------------"
+  printf '  %-32s%6d\\n' Covered 2
+  echo "========================================"
+  echo ""
+  echo ""
+  echo "Targets Proven (2)"
+  echo "------------------"
+  echo "  never_go_over_the_maximum"
+  echo "  reset_clears_count"
+  echo "Targets Inconclusive (2)"
+  echo "------------------------"
+  echo "  count_increments (radius 3)"
+  echo "  count_overflow (radius $(grep -o -- '-timeout [0-9]*' "$5" | cut -d' ' -f2))"
+  echo "Targets Covered (2)"
+  echo "-------------------"
+  echo "  cover_overflow_to_zero"
+  echo "  cover_overflow_to_zero_and_reset"
+  echo "Assumptions (1)"
+} > "$3/formal_verify.rpt"
+""", encoding="utf-8")
+    qverify.chmod(0o755)
+    monkeypatch.setenv("PATH", f'{bindir}:{os.environ["PATH"]}')
+
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path / "out")])
+    fvm.env["PATH"] = os.environ["PATH"]
+    fvm.add_vhdl_source("examples/counter/counter.vhd")
+    fvm.add_psl_source("examples/counter/counter_properties.psl", flavor="vhdl")
+    fvm.set_toplevel("counter")
+    fvm.set_prove_escalation("1m", timeout="1s", factor=2, engines=["", "-hp"])
+    fvm.init_results()
+    fvm.current_toplevel = "counter"
+    path = str(tmp_path / "out" / "counter")
+    fvm.current_path = path
+    os.makedirs(path)
+    with open(os.path.join(path, "prove.do"), "w", encoding="utf-8") as f:
+        f.write("formal verify -timeout 1m -cov_mode\nexit\n")
+
+    _, _, stdout_err, stderr_err, status = questa.run_prove(fvm, path)
+    assert (stdout_err, stderr_err, status) == (0, 0, "pass")
+    summary = fvm.results["counter"]["prove"]["summary"]
+    assert summary["Asserts"]["Children"]["Proven"]["Count"] == 4
+    assert "Inconclusive" not in summary["Asserts"]["Children"]
+    # The time of the escalation is added to the time of the first proof
+    assert fvm.results["counter"]["prove"]["elapsed_time"] > 1
+    escalation = fvm.results["counter"]["prove"]["escalation"]
+    assert escalation["count_increments"]["round"] == 1
+    assert escalation["count_overflow"]["round"] == 2
+    assert escalation["count_overflow"]["engines"] == "-hp"
+    # The largest radius of the rounds where it was inconclusive is kept
+    assert escalation["count_overflow"]["radius"] == 2
+    # Only the inconclusive targets are proven again
+    with open(os.path.join(path, "prove.escalation2_1.do"), encoding="utf-8") as f:
+        assert "-timeout 4s -hp" in f.read()
+    with open(os.path.join(path, "prove", "escalation2", "0_counter_properties.psl"),
+              encoding="utf-8") as f:
+        psl = f.read()
+    assert "count_overflow" in psl
+    assert "count_increments" not in psl
+    with open(os.path.join(path, "prove", questa.ESCALATION_FILE), encoding="utf-8") as f:
+        assert json.load(f)["rounds"] == 3
+    assert not questa.is_merged_prove(path)
+
+def test_step_cache(monkeypatch, tmp_path):
+    """Test that steps that passed are restored from the cache when their
+    inputs have not changed, and run again when they have"""
+    calls = []
+    monkeypatch.setattr(questa, "get_tool_version", lambda framework: "2024.1")
+
+    def setup(framework, path):
+        pass
+
+    def run(framework, path):
+        calls.append(framework.get_tool_flags("a"))
+        os.makedirs(os.path.join(path, "a"), exist_ok=True)
+        with open(os.path.join(path, "a", "report.txt"), "w", encoding="utf-8") as f:
+            f.write("report")
+        framework.results["counter"]["a"]["summary"] = {"Proven": 1}
+        status = "fail" if framework.get_tool_flags("a") == "fail" else "pass"
+        return "stdout", "", 0, 0, status
+
+    def run_design(flags):
+        fvm = FvmFramework(cli_args=["--cache", "-c", "-o", str(tmp_path)])
+        fvm.steps = Steps()
+        fvm.steps.add_step(fvm, "a", setup, run)
+        fvm.set_tool_flags("a", flags)
+        fvm.set_toplevel("counter")
+        fvm.init_results()
+        fvm.run_configuration("counter")
+        return fvm
+
+    fvm = run_design("")
+    assert calls == [""]
+    assert fvm.results["counter"]["a"].get("cached") is None
+
+    # Same inputs: restored from cache, including the step output directory
+    fvm = run_design("")
+    assert calls == [""]
+    assert fvm.results["counter"]["a"]["cached"] is True
+    assert fvm.results["counter"]["a"]["status"] == "pass"
+    assert fvm.results["counter"]["a"]["summary"] == {"Proven": 1}
+    assert (tmp_path / "counter" / "a" / "report.txt").exists()
+
+    # Different inputs: run again
+    run_design("-other")
+    assert calls == ["", "-other"]
+
+    # Failed steps are not cached
+    run_design("fail")
+    run_design("fail")
+    assert calls == ["", "-other", "fail", "fail"]
+
+    # Without the version of the tools, the cache is not used
+    monkeypatch.setattr(questa, "get_tool_version", lambda framework: None)
+    fvm = run_design("")
+    assert calls == ["", "-other", "fail", "fail", ""]
+    assert fvm.results["counter"]["a"].get("cached") is None
+
+def test_step_cache_dependencies(monkeypatch, tmp_path):
+    """Test that a step runs again when a step it depends on changes, even if
+    its own inputs have not changed"""
+    calls = []
+    monkeypatch.setattr(questa, "get_tool_version", lambda framework: "2024.1")
+
+    def setup(framework, path):
+        pass
+
+    def run_step(step, path):
+        calls.append(step)
+        return "stdout", "", 0, 0, "pass"
+
+    def run_design(script):
+        fvm = FvmFramework(cli_args=["--cache", "-c", "-o", str(tmp_path)])
+        fvm.steps = Steps()
+        fvm.steps.add_step(fvm, "a", setup, lambda framework, path: run_step("a", path))
+        fvm.steps.add_step(fvm, "b", setup, lambda framework, path: run_step("b", path),
+                           depends_on=["a"])
+        fvm.set_toplevel("counter")
+        fvm.init_results()
+        os.makedirs(tmp_path / "counter", exist_ok=True)
+        (tmp_path / "counter" / "a.do").write_text(script, encoding="utf-8")
+        fvm.run_configuration("counter")
+
+    run_design("first")
+    run_design("first")
+    assert calls == ["a", "b"]
+    # Only the script of a changes, but b depends on its results
+    run_design("second")
+    assert calls == ["a", "b", "a", "b"]
+
+def test_run_cmd_concurrent_streams(tmp_path):
+    """Test that run_cmd reads stdout and stderr at the same time: a command
+    that fills the stderr pipe before writing to stdout must not block, and
+    the step log must contain both streams in the order they were written"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    script = ('for i in $(seq 5000); do echo "stderr line $i" >&2; done; sleep 0.2; '
+              'echo first; sleep 0.2; echo second >&2; sleep 0.2; echo third')
+    stdout, stderr = fvm.run_cmd(["sh", "-c", script], "counter", "lint", "sh", verbose=False)
+
+    assert stdout == "first\nthird\n"
+    assert len(stderr.splitlines()) == 5001
+    logfile = tmp_path / "counter" / "lint" / "lint.log"
+    lines = logfile.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 5003
+    assert lines[-3:] == ["first", "second", "third"]
+
+def reference_linecheck(patterns, line):
+    """Classify a line keyword by keyword, as linecheck originally did"""
+    err, warn, success = False, False, False
+    for keyword in patterns.get("ignore", []):
+        if keyword.casefold() in line.casefold():
+            return err, warn, success
+    for category, keywords in patterns.items():
+        if category == "ignore":
+            continue
+        for keyword in keywords:
+            if re.search(rf"\b{re.escape(keyword)}\b", line, re.IGNORECASE):
+                err = err or category == "error"
+                warn = warn or category == "warning"
+                success = success or category == "success"
+    return err, warn, success
+
+@pytest.mark.parametrize("step", [None, "lint", "friendliness", "rulecheck", "xverify",
+                                  "reachability", "resets", "clocks", "prove",
+                                  "prove.formalcover", "prove.simcover"])
+def test_linecheck_compiled(step):
+    """Test that the compiled linecheck classifies lines exactly as the
+    keyword by keyword implementation"""
+    fvm = FvmFramework(cli_args=[])
+    patterns = toolchains.get_linecheck_patterns(fvm, step)
+    lines = ["", "Errors: 0, Warnings: 2", "** Error: something", "errors found",
+             "Error (0)", "Warning (0) and Error (1)", "terror", "WARNINGS",
+             "Proven: 10, Inconclusive: 2", "Inconclusive: 3", "2 inconclusives",
+             "Assertion fired", "covered", "Proven", "Vacuous", "uncoverable",
+             "environment variable not set", "no message at all"]
+    for line in lines:
+        assert fvm.linecheck(line, step) == reference_linecheck(patterns, line)
+
+def test_logcheck_reuses_classification(tmp_path):
+    """Test that logcheck uses the classification made by run_cmd"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    stdout, _ = fvm.run_cmd(["echo", "Error: found"], "counter", "lint", "echo",
+                            verbose=False)
+    assert stdout.classes == [(True, False, False)]
+    assert fvm.logcheck(stdout, "counter", "lint", "echo") is True
+    assert fvm.logcheck("no problems here", "counter", "lint", "echo") is False
+
+def test_archive_snapshot(tmp_path):
+    """Test that archiving moves the step outputs and keeps the scripts"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    current_dir = tmp_path / "counter"
+    (current_dir / "prove").mkdir(parents=True)
+    (current_dir / "prove" / "prove.log").write_text("log", encoding="utf-8")
+    (current_dir / "prove.do").write_text("script", encoding="utf-8")
+    target = archive.snapshot(fvm, str(current_dir), str(tmp_path / "previous_executions"),
+                              "counter")
+    assert os.path.basename(target).startswith("counter_")
+    assert (current_dir / "prove.do").read_text(encoding="utf-8") == "script"
+    assert not (current_dir / "prove").exists()
+    assert os.path.exists(os.path.join(target, "prove", "prove.log"))
+    assert os.path.exists(os.path.join(target, "prove.do"))
+
+def create_snapshots(archive_dir, name, ages_days):
+    """Create dummy snapshots with the specified ages, in days"""
+    now = datetime.now()
+    for age in ages_days:
+        timestamp = (now - timedelta(days=age)).isoformat()
+        snapshot_dir = archive_dir / f"{name}_{timestamp}"
+        snapshot_dir.mkdir(parents=True)
+        (snapshot_dir / "file.txt").write_text("x" * 1024, encoding="utf-8")
+
+def test_archive_prune_keep(tmp_path):
+    """Test that only the newest snapshots are kept, and the rest compressed"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_archive_policy(keep=3, compress=True)
+    create_snapshots(tmp_path, "counter", [1, 2, 3, 4, 5])
+    create_snapshots(tmp_path, "other", [1, 2, 3, 4, 5])
+    archive.prune_in_background(fvm, str(tmp_path), "counter")
+    archive.wait()
+    entries = sorted(os.listdir(tmp_path))
+    counter = [entry for entry in entries if entry.startswith("counter_")]
+    other = [entry for entry in entries if entry.startswith("other_")]
+    assert len(counter) == 3
+    assert len([entry for entry in counter if entry.endswith(".tar.gz")]) == 2
+    assert len(other) == 5
+
+def test_archive_prune_age_and_size(tmp_path):
+    """Test that old snapshots and snapshots over the size limit are removed"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_archive_policy(max_age_days=3.5)
+    create_snapshots(tmp_path, "counter", [1, 2, 3, 4, 5])
+    archive.prune(fvm, str(tmp_path), "counter")
+    assert len(os.listdir(tmp_path)) == 3
+    fvm.set_archive_policy(max_size_mb=2.5/1024)
+    archive.prune(fvm, str(tmp_path), "counter")
+    assert len(os.listdir(tmp_path)) == 2
+
+@pytest.mark.parametrize("kwargs", [{"keep": -1}, {"max_age_days": "1"},
+                                    {"max_size_mb": True}, {"compress": 1}])
+def test_set_archive_policy_invalid(kwargs):
+    """Test that invalid retention policies are rejected"""
+    fvm = FvmFramework(cli_args=[])
+    with pytest.raises(SystemExit) as pytest_wrapped_e:
+        fvm.set_archive_policy(**kwargs)
+    assert pytest_wrapped_e.value.code == BAD_VALUE["value"]
+
+def test_set_timeout_deadline(tmp_path):
+    """Test that set_timeout also sets a framework-side deadline"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_timeout("prove", "2m")
+    assert fvm.timeouts["prove"] == 120
+    fvm.start_deadline("counter", "prove")
+    remaining = fvm.deadlines["counter", "prove"] - time.monotonic()
+    assert 170 < remaining <= 180
+
+def test_run_cmd_deadline(tmp_path):
+    """Test that commands are interrupted when the step deadline expires"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    fvm.deadlines["counter", "lint"] = time.monotonic() + 0.5
+    start = time.perf_counter()
+    _, stderr = fvm.run_cmd(["sleep", "30"], "counter", "lint", "sleep", verbose=False)
+    assert time.perf_counter() - start < 10
+    assert "exceeded the deadline" in stderr
+    assert fvm.results["counter"]["lint"]["timed_out"] is True
+    assert fvm.logcheck(stderr, "counter", "lint", "sleep") is True
+
+def test_run_cmd_interrupt_all(tmp_path):
+    """Test that Ctrl+C stops all the commands that are running at once"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    results = []
+    def run(step):
+        results.append(fvm.run_cmd(["sleep", "30"], "counter", step, "sleep",
+                                   verbose=False))
+    threads = [threading.Thread(target=run, args=(step,)) for step in ["lint", "friendliness"]]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    fvm.handle_sigint(signal.SIGINT, None)
+    for thread in threads:
+        thread.join()
+    assert time.perf_counter() - start < 10
+    assert len(results) == 2
+    assert fvm.ctrl_c_pressed is True
+
+def create_submitter(tmp_path):
+    """Create a stand-in batch scheduler submitter, used as
+    ``submit.sh LOG SCRIPT`` like ``sbatch --wait -o LOG SCRIPT``, which
+    always returns 0 as schedulers do when the job runs"""
+    submitter = tmp_path / "submit.sh"
+    submitter.write_text('#!/bin/sh\necho "Submitted job"\nsh "$2" > "$1" 2>&1\nexit 0\n',
+                         encoding="utf-8")
+    submitter.chmod(0o755)
+    return submitter
+
+def test_tool_version_executor(tmp_path):
+    """Test that the version of the tools is found with the executor and the
+    environment of the tools"""
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    qverify = bindir / "qverify"
+    qverify.write_text('#!/bin/sh\necho "Questa Formal 2024.1"\n', encoding="utf-8")
+    qverify.chmod(0o755)
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path / "out")])
+    fvm.env["PATH"] = str(tmp_path / "empty")
+    assert questa.get_tool_version(fvm) is None
+    assert questa.get_cache_key_inputs(fvm) is None
+    fvm.env["PATH"] = f'{bindir}:{os.environ["PATH"]}'
+    assert questa.get_tool_version(fvm) == "Questa Formal 2024.1"
+    # The output of the submission command is not part of the version
+    qverify.write_text('#!/bin/sh\necho "Questa Formal 2025.1"\n', encoding="utf-8")
+    fvm.set_executor(f"submit:{create_submitter(tmp_path)} {{log}} {{script}}")
+    assert questa.get_tool_version(fvm) == "Questa Formal 2025.1"
+
+def test_run_cmd_submit_executor(tmp_path):
+    """Test running a command as a job of a batch scheduler"""
+    submitter = create_submitter(tmp_path)
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path / "out"),
+                                 "--executor", f"submit:{submitter} {{log}} {{script}}"])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    cmd = ["sh", "-c", 'echo "hello from $PWD"; echo "$FLEXLM_DIAGNOSTICS_PATH"; exit 3']
+    stdout, stderr = fvm.run_cmd(cmd, "counter", "lint", "sh", verbose=False, cwd=str(tmp_path))
+    assert "Submitted job" in stdout
+    assert f"hello from {tmp_path}" in stdout
+    assert fvm.flexlm_logdir in stdout
+    assert "non-zero exit status 3" in stderr
+    assert list((tmp_path / "out" / "counter" / "lint").glob("lint.*.job.sh"))
+
+def test_run_cmd_submit_executor_cancel(tmp_path):
+    """Test that submitted jobs are cancelled when their deadline expires"""
+    submitter = create_submitter(tmp_path)
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path / "out")])
+    fvm.set_executor(f"submit:{submitter} {{log}} {{script}}",
+                     cancel=f"touch {tmp_path}/{{name}}.cancelled")
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    fvm.deadlines["counter", "lint"] = time.monotonic() + 0.5
+    _, stderr = fvm.run_cmd(["sleep", "30"], "counter", "lint", "sleep", verbose=False)
+    assert "exceeded the deadline" in stderr
+    for _ in range(50):
+        if list(tmp_path.glob("fvm.lint.*.cancelled")):
+            break
+        time.sleep(0.1)
+    assert list(tmp_path.glob("fvm.lint.*.cancelled"))
+
+def test_run_cmd_queue_executor(tmp_path):
+    """Test running a command in a worker of a queue directory"""
+    queue_dir = tmp_path / "queue"
+    worker = threading.Thread(target=workqueue.work, args=(str(queue_dir),),
+                              kwargs={"max_jobs": 1})
+    worker.start()
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path / "out"), "--executor", f"queue:{queue_dir}"])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    cmd = ["sh", "-c", "echo hello from the worker; exit 2"]
+    stdout, stderr = fvm.run_cmd(cmd, "counter", "lint", "sh", verbose=False)
+    worker.join(timeout=30)
+    assert not worker.is_alive()
+    assert "hello from the worker" in stdout
+    assert "non-zero exit status 2" in stderr
+    assert not list((queue_dir / "pending").iterdir())
+    assert not list((queue_dir / "running").iterdir())
+
+def test_workqueue_worker(monkeypatch, tmp_path):
+    """Test that jobs that leave the queue while being claimed are skipped,
+    and that a worker is not idle while any of its jobs is running"""
+    queue_dir = str(tmp_path / "queue")
+    def create_job(name, command):
+        script = tmp_path / f"{name}.sh"
+        script.write_text(f"{command}\n", encoding="utf-8")
+        return {"name": name, "script": str(script), "log": str(tmp_path / f"{name}.log"),
+                "status": str(tmp_path / f"{name}.status")}
+    class VanishedEntry:
+        """A pending job claimed by another worker after it was listed"""
+        name = "vanished.json"
+        path = str(tmp_path / "queue" / "pending" / "vanished.json")
+        def stat(self):
+            raise FileNotFoundError(self.path)
+    workqueue.enqueue(queue_dir, create_job("first", "true"))
+    scandir = os.scandir
+    with monkeypatch.context() as m:
+        m.setattr(os, "scandir", lambda path: [VanishedEntry(), *scandir(path)])
+        assert workqueue.claim(queue_dir)["name"] == "first"
+
+    slow, fast = create_job("slow", "sleep 3"), create_job("fast", "true")
+    workqueue.enqueue(queue_dir, slow)
+    worker = threading.Thread(target=workqueue.work, args=(queue_dir,),
+                              kwargs={"jobs": 2, "idle_timeout": 1})
+    worker.start()
+    time.sleep(2)
+    workqueue.enqueue(queue_dir, fast)
+    worker.join(timeout=30)
+    assert not worker.is_alive()
+    # The second slot was still available while the slow job was running
+    assert os.path.getmtime(fast["status"]) < os.path.getmtime(slow["status"])
+
+def test_run_cmd_queue_executor_cancel(tmp_path):
+    """Test that queued jobs are stopped by their worker when their deadline
+    expires"""
+    queue_dir = tmp_path / "queue"
+    worker = threading.Thread(target=cli.main,
+                              args=(["worker", str(queue_dir), "--max-jobs", "1"],))
+    worker.start()
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path / "out")])
+    fvm.set_executor(f"queue:{queue_dir}")
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    fvm.deadlines["counter", "lint"] = time.monotonic() + 2
+    start = time.perf_counter()
+    _, stderr = fvm.run_cmd(["sleep", "30"], "counter", "lint", "sleep", verbose=False)
+    worker.join(timeout=30)
+    assert time.perf_counter() - start < 20
+    assert "exceeded the deadline" in stderr
+    assert not list((queue_dir / "running").iterdir())
+
+def test_run_cmd_license_retry(tmp_path):
+    """Test that commands are run again when their license is denied"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_license_retry(retries=3, delay=0.1, max_delay=0.2)
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    counter = tmp_path / "attempts"
+    # Denied in the first attempt, successful in the second one
+    cmd = ["sh", "-c", f'echo x >> {counter}; if [ $(wc -l < {counter}) -lt 2 ]; then '
+                       f'echo "Error: Unable to checkout license for propcheck"; exit 1; fi; '
+                       f'echo "Proof finished"']
+    stdout, stderr = fvm.run_cmd(cmd, "counter", "prove", "propcheck", verbose=False)
+    assert "Proof finished" in stdout
+    assert "Unable to checkout" not in stdout
+    assert "non-zero exit status" not in stderr
+    assert fvm.results["counter"]["prove"]["license_retries"] == 1
+    assert "retrying" in (tmp_path / "counter" / "prove" / "prove.log").read_text(encoding="utf-8")
+
+def test_run_cmd_license_retry_exhausted(tmp_path):
+    """Test that the step fails if the license is always denied"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_license_retry(retries=1, delay=0)
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    cmd = ["sh", "-c", 'echo "FlexNet Licensing error:-4,132"; exit 1']
+    _, stderr = fvm.run_cmd(cmd, "counter", "prove", "propcheck", verbose=False)
+    assert "Could not check out a propcheck license after 2 attempts" in stderr
+
+def test_run_cmd_license_limit(tmp_path):
+    """Test that the jobs of a tool with a license limit do not overlap"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_license_limit("sleep", 1)
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    threads = [threading.Thread(target=fvm.run_cmd,
+                                args=(["sleep", "0.5"], "counter", step, "sleep", False))
+               for step in ["lint", "friendliness"]]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.perf_counter() - start >= 1
+    assert len(list((tmp_path / ".licenses").glob("sleep.*.lock"))) == 1
+
+def test_set_license_limit_invalid():
+    """Test setting a license limit that is not valid"""
+    fvm = FvmFramework(cli_args=[])
+    with pytest.raises(SystemExit) as pytest_wrapped_e:
+        fvm.set_license_limit("propcheck", 0)
+    assert pytest_wrapped_e.type == SystemExit
+    assert pytest_wrapped_e.value.code == BAD_VALUE["value"]
+
+def test_run_cmd_oom_retry(tmp_path):
+    """Test that commands killed by the OOM killer are run again alone"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    counter = tmp_path / "attempts"
+    # Killed with SIGKILL in the first attempt, successful in the second one
+    cmd = ["sh", "-c", f'echo x >> {counter}; if [ $(wc -l < {counter}) -lt 2 ]; then '
+                       f'kill -9 $$; fi; echo "Proof finished"']
+    stdout, stderr = fvm.run_cmd(cmd, "counter", "prove", "propcheck", verbose=False)
+    assert "Proof finished" in stdout
+    assert "non-zero exit status" not in stderr
+    assert fvm.results["counter"]["prove"]["oom_retries"] == 1
+    assert admission.is_oom(137, []) is True
+    assert admission.is_oom(1, ["std::bad_alloc"]) is True
+    assert admission.is_oom(1, ["Error: syntax error"]) is False
+
+def test_admission_concurrent_oom_retries(tmp_path):
+    """Test that two steps retried alone after running out of memory do not
+    block each other, and run one after another"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_memory_limit("1G")
+    def reservation(name, alone, since):
+        return {"pid": os.getpid(), "bytes": 0, "alone": alone, "name": name, "since": since}
+    a, b, c = reservation("a", True, 1.0), reservation("b", True, 2.0), reservation("c", False, 0.0)
+    assert admission.try_reserve(fvm, "c", c) is True
+    assert admission.try_reserve(fvm, "a", a) is False
+    assert admission.try_reserve(fvm, "b", b) is False
+    # No new steps start while the retries are waiting
+    assert admission.try_reserve(fvm, "d", reservation("d", False, 3.0)) is False
+    admission.release(fvm, "c")
+    assert admission.try_reserve(fvm, "b", b) is False
+    assert admission.try_reserve(fvm, "a", a) is True
+    assert admission.try_reserve(fvm, "b", b) is False
+    admission.release(fvm, "a")
+    assert admission.try_reserve(fvm, "b", b) is True
+    admission.release(fvm, "b")
+    assert admission.try_reserve(fvm, "d", reservation("d", False, 3.0)) is True
+
+def test_run_cmd_memory_admission(tmp_path):
+    """Test that steps that do not fit in the memory budget do not overlap,
+    and that their peak memory is saved for the next executions"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_memory_limit("1G")
+    fvm.set_memory_hint("lint", "800M")
+    fvm.set_memory_hint("friendliness", 800 * 1024**2)
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    threads = [threading.Thread(target=fvm.run_cmd,
+                                args=(["sleep", "0.6"], "counter", step, "sleep", False))
+               for step in ["lint", "friendliness"]]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.perf_counter() - start >= 1.2
+    max_rss = history.get(fvm, "counter", "lint")["max_rss"]
+    assert max_rss > 0
+    assert admission.get_estimate(fvm, "counter", "lint") == 800 * 1024**2
+    # Without a hint, the estimate comes from the peak memory of the last run
+    del fvm.memory_hints["lint"]
+    assert admission.get_estimate(fvm, "counter", "lint") == int(max_rss * admission.HISTORY_MARGIN)
+
+def test_set_memory_limit_invalid():
+    """Test setting a memory limit that is not valid"""
+    fvm = FvmFramework(cli_args=[])
+    with pytest.raises(SystemExit) as pytest_wrapped_e:
+        fvm.set_memory_limit("lots")
+    assert pytest_wrapped_e.type == SystemExit
+    assert pytest_wrapped_e.value.code == BAD_VALUE["value"]
+
+def test_cpu_partitions(monkeypatch):
+    """Test that the CPUs are split into whole NUMA nodes first"""
+    fvm = FvmFramework(cli_args=[])
+    fvm.set_toplevel("counter")
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)))
+    monkeypatch.setattr(affinity, "get_nodes", lambda: [[0, 1, 2], [3, 4, 5, 6, 7]])
+    assert affinity.get_partitions(fvm) == []
+    fvm.set_step_jobs(2)
+    assert affinity.get_partitions(fvm) == [[3, 4, 5, 6], [0, 1, 2, 7]]
+    assert affinity.get_engines(fvm) == 4
+    assert "-jobs 4" in questa.get_formal_verify_flags(fvm)
+    fvm.set_cpu_affinity(False)
+    assert affinity.get_partitions(fvm) == []
+    assert "-jobs" not in questa.get_formal_verify_flags(fvm)
+    assert affinity.parse_cpulist("0-2,8,10-11\n") == [0, 1, 2, 8, 10, 11]
+
+@pytest.mark.skipif(len(os.sched_getaffinity(0)) < 2, reason="Needs at least 2 CPUs")
+def test_run_cmd_cpu_affinity(tmp_path):
+    """Test that concurrent commands run in disjoint sets of CPUs"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_toplevel("counter")
+    fvm.set_step_jobs(2)
+    fvm.init_results()
+    partitions = affinity.get_partitions(fvm)
+    cmd = ["sh", "-c", "grep Cpus_allowed_list /proc/self/status; sleep 0.5"]
+    outputs = {}
+    def run(step):
+        outputs[step], _ = fvm.run_cmd(cmd, "counter", step, "sleep", verbose=False)
+    threads = [threading.Thread(target=run, args=(step,)) for step in ["lint", "friendliness"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cpus = [affinity.parse_cpulist(outputs[step].split(":")[1]) for step in outputs]
+    assert sorted(cpus) == sorted(partitions)
+
+def test_run_cmd_pinned(monkeypatch, tmp_path):
+    """Test that a command pinned to a partition runs with its affinity from
+    its start"""
+    cpu = min(os.sched_getaffinity(0))
+    monkeypatch.setattr(affinity, "get_partitions", lambda framework: [[cpu]])
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    stdout, _ = fvm.run_cmd(["grep", "Cpus_allowed_list", "/proc/self/status"],
+                            "counter", "lint", "grep", verbose=False)
+    assert affinity.parse_cpulist(stdout.split(":")[1]) == [cpu]
+
+def test_executor_ssh_command(tmp_path):
+    """Test the command that runs a job in another host"""
+    executor = executors.parse_executor("ssh:bighost")
+    job = executors.prepare(executor, ["qverify", "-c"], None, {}, str(tmp_path), "lint")
+    assert job["command"][0] == "ssh"
+    assert job["command"][-3:] == ["setsid", "sh", job["script"]]
+    assert "bighost" in job["command"]
+    assert "qverify -c" in Path(job["script"]).read_text(encoding="utf-8")
+    assert executors.get_cancel_command(job) is None
+    Path(job["pid"]).write_text("1234\n", encoding="utf-8")
+    assert executors.get_cancel_command(job)[-3:] == ["-INT", "--", "-1234"]
+
+@pytest.mark.parametrize("executor", ["remote", "submit:sbatch job.sh",
+                                      "submit:sbatch {script} {unknown}"])
+def test_set_executor_invalid(executor):
+    """Test setting executors that are not valid"""
+    fvm = FvmFramework(cli_args=[])
+    with pytest.raises(SystemExit) as pytest_wrapped_e:
+        fvm.set_executor(executor)
+    assert pytest_wrapped_e.type == SystemExit
+    assert pytest_wrapped_e.value.code == BAD_VALUE["value"]
+
+def test_run_cmd_not_found(tmp_path):
+    """Test that run_cmd raises the exception if the command cannot run"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    with pytest.raises(FileNotFoundError):
+        fvm.run_cmd(["this_command_does_not_exist"], "counter", "lint", "none")
+
+def test_run_cmd_resources(tmp_path):
+    """Test that the resource usage of the commands is recorded"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path)])
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    script = ("import time\n"
+              "data = bytearray(64 * 1024 * 1024)\n"
+              "start = time.process_time()\n"
+              "while time.process_time() - start < 1.5:\n"
+              "    pass\n")
+    fvm.run_cmd([sys.executable, "-c", script], "counter", "lint", "python",
+                verbose=False)
+    usage = fvm.results["counter"]["lint"]["resources"]
+    assert usage["max_rss"] > 32 * 1024 * 1024
+    assert usage["user_time"] > 0.5
+    # Resources of several commands in the same step are accumulated
+    fvm.run_cmd(["true"], "counter", "lint", "true", verbose=False)
+    assert fvm.results["counter"]["lint"]["resources"]["max_rss"] == usage["max_rss"]
+
+def test_run_cmd_resource_series(tmp_path):
+    """Test that the resource usage time series is written and plotted"""
+    fvm = FvmFramework(cli_args=["-o", str(tmp_path), "--sample-interval", "0.2"])
+    assert fvm.sample_interval == 0.2
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    script = ("import time\n"
+              "start = time.process_time()\n"
+              "while time.process_time() - start < 1:\n"
+              "    pass\n")
+    fvm.run_cmd([sys.executable, "-c", script], "counter", "lint", "python",
+                verbose=False)
+    samples = resources.read_samples(tmp_path / "counter" / "lint" / "lint_resources.csv")
+    assert len(samples) >= 3
+    assert max(cpu_percent for _, cpu_percent, _, _ in samples) > 20
+    assert all(threads >= 1 for _, _, _, threads in samples)
+    html = (tmp_path / "counter" / "lint" / "lint_resources.html").read_text(encoding="utf-8")
+    assert html.count("<svg") == 3
+
+@pytest.mark.parametrize("interval", [0, "1"])
+def test_set_sample_interval_invalid(interval):
+    """Test setting an invalid resource sampling interval"""
+    fvm = FvmFramework(cli_args=[])
+    with pytest.raises(SystemExit) as pytest_wrapped_e:
+        fvm.set_sample_interval(interval)
+    assert pytest_wrapped_e.value.code == BAD_VALUE["value"]
+
+def test_profile(tmp_path):
+    """Test that --profile writes a per-phase report and cProfile statistics"""
+    fvm = FvmFramework(cli_args=["--profile", "-o", str(tmp_path)])
+    assert fvm.profile is True
+    create_timed_steps(fvm)
+    fvm.set_toplevel("counter")
+    fvm.init_results()
+    profiling.start(fvm)
+    try:
+        fvm.run_configuration("counter")
+        stdout, _ = fvm.run_cmd(["echo", "hello"], "counter", "a", "echo", verbose=False)
+        fvm.logcheck(stdout, "counter", "a", "echo")
+    finally:
+        profiling.stop(fvm)
+    report = (tmp_path / "fvm_profile.txt").read_text(encoding="utf-8")
+    for phase in ["setup_design", "setup.a", "logcheck", profiling.TOOLS_SPAN]:
+        assert phase in report
+    assert "Time in FVM itself" in report
+    assert pstats.Stats(str(tmp_path / "fvm_profile.prof")).total_calls > 0
+    assert profiling.enabled is False
+
+@pytest.mark.parametrize("statement", ["import fvm",
+                                       "from fvm import FvmFramework; FvmFramework(cli_args=[])"])
+def test_import_time(statement):
+    """Test that heavy modules are not imported on startup, and that the
+    import time of FVM stays reasonable"""
+    heavy_modules = ["junit_xml", "wavedrom", "icecream", "rich.console", "rich.table",
+                     "packaging.version", "fvm.reports", "fvm.manage_allure",
+                     "fvm.drom2psl.generator", "fvm.toolchains.questa_pkg.parsers.parse_prove"]
+    code = f"import sys; {statement}; print(' '.join(sys.modules))"
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                             capture_output=True, text=True, check=True)
+    imported = process.stdout.split()
+    for module in heavy_modules:
+        assert module not in imported
+    # Each line of the -X importtime output is "import time: self | cumulative | module"
+    import_times = {line.split("|")[2].strip(): int(line.split("|")[1])
+                    for line in process.stderr.splitlines()
+                    if line.startswith("import time:") and line.count("|") == 2
+                    and not line.split("|")[1].strip().startswith("cumulative")}
+    # Importing FVM takes about 0.2 s, in microseconds
+    assert import_times["fvm"] < 5e5
+
+def test_get_fvm_version_memoized(monkeypatch):
+    """Test that the version is only looked up once"""
+    calls = []
+    def fake_version(distribution):
+        calls.append(distribution)
+        return "1.2.3"
+    monkeypatch.setattr(importlib.metadata, "version", fake_version)
+    helpers.get_fvm_version.cache_clear()
+    helpers.get_fvm_shortversion.cache_clear()
+    try:
+        assert helpers.get_fvm_version() == "1.2.3"
+        assert helpers.get_fvm_version() == "1.2.3"
+        assert helpers.get_fvm_shortversion() == "1.2"
+        assert calls == ["fvm-formal"]
+        assert helpers.get_fvm_version.cache_info().hits == 2
+    finally:
+        # Do not leak the fake version to other tests
+        helpers.get_fvm_version.cache_clear()
+        helpers.get_fvm_shortversion.cache_clear()
+
+def test_xml_report_resources(tmp_path):
+    """Test that the resource usage is exported as testcase properties"""
+    xml_string = ('<testsuites><testsuite name="s"><testcase name="counter.lint"/>'
+                  '<testcase name="counter.prove"/></testsuite></testsuites>')
+    usage = {"max_rss": 1024, "user_time": 1.5, "system_time": 0.25,
+             "read_bytes": 0, "write_bytes": 4096}
+    properties = {"counter.lint": reports.get_resource_properties(usage)}
+    result = reports.add_testcase_properties(xml_string, properties)
+    assert ('<testcase name="counter.lint"><properties>'
+            '<property name="max_rss_bytes" value="1024" />') in result
+    assert '<property name="user_time_sec" value="1.50" />' in result
+    assert '<testcase name="counter.prove" />' in result
+
 def test_set_coverage_goal_float() :
     """Test setting a valid coverage goal as a float"""
     fvm = FvmFramework(cli_args=[])